@@ -0,0 +1,179 @@
+import os
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import chromadb
+from langchain_core.documents import Document
+
+from collection_manifest import load_manifest
+from legal_text import parse_act_filename, find_section_headings, parse_amendment_references
+
+# -----------------------
+# Config
+# -----------------------
+AMENDMENT_INDEX_FILE = "amendment_index.json"
+BASE_SUFFIX = "-Base"
+AMENDMENT_SUFFIX = "-Amendment"
+
+
+def chunk_key(meta: dict) -> str:
+    """Stable key for a chunk built from its metadata (retrieved Documents carry no id)."""
+    page = meta.get("page", meta.get("page_number"))
+    return f"{meta.get('document_id')}-p{page}-c{meta.get('chunk_id')}"
+
+def _chunk_order(meta: dict) -> Tuple:
+    page = meta.get("page", meta.get("page_number")) or 0
+    parts = [int(p) for p in str(meta.get("chunk_id", "0")).split("-") if p.isdigit()]
+    return (meta.get("source", ""), int(page), parts)
+
+# -----------------------
+# Index Builder
+# -----------------------
+def section_chunks(ids: List[str], metadatas: List[dict], documents: List[str]) -> Dict[str, List[str]]:
+    """
+    Map section number -> chunk ids for a base Act. A chunk that starts no new section
+    continues the last section seen earlier in the same PDF.
+    """
+    sections: Dict[str, List[str]] = {}
+    current = {}
+    for cid, meta, text in sorted(zip(ids, metadatas, documents), key=lambda r: _chunk_order(r[1])):
+        source = meta.get("source")
+        headings = find_section_headings(text)
+        owners = ([current[source]] if source in current else []) + headings
+        for section in dict.fromkeys(owners):
+            sections.setdefault(section, []).append(cid)
+        if headings:
+            current[source] = headings[-1]
+    return sections
+
+def build_amendment_index(persist_root: str) -> Dict[str, Any]:
+    """
+    Link every amending chunk to the base-Act sections it changes. Output layout:
+      acts[act][section] = {"base": [chunk ids], "amendments": [{chunk_id, source, year, ...}]}
+      chunk_sections[chunk_key] = [(act, section), ...]   # for base hits at query time
+    Amendments are ordered by (year, act_number) so the latest text comes last.
+    """
+    client = chromadb.PersistentClient(path=persist_root)
+    processed = load_manifest(persist_root)
+    acts: Dict[str, Dict[str, Dict[str, list]]] = {}
+    chunk_sections: Dict[str, List[List[str]]] = {}
+
+    for base_name in [n for n in processed if n.endswith(BASE_SUFFIX)]:
+        act = base_name[: -len(BASE_SUFFIX)]
+        amendment_name = f"{act}{AMENDMENT_SUFFIX}"
+        act_sections = acts.setdefault(act, {})
+
+        base = client.get_collection(base_name).get(include=["metadatas", "documents"])
+        for section, cids in section_chunks(base["ids"], base["metadatas"], base["documents"]).items():
+            act_sections.setdefault(section, {"base": [], "amendments": []})["base"] = cids
+        by_id = dict(zip(base["ids"], base["metadatas"]))
+        for section, entry in act_sections.items():
+            for cid in entry["base"]:
+                chunk_sections.setdefault(chunk_key(by_id[cid]), []).append([act, section])
+
+        if amendment_name not in processed:
+            continue
+        amend = client.get_collection(amendment_name).get(include=["metadatas", "documents"])
+        for cid, meta, text in zip(amend["ids"], amend["metadatas"], amend["documents"]):
+            act_info = parse_act_filename(meta.get("source", "")) or {}
+            for section, operation in parse_amendment_references(text):
+                act_sections.setdefault(section, {"base": [], "amendments": []})["amendments"].append({
+                    "chunk_id": cid,
+                    "source": meta.get("source"),
+                    "page": meta.get("page", meta.get("page_number")),
+                    "year": act_info.get("year"),
+                    "act_number": act_info.get("act_number"),
+                    "operation": operation,
+                })
+
+        for entry in act_sections.values():
+            entry["amendments"].sort(key=lambda a: (a["year"] or 0, a["act_number"] or 0, a["chunk_id"]))
+
+    index = {"acts": acts, "chunk_sections": chunk_sections}
+    tmp_path = Path(persist_root) / f"{AMENDMENT_INDEX_FILE}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, Path(persist_root) / AMENDMENT_INDEX_FILE)
+
+    linked = sum(len(e["amendments"]) for a in acts.values() for e in a.values())
+    logging.info(f"Amendment index: {len(acts)} Acts, {linked} section amendments linked")
+    return index
+
+# -----------------------
+# Query-time expansion
+# -----------------------
+class AmendmentIndex:
+    def __init__(self, index: Dict[str, Any]):
+        self.acts = index.get("acts", {})
+        self.chunk_sections = index.get("chunk_sections", {})
+
+    @classmethod
+    def load(cls, persist_root: str) -> Optional["AmendmentIndex"]:
+        path = Path(persist_root) / AMENDMENT_INDEX_FILE
+        if not path.exists():
+            return None
+        with open(path, "r") as f:
+            return cls(json.load(f))
+
+    def amendments_for(self, act: str, section: str) -> List[Dict[str, Any]]:
+        return self.acts.get(act, {}).get(section, {}).get("amendments", [])
+
+    def expand(self, docs: List[Document], collections_dict) -> List[Document]:
+        """
+        Append the amending chunks for every base section hit, oldest amendment first,
+        fetched by id from the Amendment collection (no similarity search).
+        """
+        wanted: Dict[str, List[Tuple[str, str]]] = {}
+        linked_scores: Dict[str, float] = {}
+        for doc in docs:
+            score = doc.metadata.get("relevance_score")
+            for act, section in self.chunk_sections.get(chunk_key(doc.metadata), []):
+                for amendment in self.amendments_for(act, section):
+                    wanted.setdefault(f"{act}{AMENDMENT_SUFFIX}", []).append((amendment["chunk_id"], section))
+                    if score is not None:
+                        linked_scores[amendment["chunk_id"]] = max(score, linked_scores.get(amendment["chunk_id"], score))
+
+        present = {chunk_key(d.metadata) for d in docs}
+        expanded = list(docs)
+        for collection_name, refs in wanted.items():
+            if collection_name not in collections_dict:
+                continue
+            chunk_ids = list(dict.fromkeys(cid for cid, _ in refs))
+            sections_by_id = {}
+            for cid, section in refs:
+                sections_by_id.setdefault(cid, []).append(section)
+            fetched = collections_dict[collection_name].get(ids=chunk_ids, include=["metadatas", "documents"])
+            rows = dict(zip(fetched["ids"], zip(fetched["metadatas"], fetched["documents"])))
+            for cid in chunk_ids:
+                if cid not in rows:
+                    continue
+                meta, text = rows[cid]
+                if chunk_key(meta) in present:
+                    continue
+                present.add(chunk_key(meta))
+                linked_meta = {**meta, "amends_sections": ", ".join(sorted(set(sections_by_id[cid])))}
+                if cid in linked_scores:
+                    # Rank the amendment alongside the base text it changes
+                    linked_meta["relevance_score"] = linked_scores[cid]
+                expanded.append(Document(page_content=text, metadata=linked_meta))
+        return expanded
+
+
+_indexes: Dict[str, Optional[AmendmentIndex]] = {}
+
+def clear_cached_index(persist_root: str):
+    """Forget the loaded index so the next lookup reads the rebuilt file."""
+    _indexes.pop(persist_root, None)
+
+def expand_with_amendments(docs: List[Document], collections_dict, persist_root: str) -> List[Document]:
+    if persist_root not in _indexes:
+        _indexes[persist_root] = AmendmentIndex.load(persist_root)
+    index = _indexes[persist_root]
+    if index is None:
+        return docs
+    expanded = index.expand(docs, collections_dict)
+    if len(expanded) > len(docs):
+        logging.info(f"Linked {len(expanded) - len(docs)} amending chunks to retrieved base sections")
+    return expanded
@@ -0,0 +1,151 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# -----------------------
+# Config
+# -----------------------
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") == "1"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "86400"))  # seconds
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+
+
+@dataclass
+class CacheEntry:
+    query: str
+    embedding: np.ndarray
+    collections: Tuple[str, ...]
+    versions: Dict[str, str]
+    answer: str
+    sources: List[Dict[str, Any]] = field(default_factory=list)
+    confidence: Optional[float] = None
+    created_at: float = field(default_factory=time.time)
+
+
+# -----------------------
+# Semantic Answer Cache
+# -----------------------
+class SemanticAnswerCache:
+    """
+    In-memory answer cache keyed by query embedding.
+
+    A lookup hits when a stored query has cosine similarity >= threshold, was asked
+    against the same collections, is younger than the TTL and was answered against
+    the same content version of every collection. Least recently used entries are
+    evicted once max_entries is reached.
+    """
+
+    def __init__(
+        self,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        ttl: float = ANSWER_CACHE_TTL,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, CacheEntry]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    @staticmethod
+    def _key(collections: Optional[Iterable[str]]) -> Tuple[str, ...]:
+        return tuple(sorted(set(collections or [])))
+
+    def _is_stale(self, entry: CacheEntry, versions: Dict[str, str], now: float) -> bool:
+        if self.ttl and now - entry.created_at > self.ttl:
+            return True
+        return any(versions.get(name) != version for name, version in entry.versions.items())
+
+    def lookup(
+        self,
+        embedding,
+        collections: Optional[Iterable[str]],
+        versions: Dict[str, str],
+    ) -> Optional[CacheEntry]:
+        query_vec = self._normalize(embedding)
+        key = self._key(collections)
+        now = time.time()
+
+        with self._lock:
+            stale = [i for i, e in self._entries.items() if self._is_stale(e, versions, now)]
+            for entry_id in stale:
+                del self._entries[entry_id]
+            if stale:
+                logging.info(f"Answer cache: invalidated {len(stale)} stale entries")
+
+            candidates = [(i, e) for i, e in self._entries.items() if e.collections == key]
+            if not candidates:
+                self.misses += 1
+                return None
+
+            matrix = np.stack([e.embedding for _, e in candidates])
+            scores = matrix @ query_vec
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            entry_id, entry = candidates[best]
+            self._entries.move_to_end(entry_id)
+            self.hits += 1
+            logging.info(f"Answer cache hit (similarity={scores[best]:.3f}): {entry.query[:80]}")
+            return entry
+
+    def store(
+        self,
+        query: str,
+        embedding,
+        collections: Optional[Iterable[str]],
+        versions: Dict[str, str],
+        answer: str,
+        sources: Optional[List[Dict[str, Any]]] = None,
+        confidence: Optional[float] = None,
+    ):
+        entry = CacheEntry(
+            query=query,
+            embedding=self._normalize(embedding),
+            collections=self._key(collections),
+            versions=dict(versions),
+            answer=answer,
+            sources=list(sources or []),
+            confidence=confidence,
+        )
+        with self._lock:
+            self._entries[self._next_id] = entry
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, collection_name: Optional[str] = None):
+        """Drop every entry, or only those that depend on one collection."""
+        with self._lock:
+            if collection_name is None:
+                self._entries.clear()
+                return
+            for entry_id in [i for i, e in self._entries.items() if collection_name in e.versions]:
+                del self._entries[entry_id]
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
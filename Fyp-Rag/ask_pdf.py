@@ -20,27 +20,53 @@ from langchain.retrievers.document_compressors import LLMChainExtractor
 # Re-ranking
 from sentence_transformers import CrossEncoder
 
+from llm_cache import enable_llm_cache
+from fast_path import LocalQueryExpander, LocalMultiQueryRetriever, SentenceExtractCompressor
+from index_generations import resolve_persist_root
+from micro_batcher import batched_embeddings, batched_cross_encoder
+from model_client import MODEL_SERVER_ENABLED, RemoteEmbeddings, RemoteCrossEncoder, RemoteBM25Retriever
+
 logging.basicConfig(level=logging.INFO)
 
+PERSIST_DIRECTORY = "./civil_db"
+COLLECTION_NAME = "civil_docs"
+# "full": LLM MultiQuery + LLMChainExtractor, "fast": local query expansion + extractive compression
+RAG_PIPELINE_MODE = os.getenv("RAG_PIPELINE_MODE", "full")
+
+_embeddings = None
+_vector_db = None
+
 
 #  Load or initialize embeddings
 
 def load_or_initialize_embeddings():
+    """Return the process-wide LEGAL-BERT embeddings, loading them on first use."""
+    global _embeddings
+    if _embeddings is not None:
+        return _embeddings
+    if MODEL_SERVER_ENABLED:
+        # legal-bert lives in the shared model server; nothing to load here
+        _embeddings = RemoteEmbeddings()
+        return _embeddings
     if os.path.exists('legal_bert_embeddings.pkl'):
         logging.info("Loading cached embeddings...")
         with open('legal_bert_embeddings.pkl', 'rb') as f:
             embeddings = pickle.load(f)
-        return embeddings
     else:
         logging.info("Initializing new LEGAL-BERT embeddings...")
         embeddings = HuggingFaceEmbeddings(model_name="nlpaueb/legal-bert-base-uncased")
         with open('legal_bert_embeddings.pkl', 'wb') as f:
             pickle.dump(embeddings, f)
-        return embeddings
+    # Query embeddings from concurrent requests share forward passes
+    _embeddings = batched_embeddings(embeddings)
+    return _embeddings
 
 
 #  Cross-encoder re-ranking
-cross_encoder = CrossEncoder('cross-encoder/ms-marco-MiniLM-L-6-v2')
+if MODEL_SERVER_ENABLED:
+    cross_encoder = RemoteCrossEncoder()
+else:
+    cross_encoder = batched_cross_encoder(CrossEncoder('cross-encoder/ms-marco-MiniLM-L-6-v2'))
 
 def rerank(query, docs):
     """Re-rank retrieved documents by semantic relevance."""
@@ -50,18 +76,25 @@ def rerank(query, docs):
     return sorted_docs
 
 
+def get_vector_db():
+    """The Chroma store opened by initialize_rag_system (None before initialization)."""
+    return _vector_db
+
+
 #  Initialize  RAG system
-def initialize_rag_system():
+def initialize_rag_system(mode: str = RAG_PIPELINE_MODE):
+    global _vector_db
     load_dotenv()
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         logging.error("OPENAI_API_KEY not found in .env")
         return None
 
+    enable_llm_cache()
     embeddings = load_or_initialize_embeddings()
 
     # Connect to ChromaDB
-    persist_directory = "./civil_db"
+    persist_directory = resolve_persist_root(PERSIST_DIRECTORY)
     if not os.path.exists(persist_directory):
         logging.error("ChromaDB not found!")
         return None
@@ -69,7 +102,7 @@ def initialize_rag_system():
     vector_db = Chroma(
         persist_directory=persist_directory,
         embedding_function=embeddings,
-        collection_name="civil_docs",
+        collection_name=COLLECTION_NAME,
     )
 
     if vector_db._collection.count() == 0:
@@ -77,12 +110,17 @@ def initialize_rag_system():
         return None
 
     logging.info(f"Found {vector_db._collection.count()} documents in ChromaDB")
+    _vector_db = vector_db
 
-    # Load all docs for BM25 keyword search
-    logging.info("Loading documents for BM25 keyword search...")
-    all_docs = vector_db.similarity_search("placeholder", k=vector_db._collection.count())
-    bm25_retriever = BM25Retriever.from_documents(all_docs)
-    bm25_retriever.k = 5
+    if MODEL_SERVER_ENABLED:
+        # The model server holds the one BM25 index per host
+        bm25_retriever = RemoteBM25Retriever(k=5)
+    else:
+        # Load all docs for BM25 keyword search
+        logging.info("Loading documents for BM25 keyword search...")
+        all_docs = vector_db.similarity_search("placeholder", k=vector_db._collection.count())
+        bm25_retriever = BM25Retriever.from_documents(all_docs)
+        bm25_retriever.k = 5
 
     # Dense retriever
     dense_retriever = vector_db.as_retriever(search_kwargs={"k": 5})
@@ -93,15 +131,26 @@ def initialize_rag_system():
         weights=[0.5, 0.5]
     )
 
-    # Multi-query retrieval
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.1, max_tokens=1024)
-    multi_query_retriever = MultiQueryRetriever.from_llm(
-        retriever=hybrid_retriever,
-        llm=llm
-    )
+    # stream_usage: streamed answers report their token counts too (see metrics.py)
+    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.1, max_tokens=1024, stream_usage=True)
+    if mode == "fast":
+        # Fast path: no LLM calls before the final answer
+        logging.info("Using fast-path retrieval (local query expansion + extractive compression)")
+        multi_query_retriever = LocalMultiQueryRetriever(
+            retriever=hybrid_retriever,
+            expander=LocalQueryExpander(embeddings),
+        )
+        compressor = SentenceExtractCompressor(cross_encoder=cross_encoder)
+    else:
+        # Multi-query retrieval
+        multi_query_retriever = MultiQueryRetriever.from_llm(
+            retriever=hybrid_retriever,
+            llm=llm
+        )
+
+        # Contextual compression
+        compressor = LLMChainExtractor.from_llm(llm)
 
-    # Contextual compression
-    compressor = LLMChainExtractor.from_llm(llm)
     compression_retriever = ContextualCompressionRetriever(
         base_compressor=compressor,
         base_retriever=multi_query_retriever
@@ -138,7 +187,7 @@ def initialize_rag_system():
         return_source_documents=True,
     )
 
-    logging.info("Advanced Legal Document RAG System initialized")
+    logging.info(f"Advanced Legal Document RAG System initialized ({mode} mode)")
     return qa_chain
 
 
@@ -0,0 +1,109 @@
+import re
+import json
+import time
+import logging
+import argparse
+import statistics
+from typing import Dict, List
+
+from langchain_community.callbacks import get_openai_callback
+
+from ask_pdf import initialize_rag_system
+
+# -----------------------
+# Config
+# -----------------------
+DEFAULT_QUESTIONS = [
+    "What is the rate of the Economic Service Charge?",
+    "Who is liable to pay the ESC?",
+    "What are the functions of the Civil Aviation Authority of Sri Lanka?",
+    "What is the penalty for operating an aircraft without a licence?",
+    "Which amendments changed the Economic Service Charge Act in 2018?",
+    "What powers does the Director-General of Civil Aviation have?",
+]
+
+# -----------------------
+# Helpers
+# -----------------------
+def _tokens(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+def answer_overlap(reference: str, candidate: str) -> float:
+    """Token-level F1 between two answers (1.0 = same bag of words)."""
+    ref, cand = _tokens(reference), _tokens(candidate)
+    if not ref or not cand:
+        return 0.0
+    common = sum(min(ref.count(t), cand.count(t)) for t in set(cand))
+    if common == 0:
+        return 0.0
+    precision, recall = common / len(cand), common / len(ref)
+    return 2 * precision * recall / (precision + recall)
+
+def run_mode(mode: str, questions: List[str]) -> List[Dict]:
+    qa_chain = initialize_rag_system(mode=mode)
+    if not qa_chain:
+        raise RuntimeError(f"Could not initialize RAG system in {mode} mode")
+
+    runs = []
+    for question in questions:
+        with get_openai_callback() as cb:
+            start = time.perf_counter()
+            result = qa_chain.invoke({"query": question})
+            latency = time.perf_counter() - start
+        runs.append({
+            "question": question,
+            "answer": result["result"],
+            "latency": latency,
+            "llm_calls": cb.successful_requests,
+            "total_tokens": cb.total_tokens,
+            "cost_usd": cb.total_cost,
+        })
+        logging.info(f"[{mode}] {latency:.2f}s, {cb.successful_requests} LLM calls, {cb.total_tokens} tokens")
+    return runs
+
+def summarize(runs: List[Dict]) -> Dict:
+    latencies = sorted(r["latency"] for r in runs)
+    return {
+        "p50_latency": statistics.median(latencies),
+        "max_latency": latencies[-1],
+        "avg_llm_calls": statistics.mean(r["llm_calls"] for r in runs),
+        "avg_tokens": statistics.mean(r["total_tokens"] for r in runs),
+        "total_cost_usd": sum(r["cost_usd"] for r in runs),
+    }
+
+# -----------------------
+# Main
+# -----------------------
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Compare the full LLM chain with the fast path")
+    parser.add_argument("--questions", type=str, help="File with one question per line")
+    parser.add_argument("--output", type=str, help="Write per-question results as JSON")
+    args = parser.parse_args()
+
+    questions = DEFAULT_QUESTIONS
+    if args.questions:
+        with open(args.questions, "r") as f:
+            questions = [line.strip() for line in f if line.strip()]
+
+    full_runs = run_mode("full", questions)
+    fast_runs = run_mode("fast", questions)
+    overlaps = [answer_overlap(f["answer"], q["answer"]) for f, q in zip(full_runs, fast_runs)]
+
+    report = {
+        "full": summarize(full_runs),
+        "fast": summarize(fast_runs),
+        "answer_overlap_f1": statistics.mean(overlaps),
+    }
+
+    print("\n=== Fast path benchmark ===")
+    print(f"{'mode':<6}{'p50 s':>8}{'max s':>8}{'LLM calls':>11}{'tokens':>10}{'cost $':>10}")
+    for mode in ("full", "fast"):
+        s = report[mode]
+        print(f"{mode:<6}{s['p50_latency']:>8.2f}{s['max_latency']:>8.2f}"
+              f"{s['avg_llm_calls']:>11.1f}{s['avg_tokens']:>10.0f}{s['total_cost_usd']:>10.4f}")
+    print(f"Answer overlap (token F1, fast vs full): {report['answer_overlap_f1']:.3f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"report": report, "full": full_runs, "fast": fast_runs}, f, indent=2)
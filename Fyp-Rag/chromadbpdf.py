@@ -665,13 +665,16 @@
 import os
 import io
 import re
+import time
 import uuid
 import base64
+import asyncio
 import logging
+import threading
 import concurrent.futures
 from datetime import datetime
 from pathlib import Path
-from typing import List, Tuple, Dict, Any, Optional
+from typing import List, Tuple, Dict, Any, Optional, AsyncIterator, Callable
 import argparse
 
 import fitz
@@ -699,6 +702,15 @@ from langchain.prompts import PromptTemplate
 
 from sentence_transformers import CrossEncoder
 
+from collection_manifest import load_manifest, save_manifest, record_collection
+from llm_cache import enable_llm_cache, cached_completion
+from metadata_filters import document_metadata, build_where_filter, combine_where
+from index_generations import new_generation, resolve_persist_root
+from hnsw_config import hnsw_metadata, drop_if_hnsw_changed
+from micro_batcher import batched_cross_encoder, batched_embeddings
+from model_client import MODEL_SERVER_ENABLED, RemoteCrossEncoder, RemoteEmbeddings
+from metrics import span, record_llm_call
+
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
 )
@@ -715,6 +727,24 @@ LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", 0))
 OCR_DPI = int(os.getenv("OCR_DPI", "220"))
 OCR_MAX_RETRIES = 3
 OCR_BACKOFF = 2.0
+
+# Map-reduce concurrency
+MAP_CONCURRENCY = int(os.getenv("MAP_CONCURRENCY", "6"))
+MAP_TIMEOUT = float(os.getenv("MAP_TIMEOUT", "60"))  # seconds per map call
+MAP_RETRIES = int(os.getenv("MAP_RETRIES", "2"))
+MAP_BACKOFF = 2.0
+
+# Relevance gating: only documents whose best chunk scores >= threshold (cross-encoder
+# logit) are mapped, capped at the top-m documents. MAP_GATE_TOP_M=0 disables the cap.
+MAP_GATE_THRESHOLD = float(os.getenv("MAP_GATE_THRESHOLD", "-2.0"))
+MAP_GATE_TOP_M = int(os.getenv("MAP_GATE_TOP_M", "4"))
+
+# Hierarchical reduce: at most REDUCE_FAN_IN answers and REDUCE_MAX_PROMPT_TOKENS per prompt
+REDUCE_FAN_IN = max(2, int(os.getenv("REDUCE_FAN_IN", "6")))  # below 2 a level cannot shrink
+REDUCE_MAX_PROMPT_TOKENS = int(os.getenv("REDUCE_MAX_PROMPT_TOKENS", "6000"))
+REDUCE_MAX_SKIPPED_TITLES = int(os.getenv("REDUCE_MAX_SKIPPED_TITLES", "10"))  # the rest are only counted
+NO_RELEVANT_INFO = "No relevant information."
+MAP_FAILED_ANSWER = "Could not analyse this document (map step failed)."
 OCR_PROMPT = os.getenv(
     "OCR_PROMPT",
     "Extract all legible body text from this legal page. Preserve reading order. "
@@ -733,7 +763,13 @@ except Exception:
     openai_client = None
     _has_openai = False
 
-cross_encoder = CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2")  # Re-ranking
+# Re-ranking
+if MODEL_SERVER_ENABLED:
+    cross_encoder = RemoteCrossEncoder()
+else:
+    cross_encoder = batched_cross_encoder(CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2"))
+
+enable_llm_cache()  # temperature-0 map/reduce calls are served from disk on re-runs
 
 
 # ---------------- PDF Helpers ----------------
@@ -754,38 +790,47 @@ def ocr_png_with_openai(img_bytes: bytes) -> str:
     if not _has_openai:
         return ""
     img_b64 = base64.b64encode(img_bytes).decode("utf-8")
+    messages = [
+        {
+            "role": "system",
+            "content": "You are an OCR assistant for legal documents.",
+        },
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": OCR_PROMPT},
+                {
+                    "type": "image_url",
+                    "image_url": {"url": f"data:image/png;base64,{img_b64}"},
+                },
+            ],
+        },
+    ]
+
+    def call() -> str:
+        # Raw SDK call: LangChain callbacks do not see it, so count it here
+        started = time.perf_counter()
+        resp = openai_client.chat.completions.create(
+            model=OPENAI_CHAT_MODEL, temperature=0, messages=messages
+        )
+        usage = resp.usage
+        record_llm_call(
+            OPENAI_CHAT_MODEL,
+            usage.prompt_tokens if usage else 0,
+            usage.completion_tokens if usage else 0,
+            time.perf_counter() - started,
+        )
+        return resp.choices[0].message.content or ""
+
     last_err = None
     for attempt in range(1, OCR_MAX_RETRIES + 1):
         try:
-            resp = openai_client.chat.completions.create(
-                model=OPENAI_CHAT_MODEL,
-                temperature=0,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an OCR assistant for legal documents.",
-                    },
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": OCR_PROMPT},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/png;base64,{img_b64}"
-                                },
-                            },
-                        ],
-                    },
-                ],
-            )
-            text = resp.choices[0].message.content or ""
+            with span("ocr"):
+                text = cached_completion(OPENAI_CHAT_MODEL, 0, messages, call)
             return normalize_ws(text)
         except Exception as e:
             last_err = e
             if attempt < OCR_MAX_RETRIES:
-                import time
-
                 time.sleep(OCR_BACKOFF ** (attempt - 1))
     logging.error(f"OCR failed after {OCR_MAX_RETRIES} attempts: {last_err}")
     return ""
@@ -830,6 +875,7 @@ def process_pdf(
 
     chunks, metadata_list, ids = [], [], []
     upload_date = datetime.now().strftime("%Y-%m-%d")
+    act_meta = document_metadata(full_path)
 
     for page_num, text in pages:
         split_chunks = [c.strip() for c in text_splitter.split_text(text)]
@@ -847,6 +893,7 @@ def process_pdf(
                     "document_type": "Legal Document",
                     "jurisdiction": "Unknown",
                     "upload_date": upload_date,
+                    **act_meta,
                 }
             )
             ids.append(f"{document_id}-p{page_num}-c{i}")
@@ -870,10 +917,12 @@ def process_all_pdfs(pdf_dir: str, persist_directory: str, collection_name: str)
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=1000, chunk_overlap=200, length_function=len
     )
+    drop_if_hnsw_changed(persist_directory, collection_name)  # space/M/ef_construction need a rebuild
     vector_db = Chroma(
         persist_directory=persist_directory,
         embedding_function=embeddings,
         collection_name=collection_name,
+        collection_metadata=hnsw_metadata(collection_name),
     )
 
     all_chunks, all_metadatas, all_ids = [], [], []
@@ -895,35 +944,63 @@ def process_all_pdfs(pdf_dir: str, persist_directory: str, collection_name: str)
     vector_db.add_texts(texts=all_chunks, metadatas=all_metadatas, ids=all_ids)
     logging.info(f"Finished processing {len(all_chunks)} chunks into {collection_name}")
 
+    # Bump the content version so answer caches drop entries built on old chunks
+    processed = load_manifest(persist_directory)
+    record_collection(processed, collection_name, vector_db._collection.count())
+    save_manifest(persist_directory, processed)
+
 
 def ingest_both():
-    process_all_pdfs(PDF_DIR, PERSIST_DIR, COLLECTION_NAME)
-    process_all_pdfs(AMENDMENT_PDF_DIR, PERSIST_DIR, AMENDMENT_COLLECTION_NAME)
+    # Build into a staging generation; readers switch only once both collections are complete
+    with new_generation(PERSIST_DIR) as staging_dir:
+        process_all_pdfs(PDF_DIR, staging_dir, COLLECTION_NAME)
+        process_all_pdfs(AMENDMENT_PDF_DIR, staging_dir, AMENDMENT_COLLECTION_NAME)
 
 
 # ---------------- Vectorstores ----------------
-def get_vectorstores() -> Dict[str, Chroma]:
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    embeddings = HuggingFaceEmbeddings(
-        model_name="nlpaueb/legal-bert-base-uncased", model_kwargs={"device": device}
-    )
-    return {
-        "acts": Chroma(
-            persist_directory=PERSIST_DIR,
-            embedding_function=embeddings,
-            collection_name=COLLECTION_NAME,
-        ),
-        "amendments": Chroma(
-            persist_directory=PERSIST_DIR,
-            embedding_function=embeddings,
-            collection_name=AMENDMENT_COLLECTION_NAME,
-        ),
-    }
+_query_embeddings = None
+_vectorstores: Optional[Tuple[str, Dict[str, Chroma]]] = None  # (generation dir, handles)
+_vectorstores_lock = threading.Lock()
+
+
+def get_query_embeddings():
+    """LEGAL-BERT for query embeddings, loaded once per process (or served by the model server)."""
+    global _query_embeddings
+    if _query_embeddings is None and MODEL_SERVER_ENABLED:
+        _query_embeddings = RemoteEmbeddings()
+    elif _query_embeddings is None:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        _query_embeddings = batched_embeddings(HuggingFaceEmbeddings(
+            model_name="nlpaueb/legal-bert-base-uncased", model_kwargs={"device": device}
+        ))
+    return _query_embeddings
 
 
-def build_doc_index(vs: Chroma) -> Dict[str, Dict[str, Any]]:
+def get_vectorstores() -> Dict[str, Chroma]:
+    """Acts + amendments handles, reopened only when a new generation is published."""
+    global _vectorstores
+    persist_dir = resolve_persist_root(PERSIST_DIR)
+    with _vectorstores_lock:
+        if _vectorstores is None or _vectorstores[0] != persist_dir:
+            embeddings = get_query_embeddings()
+            _vectorstores = (persist_dir, {
+                "acts": Chroma(
+                    persist_directory=persist_dir,
+                    embedding_function=embeddings,
+                    collection_name=COLLECTION_NAME,
+                ),
+                "amendments": Chroma(
+                    persist_directory=persist_dir,
+                    embedding_function=embeddings,
+                    collection_name=AMENDMENT_COLLECTION_NAME,
+                ),
+            })
+        return _vectorstores[1]
+
+
+def build_doc_index(vs: Chroma, where: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[str, Any]]:
     col = vs._collection
-    raw = col.get(include=["metadatas"])
+    raw = col.get(where=where, include=["metadatas"])
     metadatas = raw.get("metadatas", []) or []
     by_doc = {}
     for m in metadatas:
@@ -934,12 +1011,16 @@ def build_doc_index(vs: Chroma) -> Dict[str, Dict[str, Any]]:
 
 
 def retrieve_topk_per_document(
-    vs: Chroma, question: str, doc_ids: List[str], k_per_doc: int = 3
+    vs: Chroma,
+    question: str,
+    doc_ids: List[str],
+    k_per_doc: int = 3,
+    where: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, List[Document]]:
     per_doc_hits = {}
     for doc_id in doc_ids:
         hits = vs.similarity_search(
-            question, k=k_per_doc, filter={"document_id": doc_id}
+            question, k=k_per_doc, filter=combine_where({"document_id": doc_id}, where)
         )
         per_doc_hits[doc_id] = hits
     return per_doc_hits
@@ -952,6 +1033,41 @@ def rerank(query: str, docs: List[Document]) -> List[Document]:
     return sorted_docs
 
 
+def gate_documents(
+    question: str,
+    per_doc_hits: Dict[str, List[Document]],
+    threshold: float = MAP_GATE_THRESHOLD,
+    top_m: int = MAP_GATE_TOP_M,
+) -> Tuple[Dict[str, List[Document]], Dict[str, str]]:
+    """
+    Decide which documents are worth a map call. Every candidate chunk is scored
+    with the cross-encoder in one batch and a document scores as its best chunk.
+    Returns (hits to map, {skipped doc_id: reason}).
+    """
+    skipped = {doc_id: "no passages retrieved" for doc_id, hits in per_doc_hits.items() if not hits}
+    candidates = [(doc_id, hits) for doc_id, hits in per_doc_hits.items() if hits]
+    if not candidates:
+        return {}, skipped
+
+    pairs = [[question, d.page_content] for _, hits in candidates for d in hits]
+    scores = cross_encoder.predict(pairs)
+    doc_scores, offset = {}, 0
+    for doc_id, hits in candidates:
+        doc_scores[doc_id] = float(max(scores[offset: offset + len(hits)]))
+        offset += len(hits)
+
+    ranked = sorted(doc_scores, key=doc_scores.get, reverse=True)
+    kept = [doc_id for doc_id in ranked if doc_scores[doc_id] >= threshold]
+    if top_m > 0:
+        kept = kept[:top_m]
+    for doc_id in ranked:
+        if doc_id not in kept:
+            skipped[doc_id] = f"low relevance (score {doc_scores[doc_id]:.2f})"
+
+    logging.info(f"Relevance gate: mapping {len(kept)} of {len(per_doc_hits)} documents")
+    return {doc_id: per_doc_hits[doc_id] for doc_id in kept}, skipped
+
+
 # ---------------- Map-Reduce ----------------
 def make_map_prompt(question: str, doc_title: str, chunks: List[Document]) -> str:
     context_parts = []
@@ -996,16 +1112,102 @@ def map_step(
     return answers
 
 
+async def _amap_one(
+    llm: ChatOpenAI,
+    semaphore: asyncio.Semaphore,
+    question: str,
+    doc_id: str,
+    chunks: List[Document],
+    doc_catalog: Dict[str, Dict[str, Any]],
+    timeout: float,
+    retries: int,
+) -> Tuple[str, str]:
+    title = doc_catalog.get(doc_id, {}).get("source") or f"document {doc_id[:8]}"
+    prompt = make_map_prompt(question, title, chunks)
+    last_err = None
+    async with semaphore:
+        for attempt in range(retries + 1):
+            try:
+                resp = await asyncio.wait_for(llm.ainvoke(prompt), timeout=timeout)
+                return doc_id, (resp.content or "").strip()
+            except Exception as e:
+                last_err = e
+                if attempt < retries:
+                    await asyncio.sleep(MAP_BACKOFF ** attempt)
+    logging.error(f"Map step failed for {title} after {retries + 1} attempts: {last_err!r}")
+    return doc_id, MAP_FAILED_ANSWER
+
+
+async def stream_map_step(
+    llm: ChatOpenAI,
+    question: str,
+    per_doc_hits: Dict[str, List[Document]],
+    doc_catalog: Dict[str, Dict[str, Any]],
+    concurrency: int = MAP_CONCURRENCY,
+    timeout: float = MAP_TIMEOUT,
+    retries: int = MAP_RETRIES,
+) -> AsyncIterator[Tuple[str, str]]:
+    """Run map prompts concurrently (at most `concurrency` in flight) and yield
+    (doc_id, answer) pairs in completion order."""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    tasks = [
+        asyncio.create_task(
+            _amap_one(llm, semaphore, question, doc_id, chunks, doc_catalog, timeout, retries)
+        )
+        for doc_id, chunks in per_doc_hits.items()
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def amap_step(
+    llm: ChatOpenAI,
+    question: str,
+    per_doc_hits: Dict[str, List[Document]],
+    doc_catalog: Dict[str, Dict[str, Any]],
+    on_partial: Optional[Callable[[str, str, str], None]] = None,
+    **kwargs,
+) -> Dict[str, str]:
+    """Concurrent map_step. `on_partial(doc_id, title, answer)` fires as each document finishes."""
+    answers = {}
+    async for doc_id, ans in stream_map_step(llm, question, per_doc_hits, doc_catalog, **kwargs):
+        answers[doc_id] = ans
+        if on_partial:
+            title = doc_catalog.get(doc_id, {}).get("source") or f"document {doc_id[:8]}"
+            on_partial(doc_id, title, ans)
+    # Keep catalog order so the reduce prompt is deterministic (and cacheable)
+    return {doc_id: answers[doc_id] for doc_id in per_doc_hits if doc_id in answers}
+
+
 def make_reduce_prompt(
     question: str,
     per_doc_answers: Dict[str, str],
     doc_catalog: Dict[str, Dict[str, Any]],
+    skipped: Optional[Dict[str, str]] = None,
 ) -> str:
     lines = []
     for doc_id, ans in per_doc_answers.items():
         title = doc_catalog.get(doc_id, {}).get("source") or f"document {doc_id[:8]}"
         lines.append(f"## {title}\n{ans}\n")
     combined = "\n".join(lines)
+    skipped_note = ""
+    if skipped:
+        titles = sorted(
+            doc_catalog.get(doc_id, {}).get("source") or f"document {doc_id[:8]}"
+            for doc_id in skipped
+        )
+        listed = ", ".join(titles[:REDUCE_MAX_SKIPPED_TITLES])
+        if len(titles) > REDUCE_MAX_SKIPPED_TITLES:
+            listed += f" and {len(titles) - REDUCE_MAX_SKIPPED_TITLES} more"
+        skipped_note = (
+            f"\n{len(titles)} documents not analysed because retrieval found nothing relevant in them:\n"
+            + listed
+            + "\n"
+        )
     return f"""
 You are a senior legal summarizer.
 
@@ -1015,7 +1217,7 @@ User Question:
 Below are per-document answers (some may say "No relevant information."):
 
 {combined}
-
+{skipped_note}
 Task:
 - Merge only the relevant answers into one clear, comprehensive response.
 - Cite documents by filename (e.g., "(see: file.pdf)").
@@ -1070,8 +1272,9 @@ def reduce_step(
     question: str,
     per_doc_answers: Dict[str, str],
     doc_catalog: Dict[str, Dict[str, Any]],
+    skipped: Optional[Dict[str, str]] = None,
 ) -> str:
-    prompt_text = make_reduce_prompt(question, per_doc_answers, doc_catalog)
+    prompt_text = make_reduce_prompt(question, per_doc_answers, doc_catalog, skipped)
     try:
         resp = llm.invoke(prompt_text)
         return (resp.content or "").strip()
@@ -1080,16 +1283,175 @@ def reduce_step(
         return "An error occurred while generating the final answer."
 
 
-def answer_question_map_reduce(
+async def areduce_step(
+    llm: ChatOpenAI,
     question: str,
-    k_per_doc: int = 4,
-    model: str = OPENAI_CHAT_MODEL,
-    temperature: float = LLM_TEMPERATURE,
+    per_doc_answers: Dict[str, str],
+    doc_catalog: Dict[str, Dict[str, Any]],
+    skipped: Optional[Dict[str, str]] = None,
 ) -> str:
-    vs_dict = get_vectorstores()
-    llm = ChatOpenAI(model=model, temperature=temperature)
+    prompt_text = make_reduce_prompt(question, per_doc_answers, doc_catalog, skipped)
+    try:
+        resp = await llm.ainvoke(prompt_text)
+        return (resp.content or "").strip()
+    except Exception as e:
+        logging.error(f"Error in reduce step: {e}")
+        return "An error occurred while generating the final answer."
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English legal text)."""
+    return len(text) // 4 + 1
+
+
+def fit_answers_to_budget(answers: Dict[str, str], budget_tokens: int) -> Dict[str, str]:
+    """Truncate answers evenly so that together they stay within budget_tokens."""
+    if not answers or sum(estimate_tokens(a) for a in answers.values()) <= budget_tokens:
+        return answers
+    per_answer_chars = max(200, (budget_tokens // len(answers)) * 4)
+    return {
+        key: ans if len(ans) <= per_answer_chars else ans[:per_answer_chars].rstrip() + " [...]"
+        for key, ans in answers.items()
+    }
+
+
+def _unique_titles(items: List[Tuple[str, str, str]]) -> Dict[str, str]:
+    """{title: answer} for (group, title, answer) items, suffixing repeated titles."""
+    answers = {}
+    for _, title, ans in items:
+        key, n = title, 1
+        while key in answers:
+            n += 1
+            key = f"{title} ({n})"
+        answers[key] = ans
+    return answers
 
-    per_doc_answers_all = {}
+
+def make_group_reduce_prompt(question: str, group: str, partials: Dict[str, str]) -> str:
+    combined = "\n".join(f"## {title}\n{ans}\n" for title, ans in partials.items())
+    return f"""
+You are a senior legal summarizer combining partial answers for one group of documents ({group}).
+
+User Question:
+{question}
+
+Partial answers:
+
+{combined}
+
+Task:
+- Merge the partial answers into one concise answer for this group.
+- Keep every document citation (e.g., "(see: file.pdf)") attached to the facts it supports.
+- Do not add facts that are not in the partial answers.
+- If none of them contain relevant information, reply exactly "{NO_RELEVANT_INFO}"
+
+Group Answer:
+"""
+
+
+async def reduce_to_final_prompt(
+    llm: ChatOpenAI,
+    question: str,
+    per_doc_answers: Dict[str, str],
+    doc_catalog: Dict[str, Dict[str, Any]],
+    skipped: Optional[Dict[str, str]] = None,
+    fan_in: int = REDUCE_FAN_IN,
+    max_prompt_tokens: int = REDUCE_MAX_PROMPT_TOKENS,
+    concurrency: int = MAP_CONCURRENCY,
+) -> str:
+    """
+    Tree reduce: per-document answers are grouped by collection, reduced in batches
+    of `fan_in` in parallel, and the group answers are reduced again until one final
+    prompt remains. Every prompt is capped at `max_prompt_tokens`, so depth (and
+    latency) grows with log(fan_in) of the number of documents. Returns that final prompt.
+    """
+    skipped = dict(skipped or {})
+    items = []  # (group, title, answer)
+    for doc_id, ans in per_doc_answers.items():
+        meta = doc_catalog.get(doc_id, {})
+        if ans.strip() == NO_RELEVANT_INFO:
+            skipped[doc_id] = "no relevant information in map step"
+            continue
+        title = meta.get("source") or f"document {doc_id[:8]}"
+        items.append((meta.get("collection", "documents"), title, ans))
+
+    fan_in = max(2, fan_in)
+    # The skipped-documents note (count + at most REDUCE_MAX_SKIPPED_TITLES titles) comes out of the answers' share
+    answer_budget = max(0, max_prompt_tokens - estimate_tokens(make_reduce_prompt(question, {}, doc_catalog, skipped)))
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def reduce_batch(group: str, label: str, batch: List[Tuple[str, str, str]]) -> Tuple[str, str, str]:
+        partials = fit_answers_to_budget(_unique_titles(batch), answer_budget)
+        async with semaphore:
+            try:
+                resp = await llm.ainvoke(make_group_reduce_prompt(question, group, partials))
+                return group, label, (resp.content or "").strip()
+            except Exception as e:
+                logging.error(f"Group reduce failed for {label}: {e}")
+                return group, label, "\n".join(partials.values())
+
+    level = 0
+    while len(items) > fan_in:
+        level += 1
+        by_group: Dict[str, List[Tuple[str, str, str]]] = {}
+        for item in items:
+            by_group.setdefault(item[0], []).append(item)
+        jobs = []
+        for group, group_items in by_group.items():
+            for i in range(0, len(group_items), fan_in):
+                batch = group_items[i: i + fan_in]
+                if len(batch) == 1:
+                    jobs.append(asyncio.sleep(0, result=batch[0]))
+                    continue
+                label = f"{group} (level {level}, part {i // fan_in + 1})"
+                jobs.append(reduce_batch(group, label, batch))
+        reduced = await asyncio.gather(*jobs)
+        logging.info(f"Reduce level {level}: {len(items)} answers -> {len(reduced)}")
+        if len(reduced) == len(items):
+            # Groups smaller than the fan-in cannot shrink further on their own; merge groups
+            items = [("all documents", title, ans) for _, title, ans in reduced]
+            continue
+        items = list(reduced)
+
+    final_answers = fit_answers_to_budget(_unique_titles(items), answer_budget)
+    final_catalog = {title: {"source": title} for title in final_answers}
+    final_catalog.update(doc_catalog)
+    return make_reduce_prompt(question, final_answers, final_catalog, skipped)
+
+
+async def hierarchical_reduce(
+    llm: ChatOpenAI,
+    question: str,
+    per_doc_answers: Dict[str, str],
+    doc_catalog: Dict[str, Dict[str, Any]],
+    skipped: Optional[Dict[str, str]] = None,
+    fan_in: int = REDUCE_FAN_IN,
+    max_prompt_tokens: int = REDUCE_MAX_PROMPT_TOKENS,
+    concurrency: int = MAP_CONCURRENCY,
+) -> str:
+    """Tree reduce (see reduce_to_final_prompt) followed by the final reduce call."""
+    prompt_text = await reduce_to_final_prompt(
+        llm, question, per_doc_answers, doc_catalog, skipped, fan_in, max_prompt_tokens, concurrency
+    )
+    try:
+        resp = await llm.ainvoke(prompt_text)
+        return (resp.content or "").strip()
+    except Exception as e:
+        logging.error(f"Error in reduce step: {e}")
+        return "An error occurred while generating the final answer."
+
+
+def retrieve_per_document_hits(
+    vs_dict: Dict[str, Chroma],
+    question: str,
+    k_per_doc: int,
+    where: Optional[Dict[str, Any]] = None,
+) -> Tuple[Dict[str, List[Document]], Dict[str, Dict[str, Any]]]:
+    """
+    Hybrid retrieval once per collection, grouped by document_id. `where` restricts
+    both the BM25 corpus and the dense search before any scoring.
+    """
+    per_doc_hits_all = {}
     doc_catalog_all = {}
 
     for name, vs in vs_dict.items():
@@ -1099,37 +1461,148 @@ def answer_question_map_reduce(
             continue
 
         # Safe similarity search
-        all_docs = vs.similarity_search("placeholder", k=doc_count)
+        all_docs = vs.similarity_search("placeholder", k=doc_count, filter=where)
+        if not all_docs:
+            logging.info(f"No chunks in '{name}' match {where}. Skipping.")
+            continue
 
         bm25 = BM25Retriever.from_documents(all_docs)
         bm25.k = k_per_doc
-        dense = vs.as_retriever(search_kwargs={"k": k_per_doc})
+        search_kwargs = {"k": k_per_doc}
+        if where:
+            search_kwargs["filter"] = where
+        dense = vs.as_retriever(search_kwargs=search_kwargs)
         hybrid = EnsembleRetriever(retrievers=[bm25, dense], weights=[0.5, 0.5])
 
-        doc_catalog = build_doc_index(vs)
+        doc_catalog = build_doc_index(vs, where)
+        for entry in doc_catalog.values():
+            entry["collection"] = name
         doc_catalog_all.update(doc_catalog)
 
         if not doc_catalog:
             logging.warning(f"No documents found in '{name}' catalog. Skipping.")
             continue
 
-        per_doc_hits = {}
+        # The hybrid query does not depend on the document, so run it once
+        chunks = hybrid.get_relevant_documents(question)
         for doc_id in doc_catalog.keys():
-            chunks = hybrid.get_relevant_documents(question)
             filtered_chunks = [
                 c for c in chunks if c.metadata.get("document_id") == doc_id
             ]
-            per_doc_hits[doc_id] = filtered_chunks[:k_per_doc]
+            per_doc_hits_all[doc_id] = filtered_chunks[:k_per_doc]
+
+    return per_doc_hits_all, doc_catalog_all
 
-        per_doc_answers = map_step(llm, question, per_doc_hits, doc_catalog)
-        per_doc_answers_all.update(per_doc_answers)
 
-    if not per_doc_answers_all:
+async def answer_question_map_reduce_async(
+    question: str,
+    k_per_doc: int = 4,
+    model: str = OPENAI_CHAT_MODEL,
+    temperature: float = LLM_TEMPERATURE,
+    on_partial: Optional[Callable[[str, str, str], None]] = None,
+    concurrency: int = MAP_CONCURRENCY,
+    timeout: float = MAP_TIMEOUT,
+    retries: int = MAP_RETRIES,
+    filters: Optional[Dict[str, Any]] = None,
+) -> str:
+    vs_dict = get_vectorstores()
+    llm = ChatOpenAI(model=model, temperature=temperature)
+
+    per_doc_hits, doc_catalog = await asyncio.to_thread(
+        retrieve_per_document_hits, vs_dict, question, k_per_doc, build_where_filter(filters)
+    )
+    gated_hits, skipped = await asyncio.to_thread(gate_documents, question, per_doc_hits)
+    if not gated_hits:
         logging.warning("No relevant documents found in any collection.")
         return "No relevant information found in the database."
 
-    final_answer = reduce_step(llm, question, per_doc_answers_all, doc_catalog_all)
-    return final_answer
+    per_doc_answers = await amap_step(
+        llm, question, gated_hits, doc_catalog,
+        on_partial=on_partial, concurrency=concurrency, timeout=timeout, retries=retries,
+    )
+    return await hierarchical_reduce(
+        llm, question, per_doc_answers, doc_catalog, skipped, concurrency=concurrency
+    )
+
+
+async def astream_map_reduce(
+    question: str,
+    k_per_doc: int = 4,
+    model: str = OPENAI_CHAT_MODEL,
+    temperature: float = LLM_TEMPERATURE,
+    filters: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    answer_question_map_reduce_async as an event stream: "retrieval" and "sources" once
+    the gate has run, a "partial" per mapped document as it finishes, "token"s of the
+    final reduce as they arrive and a closing "complete". Closing the generator (e.g.
+    the client went away) cancels the map and reduce calls still in flight.
+    """
+    start = time.perf_counter()
+    vs_dict = await asyncio.to_thread(get_vectorstores)
+    llm = ChatOpenAI(model=model, temperature=temperature, stream_usage=True)
+
+    with span("retrieve"):
+        per_doc_hits, doc_catalog = await asyncio.to_thread(
+            retrieve_per_document_hits, vs_dict, question, k_per_doc, build_where_filter(filters)
+        )
+    with span("gate"):
+        gated_hits, skipped = await asyncio.to_thread(gate_documents, question, per_doc_hits)
+    sources, seen = [], set()
+    for hits in gated_hits.values():
+        for d in hits:
+            key = (d.metadata.get("source"), d.metadata.get("page_number", d.metadata.get("page")))
+            if key not in seen:
+                seen.add(key)
+                sources.append({"source": key[0], "page": key[1]})
+    yield {"type": "retrieval", "documents": len(gated_hits), "skipped": len(skipped),
+           "elapsed_ms": (time.perf_counter() - start) * 1000}
+    yield {"type": "sources", "sources": sources}
+
+    if not gated_hits:
+        answer = "No relevant information found in the database."
+        yield {"type": "token", "content": answer}
+        yield {"type": "complete", "answer": answer, "sources": sources}
+        return
+
+    answers = {}
+    with span("map"):
+        async for doc_id, ans in stream_map_step(llm, question, gated_hits, doc_catalog):
+            answers[doc_id] = ans
+            title = doc_catalog.get(doc_id, {}).get("source") or f"document {doc_id[:8]}"
+            yield {"type": "partial", "document": title, "answer": ans}
+
+    per_doc_answers = {doc_id: answers[doc_id] for doc_id in gated_hits if doc_id in answers}
+    with span("reduce"):
+        prompt_text = await reduce_to_final_prompt(llm, question, per_doc_answers, doc_catalog, skipped)
+    parts = []
+    with span("generate"):
+        async for chunk in llm.astream(prompt_text):
+            if chunk.content:
+                parts.append(chunk.content)
+                yield {"type": "token", "content": chunk.content}
+        if not parts:
+            # Nothing streamed (e.g. the answer is in the LLM cache): fall back to a plain call
+            message = await llm.ainvoke(prompt_text)
+            if message.content:
+                parts.append(message.content)
+                yield {"type": "token", "content": message.content}
+    yield {"type": "complete", "answer": "".join(parts).strip(), "sources": sources}
+
+
+def answer_question_map_reduce(
+    question: str,
+    k_per_doc: int = 4,
+    model: str = OPENAI_CHAT_MODEL,
+    temperature: float = LLM_TEMPERATURE,
+    on_partial: Optional[Callable[[str, str, str], None]] = None,
+    filters: Optional[Dict[str, Any]] = None,
+) -> str:
+    return asyncio.run(
+        answer_question_map_reduce_async(
+            question, k_per_doc, model, temperature, on_partial=on_partial, filters=filters
+        )
+    )
 
 
 # ---------------- Main ----------------
@@ -1139,12 +1612,26 @@ if __name__ == "__main__":
         "--ingest", action="store_true", help="Ingest PDFs into vector DB"
     )
     parser.add_argument("--query", type=str, help="Question to ask the legal DB")
+    parser.add_argument(
+        "--stream", action="store_true", help="Print per-document answers as they finish"
+    )
+    parser.add_argument("--act-number", type=int, help="Only search Act No. N")
+    parser.add_argument("--year", type=int, help="Only search Acts enacted in this year")
+    parser.add_argument("--role", choices=["base", "amendment"], help="Only search base Acts or amendments")
     args = parser.parse_args()
 
+    def print_partial(doc_id: str, title: str, ans: str):
+        print(f"\n--- {title} ---\n{ans}")
+
     if args.ingest:
         ingest_both()
     elif args.query:
-        answer = answer_question_map_reduce(args.query)
+        filters = {"act_number": args.act_number, "year": args.year, "role": args.role}
+        answer = answer_question_map_reduce(
+            args.query,
+            on_partial=print_partial if args.stream else None,
+            filters={k: v for k, v in filters.items() if v is not None},
+        )
         print("\n=== FINAL ANSWER ===\n")
         print(answer)
     else:
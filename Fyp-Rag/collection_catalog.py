@@ -0,0 +1,173 @@
+import os
+import time
+import logging
+import threading
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from langchain_chroma import Chroma
+
+from collection_manifest import PROCESSED_LOG, load_manifest, entry_version
+from amendment_index import clear_cached_index as clear_amendment_index
+from section_index import clear_cached_index as clear_section_index
+from collection_router import clear_cached_router
+from index_generations import resolve_persist_root
+from hnsw_config import apply_search_ef
+
+# -----------------------
+# Config
+# -----------------------
+CATALOG_POLL_INTERVAL = float(os.getenv("CATALOG_POLL_INTERVAL", "5"))  # seconds
+CHROMA_SQLITE = "chroma.sqlite3"
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """An immutable view of the collections that were live at one point in time."""
+    store_root: str  # the generation directory the handles were opened on
+    handles: Dict[str, Chroma]
+    versions: Dict[str, str]
+    counts: Dict[str, int]
+    updated_at: Dict[str, str]
+    loaded_at: float = field(default_factory=time.time)
+
+
+class CollectionCatalog(Mapping):
+    """
+    Live mapping of collection name -> Chroma handle for one persist directory.
+
+    A background thread polls the published generation pointer, the manifest and the
+    Chroma SQLite file. When any of them changes, a new snapshot is built off to the side (unchanged collections keep
+    their handles) and swapped in with a single reference assignment, so requests
+    always see a complete catalog. Cached amendment/section/router indexes are
+    dropped so they reload from the rebuilt files, and subscribers are told which
+    collections changed (e.g. to rebuild BM25 retrievers).
+    """
+
+    def __init__(self, persist_root: str, embeddings, poll_interval: float = CATALOG_POLL_INTERVAL):
+        self.persist_root = persist_root
+        self.embeddings = embeddings
+        self.poll_interval = poll_interval
+        self._snapshot = CatalogSnapshot("", {}, {}, {}, {})
+        self._signature = None
+        self._listeners: List[Callable[[List[str]], None]] = []
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.refresh()
+
+    # Mapping interface: existing code keeps using `collections_dict[name]`
+    def __getitem__(self, name: str) -> Chroma:
+        return self._snapshot.handles[name]
+
+    def __iter__(self):
+        return iter(self._snapshot.handles)
+
+    def __len__(self) -> int:
+        return len(self._snapshot.handles)
+
+    @property
+    def snapshot(self) -> CatalogSnapshot:
+        return self._snapshot
+
+    def subscribe(self, listener: Callable[[List[str]], None]):
+        """Call `listener(changed_names)` after every swap."""
+        self._listeners.append(listener)
+
+    def _current_signature(self):
+        store_root = resolve_persist_root(self.persist_root)
+        signature = [store_root]
+        for name in (PROCESSED_LOG, CHROMA_SQLITE):
+            path = Path(store_root) / name
+            signature.append(path.stat().st_mtime_ns if path.exists() else None)
+        return tuple(signature)
+
+    def refresh(self, force: bool = False) -> List[str]:
+        """Reload if the store changed on disk. Returns the names that were added, updated or removed."""
+        with self._refresh_lock:
+            signature = self._current_signature()
+            if signature == self._signature and not force:
+                return []
+
+            old = self._snapshot
+            store_root = signature[0]
+            same_generation = store_root == old.store_root
+            handles, versions, counts, updated_at = {}, {}, {}, {}
+            for name, entry in load_manifest(store_root).items():
+                version = entry_version(entry)
+                if same_generation and name in old.handles and old.versions.get(name) == version:
+                    handles[name] = old.handles[name]
+                else:
+                    handles[name] = Chroma(persist_directory=store_root,
+                                           collection_name=name,
+                                           embedding_function=self.embeddings)
+                    apply_search_ef(handles[name], name)
+                versions[name] = version
+                counts[name] = handles[name]._collection.count()
+                updated_at[name] = entry.get("updated_at", "") if isinstance(entry, dict) else ""
+
+            if same_generation:
+                changed = sorted(
+                    {n for n in versions if old.versions.get(n) != versions[n]}
+                    | (set(old.versions) - set(versions))
+                )
+            else:
+                # Every handle now points at a new directory; the old one will be collected
+                changed = sorted(set(versions) | set(old.versions))
+            self._snapshot = CatalogSnapshot(store_root, handles, versions, counts, updated_at)
+            self._signature = signature
+
+        if changed and old.handles:
+            logging.info(f"Catalog {self.persist_root}: swapped in {changed}")
+        if changed:
+            for root in {old.store_root, store_root}:
+                clear_amendment_index(root)
+                clear_section_index(root)
+                clear_cached_router(root)
+            for listener in self._listeners:
+                try:
+                    listener(changed)
+                except Exception as e:
+                    logging.error(f"Catalog listener failed: {e}")
+        return changed
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                # A half-finished ingest can fail a read; keep serving the old snapshot
+                logging.warning(f"Catalog refresh of {self.persist_root} failed: {e}")
+
+    def start(self) -> "CollectionCatalog":
+        if self._thread is None and self.poll_interval > 0:
+            self._thread = threading.Thread(target=self._watch, name="collection-catalog", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def describe(self) -> List[Dict]:
+        snapshot = self._snapshot
+        return [
+            {
+                "name": name,
+                "chunks": snapshot.counts[name],
+                "version": snapshot.versions[name],
+                "updated_at": snapshot.updated_at[name],
+                "store_root": snapshot.store_root,
+            }
+            for name in sorted(snapshot.handles)
+        ]
+
+
+_catalogs: Dict[str, CollectionCatalog] = {}
+
+def get_catalog(persist_root: str, embeddings) -> CollectionCatalog:
+    """One watching catalog per persist directory per process."""
+    if persist_root not in _catalogs:
+        _catalogs[persist_root] = CollectionCatalog(persist_root, embeddings).start()
+    return _catalogs[persist_root]
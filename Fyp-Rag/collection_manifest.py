@@ -0,0 +1,56 @@
+import os
+import json
+import uuid
+from pathlib import Path
+from datetime import datetime
+from typing import Dict
+
+# -----------------------
+# Config
+# -----------------------
+PROCESSED_LOG = "processed_collections.json"
+
+# -----------------------
+# Manifest I/O
+# -----------------------
+def load_manifest(persist_root: str) -> dict:
+    """Read processed_collections.json from a persist directory ({} if missing)."""
+    log_path = Path(persist_root) / PROCESSED_LOG
+    if log_path.exists():
+        with open(log_path, "r") as f:
+            return json.load(f)
+    return {}
+
+def save_manifest(persist_root: str, data: dict):
+    """Write the manifest atomically so readers never see a half-written file."""
+    os.makedirs(persist_root, exist_ok=True)
+    log_path = Path(persist_root) / PROCESSED_LOG
+    tmp_path = log_path.with_suffix(".json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, log_path)
+
+# -----------------------
+# Content Versions
+# -----------------------
+def record_collection(processed: dict, collection_name: str, chunk_count: int) -> dict:
+    """
+    Mark a collection as (re)ingested. Every call issues a fresh content version,
+    which is what caches use to detect that a collection has changed.
+    """
+    entry = {
+        "version": uuid.uuid4().hex[:12],
+        "chunks": chunk_count,
+        "updated_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    processed[collection_name] = entry
+    return entry
+
+def entry_version(entry) -> str:
+    """Older manifests store plain `true`; treat those as version "1"."""
+    if isinstance(entry, dict):
+        return str(entry.get("version", "1"))
+    return "1" if entry else ""
+
+def collection_versions(persist_root: str) -> Dict[str, str]:
+    return {name: entry_version(entry) for name, entry in load_manifest(persist_root).items()}
@@ -0,0 +1,201 @@
+import os
+import json
+import logging
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import chromadb
+
+from collection_manifest import load_manifest
+from index_generations import resolve_persist_root
+
+# -----------------------
+# Config
+# -----------------------
+ROUTER_INDEX_FILE = "router_index.npz"
+ROUTER_CONFIG_FILE = "router_thresholds.json"
+ROUTER_CALIBRATION_FILE = "router_calibration.json"  # shipped off-topic questions
+ROUTER_EXEMPLARS = int(os.getenv("ROUTER_EXEMPLARS", "16"))
+# Cosine scores are model specific (mean-pooled legal-bert scores most English text high),
+# so there are no default thresholds: until `--calibrate` writes router_thresholds.json
+# (or both are set here) every question is "uncertain" and goes to the LLM
+ROUTER_ANSWERABLE_THRESHOLD = os.getenv("ROUTER_ANSWERABLE_THRESHOLD")
+ROUTER_OUT_OF_SCOPE_THRESHOLD = os.getenv("ROUTER_OUT_OF_SCOPE_THRESHOLD")
+ROUTER_MARGIN = float(os.getenv("ROUTER_MARGIN", "0.03"))
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def _farthest_point_exemplars(vectors: np.ndarray, k: int) -> np.ndarray:
+    """Pick k mutually distant chunk embeddings so exemplars cover the whole collection."""
+    if len(vectors) <= k:
+        return vectors
+    chosen = [int(np.argmax(vectors @ vectors.mean(axis=0)))]
+    best_sim = vectors @ vectors[chosen[0]]
+    for _ in range(k - 1):
+        nxt = int(np.argmin(best_sim))
+        chosen.append(nxt)
+        best_sim = np.maximum(best_sim, vectors @ vectors[nxt])
+    return vectors[chosen]
+
+# -----------------------
+# Index Builder
+# -----------------------
+def build_router_index(persist_root: str, exemplars: int = ROUTER_EXEMPLARS):
+    """Store one centroid plus `exemplars` representative chunk embeddings per collection."""
+    client = chromadb.PersistentClient(path=persist_root)
+    names, centroids, exemplar_vectors, exemplar_owner = [], [], [], []
+    for collection_name in load_manifest(persist_root):
+        rows = client.get_collection(collection_name).get(include=["embeddings"])
+        if rows["embeddings"] is None or len(rows["embeddings"]) == 0:
+            continue
+        vectors = _normalize(np.asarray(rows["embeddings"], dtype=np.float32))
+        owner = len(names)
+        names.append(collection_name)
+        centroids.append(_normalize(vectors.mean(axis=0)))
+        picked = _farthest_point_exemplars(vectors, exemplars)
+        exemplar_vectors.append(picked)
+        exemplar_owner.extend([owner] * len(picked))
+
+    if not names:
+        logging.warning("No embeddings found; router index not built")
+        return
+    np.savez(
+        Path(persist_root) / ROUTER_INDEX_FILE,
+        names=np.array(names),
+        centroids=np.stack(centroids),
+        exemplars=np.concatenate(exemplar_vectors),
+        exemplar_owner=np.array(exemplar_owner),
+    )
+    logging.info(f"Router index: {len(names)} collections, {len(exemplar_owner)} exemplars")
+
+# -----------------------
+# Routing
+# -----------------------
+@dataclass
+class RouteDecision:
+    status: str  # "answerable", "not_answerable" or "uncertain" (ask the LLM)
+    collections: List[str]
+    top_score: float
+    scores: Dict[str, float]
+
+
+class CollectionRouter:
+    def __init__(self, names, centroids, exemplars, exemplar_owner, embeddings,
+                 answerable: Optional[float] = ROUTER_ANSWERABLE_THRESHOLD,
+                 out_of_scope: Optional[float] = ROUTER_OUT_OF_SCOPE_THRESHOLD,
+                 margin: float = ROUTER_MARGIN):
+        self.names = [str(n) for n in names]
+        self.centroids = centroids
+        self.exemplars = exemplars
+        self.exemplar_owner = exemplar_owner
+        self.embeddings = embeddings
+        self.answerable = float(answerable) if answerable is not None else None
+        self.out_of_scope = float(out_of_scope) if out_of_scope is not None else None
+        self.margin = margin
+
+    @classmethod
+    def load(cls, persist_root: str, embeddings) -> Optional["CollectionRouter"]:
+        path = Path(persist_root) / ROUTER_INDEX_FILE
+        if not path.exists():
+            return None
+        data = np.load(path)
+        thresholds = {}
+        config_path = Path(persist_root) / ROUTER_CONFIG_FILE
+        if config_path.exists():
+            with open(config_path, "r") as f:
+                thresholds = json.load(f)
+        return cls(data["names"], data["centroids"], data["exemplars"], data["exemplar_owner"],
+                   embeddings, **thresholds)
+
+    def scores(self, query_vector) -> np.ndarray:
+        """Per-collection score: best of centroid similarity and nearest exemplar similarity."""
+        q = _normalize(np.asarray(query_vector, dtype=np.float32))
+        scores = self.centroids @ q
+        exemplar_scores = self.exemplars @ q
+        np.maximum.at(scores, self.exemplar_owner, exemplar_scores)
+        return scores
+
+    def route(self, question: str) -> RouteDecision:
+        if self.answerable is None or self.out_of_scope is None:
+            return RouteDecision("uncertain", [], 0.0, {})  # not calibrated: skip the embedding too
+        scores = self.scores(self.embeddings.embed_query(question))
+        top = float(scores.max())
+        by_name = {name: float(s) for name, s in zip(self.names, scores)}
+        if top >= self.answerable:
+            selected = [n for n, s in by_name.items() if s >= top - self.margin]
+            return RouteDecision("answerable", selected, top, by_name)
+        if top < self.out_of_scope:
+            return RouteDecision("not_answerable", [], top, by_name)
+        return RouteDecision("uncertain", [], top, by_name)
+
+    def calibrate(self, in_scope: List[str], out_of_scope: List[str]) -> Dict[str, float]:
+        """
+        Pick thresholds from labelled questions: answerable = lowest score that still
+        excludes 95% of off-topic questions, out_of_scope = highest score that still
+        keeps 95% of legal questions. Everything between goes to the LLM; when the two
+        distributions separate there is no such band and out_of_scope = answerable.
+        """
+        in_top = np.array([self.scores(self.embeddings.embed_query(q)).max() for q in in_scope])
+        out_top = np.array([self.scores(self.embeddings.embed_query(q)).max() for q in out_of_scope])
+        answerable = float(np.percentile(out_top, 95))
+        out = float(min(np.percentile(in_top, 5), answerable))
+        self.answerable, self.out_of_scope = answerable, out
+        return {"answerable": answerable, "out_of_scope": out, "margin": self.margin}
+
+
+_routers: Dict[str, Optional[CollectionRouter]] = {}
+
+def clear_cached_router(persist_root: str):
+    _routers.pop(persist_root, None)
+
+def load_router(persist_root: str, collections_dict) -> Optional[CollectionRouter]:
+    """Router sharing the query embedding model of the loaded collections (None if not built)."""
+    if persist_root not in _routers:
+        embeddings = next(iter(collections_dict.values())).embeddings if collections_dict else None
+        _routers[persist_root] = CollectionRouter.load(persist_root, embeddings) if embeddings else None
+    return _routers[persist_root]
+
+# -----------------------
+# Main
+# -----------------------
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Build or calibrate the local collection router")
+    parser.add_argument("--persist", default="chroma_storage")
+    parser.add_argument("--build", action="store_true", help="Rebuild router_index.npz")
+    parser.add_argument("--calibrate", nargs="?", const=ROUTER_CALIBRATION_FILE,
+                        help='JSON file {"in_scope": [...], "out_of_scope": [...]} of labelled questions '
+                             f'(default {ROUTER_CALIBRATION_FILE}; in_scope defaults to the golden set questions)')
+    args = parser.parse_args()
+
+    # The published generation, as the catalog reads it
+    persist_root = resolve_persist_root(args.persist)
+    if args.build:
+        build_router_index(persist_root)
+    if args.calibrate:
+        import torch
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+
+        embeddings = HuggingFaceEmbeddings(
+            model_name="nlpaueb/legal-bert-base-uncased",
+            model_kwargs={"device": "cuda" if torch.cuda.is_available() else "cpu"},
+        )
+        router = CollectionRouter.load(persist_root, embeddings)
+        if router is None:
+            raise SystemExit(f"No {ROUTER_INDEX_FILE} in {persist_root}; run with --build first")
+        with open(args.calibrate, "r") as f:
+            labelled = json.load(f)
+        if "in_scope" not in labelled:
+            from evaluate_retrieval import GOLDEN_SET, load_golden_set
+            labelled["in_scope"] = [q["question"] for q in load_golden_set(GOLDEN_SET)["questions"]]
+        thresholds = router.calibrate(labelled["in_scope"], labelled["out_of_scope"])
+        with open(Path(persist_root) / ROUTER_CONFIG_FILE, "w") as f:
+            json.dump(thresholds, f, indent=2)
+        logging.info(f"Router thresholds: {thresholds}")
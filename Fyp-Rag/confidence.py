@@ -0,0 +1,164 @@
+import os
+import json
+import math
+import logging
+import argparse
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+from metrics import span
+
+# -----------------------
+# Config
+# -----------------------
+# Below this confidence the question is answered with the abstention template, no LLM calls
+ABSTAIN_THRESHOLD = float(os.getenv("ABSTAIN_THRESHOLD", "0.25"))
+CONFIDENCE_PROBE_K = int(os.getenv("CONFIDENCE_PROBE_K", "8"))
+# Platt scaling of the cross-encoder logit: p = sigmoid(A * logit + B).
+# `python confidence.py --fit` fits A/B on the golden set and writes them to
+# CONFIDENCE_CALIBRATION_FILE; env vars override the file, the fallback is the raw logit.
+CONFIDENCE_CALIBRATION_FILE = os.getenv("CONFIDENCE_CALIBRATION_FILE", "confidence_calibration.json")
+
+def _load_calibration(path: str = CONFIDENCE_CALIBRATION_FILE) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+_calibration = _load_calibration()
+CONFIDENCE_PLATT_A = float(os.getenv("CONFIDENCE_PLATT_A", _calibration.get("platt_a", 1.0)))
+CONFIDENCE_PLATT_B = float(os.getenv("CONFIDENCE_PLATT_B", _calibration.get("platt_b", 0.0)))
+# Raw ms-marco logits are often negative for relevant partial matches, so an uncalibrated
+# confidence is reported but never used to abstain
+CONFIDENCE_CALIBRATED = bool(_calibration) or "CONFIDENCE_PLATT_A" in os.environ
+if not CONFIDENCE_CALIBRATED:
+    logging.warning("Confidence is uncalibrated (raw rerank logit), early abstention is off; "
+                    "run `python confidence.py --fit`")
+RERANK_WEIGHT = 0.7  # the remainder comes from the dense relevance score
+
+ABSTENTION_MESSAGE = (
+    "I don't have enough information in the available legal documents to answer this question. "
+    "Please ask about the Sri Lankan Government Acts that are loaded, for example the "
+    "Civil Aviation Act or the Economic Service Charge Act."
+)
+
+
+@dataclass
+class Evidence:
+    confidence: float
+    rerank_probability: float = 0.0
+    dense_score: float = 0.0
+    docs: List[Any] = field(default_factory=list)
+
+
+def _sigmoid(x: float) -> float:
+    return 1.0 / (1.0 + math.exp(-x))
+
+def combine_scores(rerank_logits, dense_scores) -> Evidence:
+    """Blend the best rerank probability with the best dense relevance (higher = closer) into [0, 1]."""
+    if len(rerank_logits) == 0:
+        return Evidence(confidence=0.0)
+    rerank_probability = max(
+        _sigmoid(CONFIDENCE_PLATT_A * float(s) + CONFIDENCE_PLATT_B) for s in rerank_logits
+    )
+    dense_score = min(1.0, max(0.0, max(dense_scores))) if len(dense_scores) else 0.0
+    confidence = RERANK_WEIGHT * rerank_probability + (1 - RERANK_WEIGHT) * dense_score
+    return Evidence(confidence, rerank_probability, dense_score)
+
+def probe_evidence(query: str, query_embedding, vector_db, cross_encoder,
+                   k: int = CONFIDENCE_PROBE_K, where: Optional[dict] = None) -> Evidence:
+    """
+    One vector search (reusing the query embedding, restricted by an optional Chroma
+    `where` filter) plus one local rerank batch. Returns the evidence confidence and the
+    probed documents, best first.
+    """
+    with span("dense_search"):
+        # Despite its name this returns raw Chroma distances (lower = closer)
+        hits = vector_db.similarity_search_by_vector_with_relevance_scores(query_embedding, k=k, filter=where)
+    if not hits:
+        return Evidence(confidence=0.0)
+    docs = [doc for doc, _ in hits]
+    with span("rerank"):
+        logits = cross_encoder.predict([[query, d.page_content] for d in docs])
+    to_relevance = vector_db._select_relevance_score_fn()  # matches the collection's hnsw:space
+    evidence = combine_scores(logits, [to_relevance(distance) for _, distance in hits])
+    evidence.docs = [doc for _, doc in sorted(zip(logits, docs), key=lambda pair: pair[0], reverse=True)]
+    logging.info(
+        f"Evidence confidence {evidence.confidence:.2f} "
+        f"(rerank {evidence.rerank_probability:.2f}, dense {evidence.dense_score:.2f})"
+    )
+    return evidence
+
+# -----------------------
+# Calibration
+# -----------------------
+def fit_platt(logits, labels, iterations: int = 100, l2: float = 1e-3):
+    """One-feature logistic regression (Newton's method): A, B of sigmoid(A * logit + B)."""
+    import numpy as np
+
+    x = np.asarray(logits, dtype=np.float64)
+    y = np.asarray(labels, dtype=np.float64)
+    features = np.stack([x, np.ones_like(x)], axis=1)
+    weights = np.zeros(2)
+    for _ in range(iterations):
+        p = 1.0 / (1.0 + np.exp(-features @ weights))
+        gradient = features.T @ (p - y) + l2 * weights
+        hessian = (features * (p * (1 - p))[:, None]).T @ features + l2 * np.eye(2)
+        step = np.linalg.solve(hessian, gradient)
+        weights -= step
+        if np.abs(step).max() < 1e-8:
+            break
+    return float(weights[0]), float(weights[1])
+
+# -----------------------
+# Main
+# -----------------------
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+
+    import numpy as np
+    import torch
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    from sentence_transformers import CrossEncoder
+
+    from evaluate_retrieval import GOLDEN_SET, EMBEDDING_MODEL, load_golden_set, build_eval_index
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Fit the Platt scaling of rerank confidence on the golden set")
+    parser.add_argument("--fit", action="store_true", help=f"Fit A/B and write {CONFIDENCE_CALIBRATION_FILE}")
+    parser.add_argument("--golden", default=GOLDEN_SET)
+    parser.add_argument("--k", type=int, default=CONFIDENCE_PROBE_K)
+    parser.add_argument("--index-dir", type=str, help="Reuse the eval index of evaluate_retrieval.py")
+    args = parser.parse_args()
+    if not args.fit:
+        parser.error("nothing to do (pass --fit)")
+
+    golden = load_golden_set(args.golden)
+    persist_dir = args.index_dir or tempfile.mkdtemp(prefix="golden-eval-")
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL, model_kwargs={"device": device})
+    cross_encoder = CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2")
+    logits, labels = [], []
+    try:
+        vs = build_eval_index(golden, args.golden, persist_dir, embeddings)
+        # The same candidates probe_evidence scores: the dense top k of every golden question
+        for q in golden["questions"]:
+            docs = vs.similarity_search(q["question"], k=args.k)
+            logits.extend(cross_encoder.predict([[q["question"], d.page_content] for d in docs]))
+            labels.extend((d.metadata.get("source"), d.metadata.get("page")) in q["relevant"] for d in docs)
+    finally:
+        if not args.index_dir:
+            shutil.rmtree(persist_dir, ignore_errors=True)
+
+    if not any(labels) or all(labels):
+        raise SystemExit("Need both relevant and irrelevant candidates to fit; check the golden set labels")
+    a, b = fit_platt(logits, labels)
+    probabilities = 1.0 / (1.0 + np.exp(-(a * np.asarray(logits) + b)))
+    positives = probabilities[np.asarray(labels, dtype=bool)]
+    print(f"Fitted on {len(labels)} (question, chunk) pairs, {int(sum(labels))} relevant: A={a:.4f} B={b:.4f}")
+    print(f"Median probability: relevant {np.median(positives):.2f}, "
+          f"irrelevant {np.median(probabilities[~np.asarray(labels, dtype=bool)]):.2f}")
+    with open(CONFIDENCE_CALIBRATION_FILE, "w") as f:
+        json.dump({"platt_a": a, "platt_b": b, "golden_version": golden["version"], "pairs": len(labels)}, f, indent=2)
+    print(f"Saved to {CONFIDENCE_CALIBRATION_FILE}; revisit ABSTAIN_THRESHOLD ({ABSTAIN_THRESHOLD}) on the calibrated scale")
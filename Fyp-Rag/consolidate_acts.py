@@ -0,0 +1,358 @@
+import os
+import re
+import json
+import hashlib
+import logging
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import torch
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_chroma import Chroma
+
+from embeddings_pipeline import extract_text_from_pdf
+from collection_manifest import load_manifest, save_manifest, record_collection
+from index_generations import new_generation
+from hnsw_config import hnsw_metadata, drop_if_hnsw_changed
+from legal_text import (
+    SECTION_HEADING_RE,
+    normalize_section,
+    parse_act_filename,
+    parse_amendment_references,
+)
+
+# -----------------------
+# Config
+# -----------------------
+CONSOLIDATED_SUFFIX = "-Consolidated"
+CONSOLIDATED_DIR = "consolidated"
+CURRENT_YEAR_SENTINEL = 9999  # valid_to of the version in force today
+PREAMBLE = "PREAMBLE"
+
+_BODY_START_RE = re.compile(r"the\s+following\b[^:—–]{0,200}?(?::\s*[-—–]*|[—–]+)", re.IGNORECASE)
+_NEW_SECTION_AS_RE = re.compile(r"have\s+effect\s+as\s+sections?\s+(\d{1,3}[A-Z]?)", re.IGNORECASE)
+_SUBSECTION_RE = re.compile(r"(?:repealing|repeal\s+of)\s+sub-?section\s+\((\w{1,4})\)", re.IGNORECASE)
+_WORD_SUBSTITUTION_RE = re.compile(
+    r"substitution\s+for\s+the\s+words?(?:\s+and\s+figures)?\s*[\"“'‘](.+?)[\"”'’]\s*,?\s*"
+    r"of\s+the\s+words?(?:\s+and\s+figures)?\s*[\"“'‘](.+?)[\"”'’]",
+    re.IGNORECASE | re.DOTALL,
+)
+
+# Gazette page furniture: the running title + page number at the top of each page, the
+# printer's line, and the margin notes that PyMuPDF emits after the body of the page
+_RUNNING_HEADER_RE = re.compile(
+    r"^(?:\d{1,3}|.*\(Amendment\)(?:\s*Act,\s*No\.\s*\d+\s+of\s+\d{4})?|Act,\s*No\.\s*\d+\s+of\s+\d{4})$",
+    re.IGNORECASE,
+)
+_PRINTER_LINE_RE = re.compile(r"^\d+\s*—\s*PL\s")
+_MARGIN_NOTE_START_RE = re.compile(
+    r"^(?:“[A-Z]|Amendment\s+of|Insertion\s+of|Replacement\s+of|Repeal\s+of|Short\s+title|Sinhala\s+text"
+    r"|Effective|Validation|Exemption|Retrospective)",
+    re.IGNORECASE,
+)
+_PARTIAL_TARGET_RE = re.compile(r"\b(?:sub-?sections?|(?:sub-?)?paragraphs?|proviso|definition)\b", re.IGNORECASE)
+MARGIN_NOTE_WIDTH = 24  # margin-note lines are narrower than any body line
+
+# -----------------------
+# Parsing
+# -----------------------
+def split_into_sections(pages: List[Tuple[str, int, str]]) -> List[Tuple[str, str, List[str]]]:
+    """
+    Split (source, page, text) pages into ordered (section, text, provenance) records.
+    Provenance entries are "file.pdf:page" for every page the section spans.
+    """
+    sections: List[Tuple[str, str, List[str]]] = []
+    current, buffer, provenance = PREAMBLE, [], []
+
+    def flush():
+        if buffer and "".join(buffer).strip():
+            sections.append((current, "\n".join(buffer).strip(), list(dict.fromkeys(provenance))))
+
+    for source, page_num, text in pages:
+        position = 0
+        for match in SECTION_HEADING_RE.finditer(text):
+            buffer.append(text[position: match.start()])
+            provenance.append(f"{source}:{page_num}")
+            flush()
+            current, buffer, provenance = normalize_section(match.group(1)), [], []
+            position = match.start()
+        buffer.append(text[position:])
+        provenance.append(f"{source}:{page_num}")
+    flush()
+    return sections
+
+def strip_page_furniture(text: str) -> str:
+    """Drop running headers, the printer's line and trailing margin notes from one amendment page."""
+    lines = text.split("\n")
+    while lines and _RUNNING_HEADER_RE.match(lines[0].strip()):
+        lines.pop(0)
+    # Margin notes ("Amendment of / section 2 of Act, / No. 13 of 2006.") trail the page as runs of
+    # short lines ending in "."; short body lines in between (table cells) are kept
+    start = len(lines)
+    while start and (len(lines[start - 1].strip()) <= MARGIN_NOTE_WIDTH or _PRINTER_LINE_RE.match(lines[start - 1].strip())):
+        start -= 1
+    kept, in_note = lines[:start], False
+    for line in lines[start:]:
+        stripped = line.strip()
+        if _PRINTER_LINE_RE.match(stripped):
+            continue
+        in_note = in_note or bool(_MARGIN_NOTE_START_RE.match(stripped))
+        if not in_note:
+            kept.append(line)
+        elif stripped.endswith("."):
+            in_note = False
+    return "\n".join(kept).strip()
+
+def split_amending_clauses(pages: List[Tuple[str, int, str]]) -> List[Tuple[str, str, List[str]]]:
+    """
+    Like split_into_sections, for an amending Act. Its clauses are numbered 1, 2, 3, ...; any
+    other heading ("10A. (1) The turnover ...") starts the text being inserted or substituted
+    and stays with the clause that introduces it.
+    """
+    clauses: List[Tuple[str, str, List[str]]] = []
+    for section, text, provenance in split_into_sections(pages):
+        numbered = sum(1 for clause in clauses if clause[0] != PREAMBLE)
+        if clauses and section != str(numbered + 1):
+            previous, previous_text, previous_provenance = clauses[-1]
+            clauses[-1] = (previous, f"{previous_text}\n{text}",
+                           list(dict.fromkeys(previous_provenance + provenance)))
+        else:
+            clauses.append((section, text, provenance))
+    return clauses
+
+def _operation_body(text: str) -> str:
+    """New text introduced by an amending section ("... the following:- <body>")."""
+    match = _BODY_START_RE.search(text)
+    body = text[match.end():] if match else ""
+    return body.strip().strip("\"“”").strip()
+
+def _whitespace_insensitive(words: str) -> re.Pattern:
+    """Match `words` across any line wrapping, including a break after a hyphen ("sub-\\nparagraph")."""
+    return re.compile(r"\s+".join(re.escape(word).replace(r"\-", r"-\s*") for word in words.split()))
+
+def _substitutes_subsection_or_section(text: str) -> bool:
+    """False when the substituted text replaces a paragraph, proviso or definition we cannot locate."""
+    if _SUBSECTION_RE.search(text):
+        return True
+    before = re.split(r"substitut", text, maxsplit=1, flags=re.IGNORECASE)[0]
+    return not _PARTIAL_TARGET_RE.search(before)
+
+def _replace_subsection(section_text: str, subsection: str, new_text: str) -> Optional[str]:
+    start = re.search(rf"(?m)(^|\s)\({re.escape(subsection)}\)\s", section_text)
+    if not start:
+        return None
+    following = re.compile(r"(?m)(^|\s)\(\w{1,4}\)\s")
+    nxt = following.search(section_text, start.end())
+    end = nxt.start() if nxt else len(section_text)
+    return section_text[: start.start()] + "\n" + new_text + "\n" + section_text[end:]
+
+# -----------------------
+# Consolidation
+# -----------------------
+class ConsolidatedAct:
+    """
+    A base Act as an ordered map of sections. Each section keeps its version history as
+    (valid_from, valid_to, text, provenance) so any point in time can be materialized.
+    """
+
+    def __init__(self, act: str, base_year: int, sections: List[Tuple[str, str, List[str]]]):
+        self.act = act
+        self.order: List[str] = []
+        self.history: Dict[str, List[Dict]] = {}
+        for section, text, provenance in sections:
+            if section in self.history:  # repeated heading numbers (schedules): keep them apart
+                section = f"{section}-{len(self.order)}"
+            self.order.append(section)
+            self.history[section] = [{
+                "valid_from": base_year,
+                "valid_to": CURRENT_YEAR_SENTINEL,
+                "text": text,
+                "provenance": provenance,
+            }]
+
+    def current_text(self, section: str) -> Optional[str]:
+        versions = self.history.get(section)
+        return versions[-1]["text"] if versions else None
+
+    def _set(self, section: str, text: str, year: int, provenance: List[str], after: Optional[str] = None):
+        versions = self.history.setdefault(section, [])
+        if versions:
+            versions[-1]["valid_to"] = year
+            provenance = versions[-1]["provenance"] + provenance
+        elif section not in self.order:
+            index = self.order.index(after) + 1 if after in self.order else len(self.order)
+            self.order.insert(index, section)
+        versions.append({
+            "valid_from": year,
+            "valid_to": CURRENT_YEAR_SENTINEL,
+            "text": text,
+            "provenance": list(dict.fromkeys(provenance)),
+        })
+
+    def apply(self, amending_text: str, year: int, act_label: str, provenance: List[str]) -> int:
+        """Apply the operations of one amending section. Returns how many were applied."""
+        applied = 0
+        body = _operation_body(amending_text)
+        for section, operation in parse_amendment_references(amending_text):
+            current = self.current_text(section)
+            if operation == "repeal":
+                if current is not None:
+                    self._set(section, f"[Section {section} repealed by {act_label}]", year, provenance)
+                    applied += 1
+            elif operation.startswith("insert_") and body:
+                new_section = _NEW_SECTION_AS_RE.search(amending_text)
+                new_id = normalize_section(new_section.group(1)) if new_section else f"{section}A"
+                anchor = section if operation == "insert_after" else None
+                self._set(new_id, body, year, provenance, after=anchor)
+                applied += 1
+            elif current is None:
+                continue
+            elif operation == "substitute" and body and _substitutes_subsection_or_section(amending_text):
+                subsection = _SUBSECTION_RE.search(amending_text)
+                replaced = _replace_subsection(current, subsection.group(1), body) if subsection else None
+                self._set(section, replaced or body, year, provenance)
+                applied += 1
+            else:
+                words = _WORD_SUBSTITUTION_RE.search(amending_text)
+                # The Act and the amendment wrap lines differently, so match the old words on any whitespace
+                old_words = _whitespace_insensitive(words.group(1)) if words else None
+                if old_words and old_words.search(current):
+                    new_words = " ".join(words.group(2).split())
+                    text = old_words.sub(lambda _: new_words, current)
+                else:
+                    # Wording we cannot apply mechanically is kept verbatim next to the section
+                    text = f"{current}\n[Amended by {act_label}: {amending_text.strip()}]"
+                self._set(section, text, year, provenance)
+                applied += 1
+        return applied
+
+    def snapshot(self, year: int) -> List[Dict]:
+        """The Act as in force during `year`."""
+        records = []
+        for section in self.order:
+            for version in self.history[section]:
+                if version["valid_from"] <= year < version["valid_to"]:
+                    records.append({"section": section, **version})
+        return records
+
+
+def load_act_pages(folder: str) -> List[Tuple[Dict, List[Tuple[str, int, str]]]]:
+    """[(filename info, [(source, page, text)])] for each PDF, oldest Act first."""
+    if not os.path.isdir(folder):
+        return []
+    docs = []
+    for name in os.listdir(folder):
+        if not name.lower().endswith(".pdf"):
+            continue
+        info = parse_act_filename(name) or {"act_number": 0, "year": 0}
+        pages = [(name, page, text) for page, text in extract_text_from_pdf(os.path.join(folder, name))]
+        docs.append(({**info, "source": name}, pages))
+    return sorted(docs, key=lambda d: (d[0]["year"], d[0]["act_number"]))
+
+
+def consolidate_act(act_path: str, act: str) -> Tuple[Optional[ConsolidatedAct], List[int]]:
+    base_docs = load_act_pages(os.path.join(act_path, "base"))
+    if not base_docs:
+        logging.warning(f"No base Act found for {act}")
+        return None, []
+    base_info, base_pages = base_docs[0]
+    consolidated = ConsolidatedAct(act, base_info["year"], split_into_sections(base_pages))
+
+    dates = [base_info["year"]]
+    for info, pages in load_act_pages(os.path.join(act_path, "amendment")):
+        label = f"Act No. {info['act_number']} of {info['year']}"
+        applied = 0
+        pages = [(source, page, strip_page_furniture(text)) for source, page, text in pages]
+        for _, text, provenance in split_amending_clauses(pages):
+            applied += consolidated.apply(text, info["year"], label, provenance)
+        logging.info(f"{act}: applied {applied} operations from {info['source']}")
+        dates.append(info["year"])
+    return consolidated, sorted(set(dates))
+
+# -----------------------
+# Materialize + index
+# -----------------------
+def write_snapshots(consolidated: ConsolidatedAct, dates: List[int], out_dir: str):
+    act_dir = Path(out_dir) / consolidated.act
+    act_dir.mkdir(parents=True, exist_ok=True)
+    for year in dates:
+        with open(act_dir / f"{year}.json", "w") as f:
+            json.dump({"act": consolidated.act, "as_of": year, "sections": consolidated.snapshot(year)}, f, indent=2)
+
+def index_consolidated(consolidated: ConsolidatedAct, persist_root: str) -> Tuple[str, int]:
+    """
+    Index every section version once into <Act>-Consolidated with valid_from/valid_to
+    years, so a point-in-time query is a metadata filter rather than a merge.
+    """
+    collection_name = f"{consolidated.act}{CONSOLIDATED_SUFFIX}"
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    embeddings = HuggingFaceEmbeddings(model_name="nlpaueb/legal-bert-base-uncased",
+                                       model_kwargs={"device": device})
+    drop_if_hnsw_changed(persist_root, collection_name)  # space/M/ef_construction need a rebuild
+    vector_db = Chroma(persist_directory=persist_root,
+                       collection_name=collection_name,
+                       embedding_function=embeddings,
+                       collection_metadata=hnsw_metadata(collection_name))
+    existing = vector_db.get(include=[])["ids"]
+    if existing:
+        vector_db.delete(ids=existing)
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+    texts, metadatas, ids = [], [], []
+    for section in consolidated.order:
+        for version in consolidated.history[section]:
+            document_id = hashlib.md5(f"{consolidated.act}|{section}|{version['valid_from']}".encode()).hexdigest()
+            for i, chunk in enumerate(splitter.split_text(version["text"])):
+                texts.append(chunk)
+                metadatas.append({
+                    "source": f"{consolidated.act} (consolidated)",
+                    "section": section,
+                    "chunk_id": i,
+                    "document_id": document_id,
+                    "valid_from": version["valid_from"],
+                    "valid_to": version["valid_to"],
+                    "is_current": version["valid_to"] == CURRENT_YEAR_SENTINEL,
+                    "provenance": "; ".join(version["provenance"]),
+                })
+                ids.append(f"{document_id}-c{i}")
+    if texts:
+        vector_db.add_texts(texts, metadatas=metadatas, ids=ids)
+    logging.info(f"Indexed {len(texts)} consolidated chunks into {collection_name}")
+    return collection_name, len(texts)
+
+def point_in_time_filter(year: Optional[int] = None) -> dict:
+    """Chroma `where` filter for the text in force in `year` (today when None)."""
+    if year is None:
+        return {"is_current": True}
+    return {"$and": [{"valid_from": {"$lte": year}}, {"valid_to": {"$gt": year}}]}
+
+def consolidate_all(base_folder: str, persist_root: str, out_dir: str = CONSOLIDATED_DIR):
+    processed = load_manifest(persist_root)
+    for act_name in sorted(os.listdir(base_folder)):
+        act_path = os.path.join(base_folder, act_name)
+        if not os.path.isdir(act_path):
+            continue
+        act = act_name.replace(" ", "_")
+        consolidated, dates = consolidate_act(act_path, act)
+        if consolidated is None:
+            continue
+        write_snapshots(consolidated, dates, os.path.join(persist_root, out_dir))
+        collection_name, chunk_count = index_consolidated(consolidated, persist_root)
+        record_collection(processed, collection_name, chunk_count)
+    save_manifest(persist_root, processed)
+
+# -----------------------
+# Main
+# -----------------------
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Build point-in-time consolidated Acts")
+    parser.add_argument("--acts", default="Acts", help="Folder with <Act>/base and <Act>/amendment PDFs")
+    parser.add_argument("--persist", default="chroma_storage", help="Chroma persist directory")
+    args = parser.parse_args()
+
+    with new_generation(args.persist) as staging_root:
+        consolidate_all(args.acts, staging_root)
+    logging.info("✅ Finished consolidating Acts")
@@ -0,0 +1,147 @@
+import os
+import re
+import hashlib
+import logging
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+try:
+    import tiktoken
+
+    _has_tiktoken = True
+except ImportError:
+    _has_tiktoken = False
+
+# -----------------------
+# Config
+# -----------------------
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+MIN_OVERLAP_CHARS = 30  # shorter shared edges are coincidence, not chunk overlap
+DEFAULT_TOKENIZER_MODEL = "gpt-3.5-turbo"
+
+# -----------------------
+# Token counting
+# -----------------------
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+def count_tokens(text: str, model: str = DEFAULT_TOKENIZER_MODEL) -> int:
+    """Tokens as the target model counts them (falls back to ~4 chars/token without tiktoken)."""
+    if _has_tiktoken:
+        return len(_encoding(model).encode(text))
+    return len(text) // 4 + 1
+
+# -----------------------
+# Dedup / merge helpers
+# -----------------------
+def _fingerprint(text: str) -> str:
+    normalized = re.sub(r"\s+", " ", text).strip().lower()
+    return hashlib.md5(normalized.encode("utf-8")).hexdigest()
+
+def _chunk_position(meta: dict) -> Tuple[int, ...]:
+    """Sort key from chunk_id, which is an int (chromadbpdf) or "i-j" (embeddings_pipeline)."""
+    parts = re.findall(r"\d+", str(meta.get("chunk_id", "")))
+    return tuple(int(p) for p in parts) or (0,)
+
+def _is_adjacent(a: Tuple[int, ...], b: Tuple[int, ...]) -> bool:
+    if len(a) != len(b):
+        return False
+    if a[:-1] == b[:-1] and b[-1] == a[-1] + 1:
+        return True
+    # "i-j" ids: the next paragraph starts at sub-chunk 0
+    return len(a) == 2 and b[0] == a[0] + 1 and b[1] == 0
+
+def merge_overlap(first: str, second: str) -> Optional[str]:
+    """Join two chunks if one contains the other or the end of `first` starts `second`."""
+    if second in first:
+        return first
+    if first in second:
+        return second
+    max_len = min(len(first), len(second))
+    for size in range(max_len, MIN_OVERLAP_CHARS - 1, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+    return None
+
+def _merge_page_group(docs: List[Tuple[int, Document]]) -> List[Tuple[int, Document]]:
+    """Merge overlapping or adjacent chunks of one page; keeps the best (lowest) rank."""
+    ordered = sorted(docs, key=lambda item: _chunk_position(item[1].metadata))
+    merged: List[Tuple[int, Document, Tuple[int, ...]]] = []
+    for rank, doc in ordered:
+        position = _chunk_position(doc.metadata)
+        if merged:
+            prev_rank, prev_doc, prev_position = merged[-1]
+            text = merge_overlap(prev_doc.page_content, doc.page_content)
+            if text is None and _is_adjacent(prev_position, position):
+                text = prev_doc.page_content + "\n" + doc.page_content
+            if text is not None:
+                merged[-1] = (
+                    min(prev_rank, rank),
+                    Document(page_content=text, metadata=dict(prev_doc.metadata)),
+                    position,
+                )
+                continue
+        merged.append((rank, doc, position))
+    return [(rank, doc) for rank, doc, _ in merged]
+
+# -----------------------
+# Packing
+# -----------------------
+def format_document(doc: Document) -> str:
+    return f"Source: {doc.metadata.get('source', 'Unknown')}\nContent: {doc.page_content}"
+
+def pack_context(
+    docs: List[Document],
+    budget_tokens: int = CONTEXT_TOKEN_BUDGET,
+    model: str = DEFAULT_TOKENIZER_MODEL,
+) -> List[Document]:
+    """
+    Turn retrieved chunks into a bounded context:
+    1. order by `relevance_score` metadata when present (input order otherwise),
+    2. drop chunks whose normalized text was already seen,
+    3. merge overlapping/adjacent chunks from the same source page,
+    4. greedily keep the most relevant blocks that fit in `budget_tokens`.
+    """
+    if not docs:
+        return []
+    ranked = sorted(
+        enumerate(docs),
+        key=lambda item: (-item[1].metadata.get("relevance_score", 0.0), item[0]),
+    )
+
+    seen, unique = set(), []
+    for rank, (_, doc) in enumerate(ranked):
+        fingerprint = _fingerprint(doc.page_content)
+        if fingerprint in seen:
+            continue
+        seen.add(fingerprint)
+        unique.append((rank, doc))
+
+    by_page: Dict[Tuple, List[Tuple[int, Document]]] = {}
+    for rank, doc in unique:
+        meta = doc.metadata
+        key = (meta.get("source"), meta.get("page", meta.get("page_number")))
+        by_page.setdefault(key, []).append((rank, doc))
+    blocks = sorted(
+        (block for group in by_page.values() for block in _merge_page_group(group)),
+        key=lambda item: item[0],
+    )
+
+    packed, used = [], 0
+    for _, doc in blocks:
+        cost = count_tokens(format_document(doc), model)
+        if used + cost > budget_tokens:
+            continue
+        packed.append(doc)
+        used += cost
+
+    logging.info(
+        f"Packed {len(docs)} retrieved chunks into {len(packed)} blocks (~{used}/{budget_tokens} tokens)"
+    )
+    return packed
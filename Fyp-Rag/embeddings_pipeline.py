@@ -1,9 +1,9 @@
 import os
+import re
 import uuid
 import fitz  # PyMuPDF
 import torch
 import logging
-import json
 from pathlib import Path
 from datetime import datetime
 from typing import List, Tuple
@@ -13,10 +13,25 @@ from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_chroma import Chroma
 
+from collection_manifest import load_manifest, save_manifest, record_collection
+from parent_store import ParentStore
+from amendment_index import build_amendment_index
+from section_index import build_section_index
+from collection_router import build_router_index
+from metadata_filters import document_metadata
+from index_generations import new_generation
+from hnsw_config import hnsw_metadata, drop_if_hnsw_changed
+
 # -----------------------
 # Config
 # -----------------------
-PROCESSED_LOG = "processed_collections.json"
+# "paragraph": embed whole paragraphs (default)
+# "parent_child": embed sentences/subsections, keep paragraphs as parents in parents.sqlite
+INDEX_GRANULARITY = os.getenv("INDEX_GRANULARITY", "paragraph")
+MIN_CHILD_LENGTH = 60
+
+# Break before subsection markers such as "(2)" / "(b)" and after sentence ends
+_CHILD_SPLIT_RE = re.compile(r"\n(?=\(\w{1,4}\)\s)|(?<=[.;:])\s+(?=[A-Z(])")
 
 # -----------------------
 # PDF Text Extraction
@@ -48,6 +63,7 @@ def process_pdf(pdf_path: str, min_paragraph_length: int = 50, max_paragraph_len
     pages = extract_text_from_pdf(pdf_path)
     doc_id = uuid.uuid5(uuid.NAMESPACE_URL, Path(pdf_path).resolve().as_uri()).hex
     upload_date = datetime.now().strftime("%Y-%m-%d")
+    act_meta = document_metadata(pdf_path)
 
     chunks, metadatas, ids = [], [], []
 
@@ -72,61 +88,123 @@ def process_pdf(pdf_path: str, min_paragraph_length: int = 50, max_paragraph_len
                     "page": page_num,
                     "chunk_id": f"{i}-{j}",
                     "document_id": doc_id,
-                    "upload_date": upload_date
+                    "upload_date": upload_date,
+                    **act_meta
                 })
                 ids.append(f"{doc_id}-p{page_num}-c{i}-{j}")
 
     return chunks, metadatas, ids
 
+def split_child_chunks(parent_text: str, min_length: int = MIN_CHILD_LENGTH) -> List[str]:
+    """Split a parent paragraph into sentence / subsection children, merging fragments."""
+    children = []
+    for piece in _CHILD_SPLIT_RE.split(parent_text):
+        piece = piece.strip()
+        if not piece:
+            continue
+        if children and len(children[-1]) < min_length:
+            children[-1] = f"{children[-1]} {piece}"
+        else:
+            children.append(piece)
+    if len(children) > 1 and len(children[-1]) < min_length:
+        children[-2] = f"{children[-2]} {children.pop()}"
+    return children
+
+def process_pdf_parent_child(pdf_path: str, min_paragraph_length: int = 50):
+    """
+    Convert one PDF into child chunks for the vector index plus parent paragraphs for
+    the side store. Each child's metadata carries the `parent_id` it was cut from.
+    """
+    pages = extract_text_from_pdf(pdf_path)
+    doc_id = uuid.uuid5(uuid.NAMESPACE_URL, Path(pdf_path).resolve().as_uri()).hex
+    upload_date = datetime.now().strftime("%Y-%m-%d")
+    act_meta = document_metadata(pdf_path)
+
+    chunks, metadatas, ids, parents = [], [], [], []
+
+    for page_num, text in pages:
+        paragraphs = [p.strip() for p in text.split("\n\n") if p.strip()]
+        for i, paragraph in enumerate(paragraphs):
+            if len(paragraph) < min_paragraph_length:
+                continue
+
+            parent_id = f"{doc_id}-p{page_num}-s{i}"
+            base_meta = {
+                "source": Path(pdf_path).name,
+                "path": str(Path(pdf_path).resolve()),
+                "page": page_num,
+                "document_id": doc_id,
+                "upload_date": upload_date,
+                **act_meta
+            }
+            parents.append((parent_id, paragraph, {**base_meta, "chunk_id": f"{i}"}))
+
+            for j, child in enumerate(split_child_chunks(paragraph)):
+                chunks.append(child)
+                metadatas.append({**base_meta, "chunk_id": f"{i}-{j}", "parent_id": parent_id})
+                ids.append(f"{parent_id}-c{j}")
+
+    return chunks, metadatas, ids, parents
+
 # -----------------------
 # Collection Builder
 # -----------------------
-def build_collection(pdf_dir: str, persist_dir: str, collection_name: str):
+def load_embeddings():
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    return HuggingFaceEmbeddings(model_name="nlpaueb/legal-bert-base-uncased",
+                                 model_kwargs={"device": device})
+
+def build_collection(pdf_dir: str, persist_dir: str, collection_name: str,
+                     granularity: str = INDEX_GRANULARITY, embeddings=None):
     """Process all PDFs in a directory into a Chroma collection"""
     pdf_files = [os.path.join(pdf_dir, f) for f in os.listdir(pdf_dir) if f.lower().endswith(".pdf")]
     if not pdf_files:
         logging.warning(f"No PDFs found in {pdf_dir}")
-        return
+        return 0
 
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    embeddings = HuggingFaceEmbeddings(model_name="nlpaueb/legal-bert-base-uncased",
-                                       model_kwargs={"device": device})
+    embeddings = embeddings or load_embeddings()
 
     vector_db = Chroma(persist_directory=persist_dir,
                        collection_name=collection_name,
-                       embedding_function=embeddings)
+                       embedding_function=embeddings,
+                       collection_metadata=hnsw_metadata(collection_name))
 
-    all_chunks, all_metas, all_ids = [], [], []
+    all_chunks, all_metas, all_ids, all_parents = [], [], [], []
     for pdf_path in pdf_files:
-        # Call process_pdf without passing splitter
-        chunks, metas, ids = process_pdf(pdf_path)
+        if granularity == "parent_child":
+            chunks, metas, ids, parents = process_pdf_parent_child(pdf_path)
+            all_parents.extend(parents)
+        else:
+            # Call process_pdf without passing splitter
+            chunks, metas, ids = process_pdf(pdf_path)
         all_chunks.extend(chunks)
         all_metas.extend(metas)
         all_ids.extend(ids)
 
+    if all_parents:
+        parent_store = ParentStore(persist_dir)
+        parent_store.delete_collection(collection_name)
+        parent_store.put_many(collection_name, all_parents)
+        logging.info(f"Stored {len(all_parents)} parent sections for collection: {collection_name}")
+
     if all_chunks:
         vector_db.add_texts(all_chunks, metadatas=all_metas, ids=all_ids)
         logging.info(f"✅ Added {len(all_chunks)} chunks to collection: {collection_name}")
+    return len(all_chunks)
 
 # -----------------------
 # Master Runner
 # -----------------------
 def load_processed_log(persist_root: str) -> dict:
-    log_path = Path(persist_root) / PROCESSED_LOG
-    if log_path.exists():
-        with open(log_path, "r") as f:
-            return json.load(f)
-    return {}
+    return load_manifest(persist_root)
 
 def save_processed_log(persist_root: str, data: dict):
-    os.makedirs(persist_root, exist_ok=True)
-    log_path = Path(persist_root) / PROCESSED_LOG
-    with open(log_path, "w") as f:
-        json.dump(data, f, indent=2)
+    save_manifest(persist_root, data)
 
-def process_all_acts(base_folder: str, persist_root: str):
+def process_all_acts(base_folder: str, persist_root: str, embeddings=None):
     """Iterate over Acts and build collections only for new Acts"""
     processed = load_processed_log(persist_root)
+    embeddings = embeddings or load_embeddings()  # load the model once, not per collection
 
     for act_name in os.listdir(base_folder):
         act_path = os.path.join(base_folder, act_name)
@@ -142,14 +220,19 @@ def process_all_acts(base_folder: str, persist_root: str):
         for folder_type, collection_name in collections.items():
             folder_path = os.path.join(act_path, folder_type)
             if os.path.exists(folder_path):
-                if collection_name in processed:
+                # A changed HNSW space/M/ef_construction only applies to a rebuilt collection
+                if collection_name in processed and not drop_if_hnsw_changed(persist_root, collection_name):
                     logging.info(f"Skipping already processed collection: {collection_name}")
                     continue
 
-                build_collection(folder_path, persist_root, collection_name)
-                processed[collection_name] = True
+                chunk_count = build_collection(folder_path, persist_root, collection_name,
+                                               embeddings=embeddings)
+                record_collection(processed, collection_name, chunk_count)
 
     save_processed_log(persist_root, processed)
+    build_amendment_index(persist_root)
+    build_section_index(persist_root)
+    build_router_index(persist_root)
 
 # -----------------------
 # Main
@@ -159,7 +242,9 @@ if __name__ == "__main__":
     base_folder = "Acts"
     persist_root = "chroma_storage"
 
-    process_all_acts(base_folder, persist_root)
+    # Serving processes keep reading the live generation until this one is published
+    with new_generation(persist_root) as staging_root:
+        process_all_acts(base_folder, staging_root)
     logging.info("✅ Finished embedding all Acts into ChromaDB")
 
 
@@ -0,0 +1,230 @@
+import os
+import json
+import math
+import time
+import shutil
+import asyncio
+import logging
+import argparse
+import tempfile
+from typing import Callable, Dict, List, Set, Tuple
+
+import numpy as np
+import torch
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from langchain_core.language_models import FakeListChatModel
+from langchain.retrievers import BM25Retriever, EnsembleRetriever
+
+from embeddings_pipeline import process_pdf
+from chromadbpdf import (
+    cross_encoder,
+    retrieve_per_document_hits,
+    gate_documents,
+    amap_step,
+    hierarchical_reduce,
+)
+
+# -----------------------
+# Config
+# -----------------------
+GOLDEN_SET = os.getenv("GOLDEN_SET", "golden_set.json")
+EVAL_COLLECTION = "golden_eval"
+EMBEDDING_MODEL = "nlpaueb/legal-bert-base-uncased"
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+CONFIGS = ("dense", "bm25", "hybrid", "hybrid_rerank", "map_reduce")
+# The map-reduce configuration runs its LLM calls against this canned reply, so
+# its latency is retrieval + gating + orchestration, with no network involved
+STUB_ANSWER = "The provision is set out in the retrieved section (see: golden_eval)."
+
+Relevant = Set[Tuple[str, int]]  # {(source file name, 1-based page)}
+
+
+# -----------------------
+# Golden set
+# -----------------------
+def load_golden_set(path: str) -> Dict:
+    with open(path, "r") as f:
+        golden = json.load(f)
+    for q in golden["questions"]:
+        q["relevant"] = {(e["source"], int(p)) for e in q["expected"] for p in e["pages"]}
+    return golden
+
+def build_eval_index(golden: Dict, golden_path: str, persist_dir: str, embeddings) -> Chroma:
+    """Index the golden corpus with the production paragraph chunker, or reuse an existing index."""
+    vs = Chroma(persist_directory=persist_dir, embedding_function=embeddings, collection_name=EVAL_COLLECTION)
+    if vs._collection.count() > 0:
+        logging.info(f"Reusing eval index in {persist_dir} ({vs._collection.count()} chunks)")
+        return vs
+
+    base_dir = os.path.dirname(os.path.abspath(golden_path))
+    for rel_path in golden["corpus"]:
+        chunks, metadatas, ids = process_pdf(os.path.join(base_dir, rel_path))
+        if not chunks:
+            logging.warning(f"No text extracted from {rel_path}")
+            continue
+        vs.add_texts(texts=chunks, metadatas=metadatas, ids=ids)
+        logging.info(f"Indexed {len(chunks)} chunks from {rel_path}")
+    return vs
+
+def check_labels(golden: Dict, corpus_docs: List[Document]):
+    """Warn about labels that point at pages the index has no chunk for (e.g. after a chunker change)."""
+    indexed = {(d.metadata.get("source"), d.metadata.get("page")) for d in corpus_docs}
+    for q in golden["questions"]:
+        missing = sorted(q["relevant"] - indexed)
+        if missing:
+            logging.warning(f"{q['id']}: expected pages not in the index: {missing}")
+
+# -----------------------
+# Metrics
+# -----------------------
+def _relevant_ranks(docs: List[Document], relevant: Relevant, k: int) -> List[int]:
+    """1-based ranks (within the top k) of the first chunk for each relevant page."""
+    seen, ranks = set(), []
+    for rank, doc in enumerate(docs[:k], start=1):
+        key = (doc.metadata.get("source"), doc.metadata.get("page"))
+        if key in relevant and key not in seen:
+            seen.add(key)
+            ranks.append(rank)
+    return ranks
+
+def score_ranking(docs: List[Document], relevant: Relevant, k: int) -> Dict[str, float]:
+    """recall@k over labelled pages, reciprocal rank and binary nDCG@k."""
+    ranks = _relevant_ranks(docs, relevant, k)
+    dcg = sum(1 / math.log2(rank + 1) for rank in ranks)
+    ideal = sum(1 / math.log2(rank + 1) for rank in range(1, min(len(relevant), k) + 1))
+    return {
+        "recall": len(ranks) / len(relevant),
+        "rr": 1 / ranks[0] if ranks else 0.0,
+        "ndcg": dcg / ideal if ideal else 0.0,
+    }
+
+def summarize(rows: List[Dict], k: int) -> Dict[str, float]:
+    latencies = [r["latency_ms"] for r in rows]
+    return {
+        f"recall@{k}": float(np.mean([r["recall"] for r in rows])),
+        "mrr": float(np.mean([r["rr"] for r in rows])),
+        f"ndcg@{k}": float(np.mean([r["ndcg"] for r in rows])),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "questions": len(rows),
+    }
+
+# -----------------------
+# Retriever configurations
+# -----------------------
+def stub_map_reduce(vs_dict: Dict[str, Chroma], question: str, k: int, llm) -> List[Document]:
+    """
+    The path answer_question_map_reduce takes (retrieve, gate, map, reduce) with `llm`
+    standing in for the real model. Returns the mapped chunks, best document first.
+    """
+    per_doc_hits, doc_catalog = retrieve_per_document_hits(vs_dict, question, k)
+    gated_hits, skipped = gate_documents(question, per_doc_hits)
+
+    async def answer():
+        per_doc_answers = await amap_step(llm, question, gated_hits, doc_catalog)
+        return await hierarchical_reduce(llm, question, per_doc_answers, doc_catalog, skipped)
+
+    asyncio.run(answer())
+    # Documents come out of the gate best-first; their chunks keep hybrid order
+    return [d for hits in gated_hits.values() for d in hits]
+
+def make_retrievers(vs: Chroma, corpus_docs: List[Document], k: int) -> Dict[str, Callable[[str], List[Document]]]:
+    """question -> ranked chunks, one callable per configuration."""
+    bm25 = BM25Retriever.from_documents(corpus_docs)
+    bm25.k = k
+    hybrid = EnsembleRetriever(
+        retrievers=[bm25, vs.as_retriever(search_kwargs={"k": k})], weights=[0.5, 0.5]
+    )
+    bm25_wide = BM25Retriever.from_documents(corpus_docs)
+    bm25_wide.k = RERANK_CANDIDATES
+    hybrid_wide = EnsembleRetriever(
+        retrievers=[bm25_wide, vs.as_retriever(search_kwargs={"k": RERANK_CANDIDATES})], weights=[0.5, 0.5]
+    )
+    stub_llm = FakeListChatModel(responses=[STUB_ANSWER], cache=False)
+
+    def hybrid_rerank(question: str) -> List[Document]:
+        candidates = hybrid_wide.invoke(question)
+        scores = cross_encoder.predict([[question, d.page_content] for d in candidates])
+        ranked = sorted(zip(scores, range(len(candidates))), key=lambda x: x[0], reverse=True)
+        return [candidates[i] for _, i in ranked]
+
+    return {
+        "dense": lambda q: vs.similarity_search(q, k=k),
+        "bm25": bm25.invoke,
+        "hybrid": hybrid.invoke,
+        "hybrid_rerank": hybrid_rerank,
+        "map_reduce": lambda q: stub_map_reduce({EVAL_COLLECTION: vs}, q, k, stub_llm),
+    }
+
+def run_config(name: str, retrieve: Callable[[str], List[Document]], questions: List[Dict], k: int) -> List[Dict]:
+    retrieve(questions[0]["question"])  # warm-up, so model loading is not counted
+    rows = []
+    for q in questions:
+        start = time.perf_counter()
+        docs = retrieve(q["question"])
+        latency_ms = (time.perf_counter() - start) * 1000
+        rows.append({
+            "id": q["id"],
+            "latency_ms": latency_ms,
+            "retrieved": [[d.metadata.get("source"), d.metadata.get("page")] for d in docs[:k]],
+            **score_ranking(docs, q["relevant"], k),
+        })
+    logging.info(f"[{name}] evaluated {len(rows)} questions")
+    return rows
+
+def print_table(report: Dict[str, Dict], k: int):
+    header = f"{'config':<15}{f'recall@{k}':>11}{'MRR':>8}{f'nDCG@{k}':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, s in report.items():
+        print(f"{name:<15}{s[f'recall@{k}']:>11.3f}{s['mrr']:>8.3f}{s[f'ndcg@{k}']:>9.3f}"
+              f"{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}{s['p99_ms']:>10.1f}")
+
+# -----------------------
+# Main
+# -----------------------
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Score retriever configurations against the golden set")
+    parser.add_argument("--golden", default=GOLDEN_SET)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--configs", type=str, default=",".join(CONFIGS),
+                        help=f"Comma-separated subset of {', '.join(CONFIGS)}")
+    parser.add_argument("--index-dir", type=str,
+                        help="Keep the eval index here and reuse it on later runs (default: a temp dir)")
+    parser.add_argument("--output", type=str, help="Write the report and per-question rankings as JSON")
+    args = parser.parse_args()
+
+    configs = [c.strip() for c in args.configs.split(",") if c.strip()]
+    unknown = set(configs) - set(CONFIGS)
+    if unknown:
+        parser.error(f"Unknown configs: {sorted(unknown)}")
+
+    golden = load_golden_set(args.golden)
+    persist_dir = args.index_dir or tempfile.mkdtemp(prefix="golden-eval-")
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL, model_kwargs={"device": device})
+    try:
+        vs = build_eval_index(golden, args.golden, persist_dir, embeddings)
+        raw = vs._collection.get(include=["documents", "metadatas"])
+        corpus_docs = [Document(page_content=t, metadata=m) for t, m in zip(raw["documents"], raw["metadatas"])]
+        check_labels(golden, corpus_docs)
+
+        retrievers = make_retrievers(vs, corpus_docs, args.k)
+        details = {name: run_config(name, retrievers[name], golden["questions"], args.k) for name in configs}
+    finally:
+        if not args.index_dir:
+            shutil.rmtree(persist_dir, ignore_errors=True)
+
+    report = {name: summarize(rows, args.k) for name, rows in details.items()}
+    print(f"\n=== Retrieval evaluation (golden set v{golden['version']}, "
+          f"{len(golden['questions'])} questions, k={args.k}) ===")
+    print_table(report, args.k)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"golden_version": golden["version"], "k": args.k,
+                       "report": report, "details": details}, f, indent=2)
@@ -0,0 +1,194 @@
+import re
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from pydantic import ConfigDict
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun, Callbacks
+from langchain_core.documents import BaseDocumentCompressor, Document
+from langchain_core.retrievers import BaseRetriever
+
+from metrics import span
+
+# -----------------------
+# Legal synonym / abbreviation dictionary
+# -----------------------
+LEGAL_SYNONYMS: Dict[str, List[str]] = {
+    "esc": ["economic service charge"],
+    "economic service charge": ["esc", "service charge"],
+    "caasl": ["civil aviation authority of sri lanka"],
+    "civil aviation authority": ["caasl", "authority"],
+    "dg": ["director-general"],
+    "director general": ["director-general"],
+    "commissioner general": ["commissioner-general of inland revenue"],
+    "cgir": ["commissioner-general of inland revenue"],
+    "ird": ["inland revenue department"],
+    "act": ["enactment", "principal enactment"],
+    "amendment": ["amending act", "amended"],
+    "repealed": ["repeal", "omitted"],
+    "section": ["s.", "provision"],
+    "subsection": ["sub-section"],
+    "penalty": ["fine", "punishment", "offence"],
+    "fine": ["penalty"],
+    "offence": ["offense", "contravention", "guilty"],
+    "licence": ["license", "permit", "certificate"],
+    "license": ["licence"],
+    "aircraft": ["aeroplane", "airplane"],
+    "airport": ["aerodrome"],
+    "aerodrome": ["airport"],
+    "airline": ["air operator", "carrier"],
+    "tax": ["charge", "levy"],
+    "rate": ["percentage", "per centum"],
+    "turnover": ["aggregate turnover", "liable turnover"],
+    "exempt": ["exemption", "not liable"],
+    "minister": ["minister in charge of the subject"],
+    "regulations": ["rules", "orders"],
+    "carriage by air": ["air carriage", "montreal convention"],
+    "passenger": ["traveller"],
+    "compensation": ["damages", "liability"],
+}
+
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.;:])\s+(?=[A-Z(\"'])|\n{2,}|\n(?=\(\w{1,4}\)\s)")
+
+
+# -----------------------
+# Local query expansion
+# -----------------------
+class LocalQueryExpander:
+    """
+    Replacement for MultiQueryRetriever's LLM call: builds query variants from the
+    synonym dictionary and from the glossary terms closest to the query embedding.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        synonyms: Dict[str, List[str]] = LEGAL_SYNONYMS,
+        max_variants: int = 3,
+        neighbour_threshold: float = 0.6,
+    ):
+        self.embeddings = embeddings
+        self.synonyms = synonyms
+        self.max_variants = max_variants
+        self.neighbour_threshold = neighbour_threshold
+        self._terms = sorted({t for k, v in synonyms.items() for t in [k, *v]})
+        self._term_vectors = None
+
+    def _glossary_vectors(self) -> np.ndarray:
+        if self._term_vectors is None:
+            vectors = np.asarray(self.embeddings.embed_documents(self._terms), dtype=np.float32)
+            self._term_vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        return self._term_vectors
+
+    def dictionary_variants(self, query: str) -> List[str]:
+        lowered = query.lower()
+        variants = []
+        for term, replacements in self.synonyms.items():
+            pattern = re.compile(rf"\b{re.escape(term)}\b", re.IGNORECASE)
+            if not pattern.search(lowered):
+                continue
+            for replacement in replacements:
+                variants.append(pattern.sub(replacement, query, count=1))
+        return variants
+
+    def neighbour_terms(self, query: str, top_n: int = 3) -> List[str]:
+        query_vec = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        query_vec /= np.linalg.norm(query_vec) or 1.0
+        scores = self._glossary_vectors() @ query_vec
+        best = np.argsort(-scores)[:top_n]
+        lowered = query.lower()
+        return [
+            self._terms[i] for i in best
+            if scores[i] >= self.neighbour_threshold and self._terms[i] not in lowered
+        ]
+
+    def expand(self, query: str) -> List[str]:
+        queries = [query]
+        for variant in self.dictionary_variants(query):
+            if variant not in queries:
+                queries.append(variant)
+        neighbours = self.neighbour_terms(query)
+        if neighbours:
+            queries.append(f"{query} {' '.join(neighbours)}")
+        return queries[: self.max_variants + 1]
+
+
+class LocalMultiQueryRetriever(BaseRetriever):
+    """Runs the base retriever once per locally expanded query and merges unique hits."""
+
+    retriever: BaseRetriever
+    expander: Any
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        with span("query_expansion"):
+            queries = self.expander.expand(query)
+        logging.info(f"Fast-path query variants: {queries}")
+        unique, seen = [], set()
+        for q in queries:
+            for doc in self.retriever.invoke(q, config={"callbacks": run_manager.get_child()}):
+                key = (doc.page_content, doc.metadata.get("source"), doc.metadata.get("page_number"))
+                if key not in seen:
+                    seen.add(key)
+                    unique.append(doc)
+        return unique
+
+
+# -----------------------
+# Local extractive compression
+# -----------------------
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_SPLIT_RE.split(text) if s and len(s.strip()) > 15]
+
+
+class SentenceExtractCompressor(BaseDocumentCompressor):
+    """
+    Replacement for LLMChainExtractor: scores every sentence of every retrieved chunk
+    against the query with the cross-encoder in a single batch and keeps the best ones,
+    in their original order. Chunks too short to split (headings, one-line sections)
+    are kept whole. `min_score` is a raw ms-marco logit, where partial matches are often
+    negative; leave it unset unless fitted on the benchmark, or chunks get dropped.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    cross_encoder: Any
+    max_sentences_per_doc: int = 4
+    min_score: Optional[float] = None
+
+    def compress_documents(
+        self,
+        documents: Sequence[Document],
+        query: str,
+        callbacks: Optional[Callbacks] = None,
+    ) -> Sequence[Document]:
+        per_doc = [split_sentences(d.page_content) for d in documents]
+        pairs = [[query, s] for sentences in per_doc for s in sentences]
+        scores = []
+        if pairs:
+            with span("compress"):
+                scores = self.cross_encoder.predict(pairs)
+
+        compressed, offset = [], 0
+        for doc, sentences in zip(documents, per_doc):
+            if not sentences:
+                compressed.append(doc)  # nothing long enough to extract from; keep it whole
+                continue
+            doc_scores = scores[offset: offset + len(sentences)]
+            offset += len(sentences)
+            ranked = sorted(range(len(sentences)), key=lambda i: doc_scores[i], reverse=True)
+            keep = sorted(
+                i for i in ranked[: self.max_sentences_per_doc]
+                if self.min_score is None or doc_scores[i] >= self.min_score
+            )
+            if not keep:
+                continue
+            compressed.append(
+                Document(
+                    page_content=" ".join(sentences[i] for i in keep),
+                    metadata={**doc.metadata, "extract_score": float(max(doc_scores[i] for i in keep))},
+                )
+            )
+        return compressed
@@ -0,0 +1,119 @@
+import os
+import json
+import logging
+from typing import Any, Dict
+
+import chromadb
+
+# -----------------------
+# Config
+# -----------------------
+# {"*": {...defaults...}, "<collection>": {"space": "cosine", "M": 32, "ef_construction": 200, "ef_search": 64}}
+HNSW_CONFIG_FILE = os.getenv("HNSW_CONFIG_FILE", "hnsw_config.json")
+HNSW_DEFAULTS = {
+    # Chroma's own defaults, so collections built without a config behave as before
+    "space": os.getenv("HNSW_SPACE", "l2"),
+    "M": int(os.getenv("HNSW_M", "16")),
+    "ef_construction": int(os.getenv("HNSW_EF_CONSTRUCTION", "100")),
+    "ef_search": int(os.getenv("HNSW_EF_SEARCH", "10")),
+}
+HNSW_SPACES = ("l2", "cosine", "ip")
+# What Chroma uses when a collection's metadata leaves a creation parameter out
+CHROMA_CREATION_DEFAULTS = {"space": "l2", "M": 16, "ef_construction": 100}
+_METADATA_KEYS = {
+    "space": "hnsw:space",
+    "M": "hnsw:M",
+    "ef_construction": "hnsw:construction_ef",
+    "ef_search": "hnsw:search_ef",
+}
+
+
+def load_hnsw_config(path: str = HNSW_CONFIG_FILE) -> Dict[str, Dict[str, Any]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+def save_hnsw_config(config: Dict[str, Dict[str, Any]], path: str = HNSW_CONFIG_FILE):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(config, f, indent=2)
+    os.replace(tmp_path, path)
+
+def hnsw_params(collection_name: str, path: str = HNSW_CONFIG_FILE) -> Dict[str, Any]:
+    """Effective parameters for a collection: env defaults < "*" entry < collection entry."""
+    config = load_hnsw_config(path)
+    params = {**HNSW_DEFAULTS, **config.get("*", {}), **config.get(collection_name, {})}
+    if params["space"] not in HNSW_SPACES:
+        raise ValueError(f"Unsupported HNSW space '{params['space']}' for {collection_name}")
+    return params
+
+def to_collection_metadata(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {_METADATA_KEYS[key]: value for key, value in params.items() if key in _METADATA_KEYS}
+
+def hnsw_metadata(collection_name: str, path: str = HNSW_CONFIG_FILE) -> Dict[str, Any]:
+    """`collection_metadata` for Chroma(...). Space, M and ef_construction only apply at creation."""
+    return to_collection_metadata(hnsw_params(collection_name, path))
+
+def hnsw_rebuild_needed(metadata: Dict[str, Any], collection_name: str, path: str = HNSW_CONFIG_FILE) -> bool:
+    """Space, M and ef_construction are fixed at creation: only a rebuild applies a changed value."""
+    wanted = hnsw_params(collection_name, path)
+    metadata = metadata or {}
+    return any(
+        metadata.get(_METADATA_KEYS[key], default) != wanted[key]
+        for key, default in CHROMA_CREATION_DEFAULTS.items()
+    )
+
+def drop_if_hnsw_changed(persist_dir: str, collection_name: str, path: str = HNSW_CONFIG_FILE) -> bool:
+    """
+    Delete the collection when its creation parameters differ from the config, so the
+    ingest that follows rebuilds it. Meant for a staging generation: live readers keep
+    the old collection until it is published.
+    """
+    client = chromadb.PersistentClient(path=persist_dir)
+    try:
+        collection = client.get_collection(collection_name)
+    except Exception:
+        return False  # not created yet
+    if not hnsw_rebuild_needed(collection.metadata, collection_name, path):
+        return False
+    client.delete_collection(collection_name)
+    logging.info(f"{collection_name}: HNSW space/M/ef_construction changed; dropped for a rebuild")
+    return True
+
+def _current_search_ef(collection) -> Any:
+    configuration = getattr(collection, "configuration", None)
+    if isinstance(configuration, dict) and isinstance(configuration.get("hnsw"), dict):
+        return configuration["hnsw"].get("ef_search")
+    return (collection.metadata or {}).get("hnsw:search_ef")
+
+def apply_search_ef(vector_db, collection_name: str, path: str = HNSW_CONFIG_FILE):
+    """ef_search is the one knob that can change on an existing collection; sync it with the config."""
+    collection = vector_db._collection
+    wanted = hnsw_params(collection_name, path)["ef_search"]
+    if _current_search_ef(collection) == wanted:
+        return
+    try:
+        collection.modify(configuration={"hnsw": {"ef_search": wanted}})  # Chroma >= 1.0
+        logging.info(f"{collection_name}: HNSW ef_search set to {wanted}")
+        return
+    except TypeError:
+        pass  # older Chroma: search ef is collection metadata
+    except Exception as e:
+        logging.warning(f"{collection_name}: could not update HNSW ef_search ({e})")
+        return
+
+    # modify() replaces the whole metadata but refuses hnsw:space, so a collection that
+    # records its space cannot be updated without losing it (and its relevance scores)
+    metadata = dict(collection.metadata or {})
+    if "hnsw:space" in metadata:
+        logging.warning(
+            f"{collection_name}: this Chroma version cannot change hnsw:search_ef without dropping "
+            f"hnsw:space; keeping {metadata.get('hnsw:search_ef')} (upgrade Chroma or re-ingest)"
+        )
+        return
+    try:
+        collection.modify(metadata={**metadata, "hnsw:search_ef": wanted})
+        logging.info(f"{collection_name}: hnsw:search_ef set to {wanted}")
+    except Exception as e:
+        logging.warning(f"{collection_name}: could not update hnsw:search_ef ({e})")
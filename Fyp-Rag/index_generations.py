@@ -0,0 +1,133 @@
+import os
+import uuid
+import shutil
+import logging
+import argparse
+from pathlib import Path
+from datetime import datetime
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+# -----------------------
+# Config
+# -----------------------
+GENERATIONS_DIR = "generations"
+CURRENT_POINTER = "CURRENT"
+STAGING_SUFFIX = ".staging"
+GENERATIONS_TO_KEEP = int(os.getenv("GENERATIONS_TO_KEEP", "2"))  # current + previous for rollback
+
+# Layout of a persist root:
+#   <root>/CURRENT                   -> id of the live generation (replaced atomically)
+#   <root>/generations/<id>/         -> a complete Chroma store + manifest + side indexes
+#   <root>/generations/<id>.staging/ -> a generation being built; never read by serving code
+# A root without CURRENT is the legacy flat layout and is served as-is.
+
+
+def _generations_dir(root: str) -> Path:
+    return Path(root) / GENERATIONS_DIR
+
+def current_generation(root: str) -> Optional[str]:
+    pointer = Path(root) / CURRENT_POINTER
+    if not pointer.exists():
+        return None
+    return pointer.read_text().strip() or None
+
+def resolve_persist_root(root: str) -> str:
+    """Directory readers should open: the live generation, or `root` itself for the flat layout."""
+    generation = current_generation(root)
+    if generation is None:
+        return root
+    return str(_generations_dir(root) / generation)
+
+def list_generations(root: str) -> List[str]:
+    """Published generation ids, oldest first."""
+    gen_dir = _generations_dir(root)
+    if not gen_dir.exists():
+        return []
+    return sorted(p.name for p in gen_dir.iterdir() if p.is_dir() and not p.name.endswith(STAGING_SUFFIX))
+
+# -----------------------
+# Build + publish
+# -----------------------
+def _copy_live_store(root: str, staging: Path):
+    """Seed a staging generation with the live data so incremental ingests only add what is new."""
+    generation = current_generation(root)
+    if generation is not None:
+        shutil.copytree(_generations_dir(root) / generation, staging)
+        return
+    staging.mkdir(parents=True)
+    if not Path(root).exists():
+        return
+    # First build after the flat layout: carry the existing store over once
+    for entry in Path(root).iterdir():
+        if entry.name in (GENERATIONS_DIR, CURRENT_POINTER):
+            continue
+        if entry.is_dir():
+            shutil.copytree(entry, staging / entry.name)
+        else:
+            shutil.copy2(entry, staging / entry.name)
+
+def publish_generation(root: str, generation: str):
+    """Point readers at `generation` with one atomic rename of the pointer file."""
+    if not (_generations_dir(root) / generation).is_dir():
+        raise FileNotFoundError(f"Generation {generation} not found in {root}")
+    tmp_pointer = Path(root) / f"{CURRENT_POINTER}.tmp"
+    tmp_pointer.write_text(generation)
+    os.replace(tmp_pointer, Path(root) / CURRENT_POINTER)
+    logging.info(f"Published generation {generation} for {root}")
+
+def gc_generations(root: str, keep: int = GENERATIONS_TO_KEEP) -> List[str]:
+    """Delete all but the newest `keep` generations; the live one is always kept."""
+    live = current_generation(root)
+    generations = list_generations(root)
+    removed = [g for g in generations[: max(0, len(generations) - keep)] if g != live]
+    for generation in removed:
+        shutil.rmtree(_generations_dir(root) / generation, ignore_errors=True)
+    if removed:
+        logging.info(f"Removed old generations from {root}: {removed}")
+    return removed
+
+@contextmanager
+def new_generation(root: str, keep: int = GENERATIONS_TO_KEEP) -> Iterator[str]:
+    """
+    Build a new generation off to the side:
+
+        with new_generation("chroma_storage") as staging:
+            process_all_acts("Acts", staging)
+
+    Serving processes keep reading the live generation while the block runs. On
+    success the staging directory is renamed into place, the pointer is swapped and
+    old generations are collected; on failure the staging directory is discarded.
+    """
+    # Ids sort chronologically, which is what gc_generations relies on
+    generation = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{uuid.uuid4().hex[:4]}"
+    staging = _generations_dir(root) / f"{generation}{STAGING_SUFFIX}"
+    _copy_live_store(root, staging)
+    logging.info(f"Building generation {generation} in {staging}")
+    try:
+        yield str(staging)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    os.rename(staging, _generations_dir(root) / generation)
+    publish_generation(root, generation)
+    gc_generations(root, keep)
+
+# -----------------------
+# Main
+# -----------------------
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Inspect, roll back or clean up index generations")
+    parser.add_argument("--root", default="chroma_storage", help="Persist root holding generations/")
+    parser.add_argument("--rollback", type=str, help="Publish an earlier generation id")
+    parser.add_argument("--gc", action="store_true", help="Remove generations beyond GENERATIONS_TO_KEEP")
+    args = parser.parse_args()
+
+    if args.rollback:
+        publish_generation(args.root, args.rollback)
+    if args.gc:
+        gc_generations(args.root)
+    live = current_generation(args.root)
+    for generation in list_generations(args.root):
+        print(f"{'*' if generation == live else ' '} {generation}")
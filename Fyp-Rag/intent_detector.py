@@ -0,0 +1,153 @@
+import os
+import re
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from model_client import MODEL_SERVER_ENABLED, RemoteSentenceEncoder
+
+# -----------------------
+# Config
+# -----------------------
+INTENT_DETECTION_ENABLED = os.getenv("INTENT_DETECTION_ENABLED", "1") == "1"
+# Small sentence model for paraphrases the rules miss; set INTENT_MODEL="" for rules only
+INTENT_MODEL = os.getenv("INTENT_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+INTENT_THRESHOLD = float(os.getenv("INTENT_THRESHOLD", "0.75"))
+INTENT_MAX_WORDS = 8  # longer messages are treated as real questions
+
+LEGAL_QUESTION = "legal_question"
+
+GREETING_RE = re.compile(
+    r"^\s*(hi+|hello+|hey+|hiya|greetings|good\s+(morning|afternoon|evening)|ayubowan|vanakkam)\b[\s!.,]*(there|all|everyone)?[\s!.]*$",
+    re.IGNORECASE,
+)
+SMALL_TALK_RE = re.compile(
+    r"^\s*(how\s+are\s+you(\s+doing)?|how'?s\s+it\s+going|what'?s\s+up|who\s+are\s+you|what\s+are\s+you)\b[\s?!.]*$",
+    re.IGNORECASE,
+)
+THANKS_RE = re.compile(
+    r"^\s*(thanks?(\s+you)?|thank\s+you(\s+(so|very)\s+much)?|cheers|great|ok(ay)?|cool|perfect)\b[\s!.]*$",
+    re.IGNORECASE,
+)
+GOODBYE_RE = re.compile(r"^\s*(bye+|goodbye|see\s+you|good\s*night)\b[\s!.]*$", re.IGNORECASE)
+HELP_RE = re.compile(
+    r"^\s*(help|what\s+can\s+you\s+do|how\s+do\s+(i|you)\s+(use|work)(\s+this|\s+you)?|what\s+do\s+you\s+know(\s+about)?|what\s+acts\s+do\s+you\s+(have|know))\b[\s?!.]*$",
+    re.IGNORECASE,
+)
+
+RULES = [
+    ("greeting", GREETING_RE),
+    ("small_talk", SMALL_TALK_RE),
+    ("thanks", THANKS_RE),
+    ("goodbye", GOODBYE_RE),
+    ("help", HELP_RE),
+]
+
+# Example phrasings per intent for the embedding fallback
+PROTOTYPES: Dict[str, List[str]] = {
+    "greeting": ["hello", "hi there", "hey, good morning", "greetings"],
+    "small_talk": ["how are you today", "who are you", "how is your day going", "are you a robot"],
+    "thanks": ["thank you very much", "thanks, that helps", "much appreciated"],
+    "goodbye": ["bye", "see you later", "that's all for now"],
+    "help": ["what can you help me with", "how do I use this assistant",
+             "what kind of questions can I ask", "which acts do you know about"],
+    LEGAL_QUESTION: ["what does section 5 of the act say", "what is the penalty for an offence under the act",
+                     "who is liable to pay the economic service charge", "when did the amendment come into force"],
+}
+
+TEMPLATES = {
+    "greeting": ("Hello! I can answer questions about Sri Lankan Government Acts and their amendments. "
+                 "What would you like to know?"),
+    "small_talk": ("I'm a legal assistant for Sri Lankan Government Acts. Ask me about a specific Act, "
+                   "section or amendment and I'll answer from the official documents."),
+    "thanks": "You're welcome! Let me know if you have any other questions about Sri Lankan Acts.",
+    "goodbye": "Goodbye! Come back any time you have a question about Sri Lankan Government Acts.",
+    "help": ("You can ask me about the content of Sri Lankan Government Acts and their amendments, for example:\n"
+             "- What does section 3 of the Civil Aviation Act say?\n"
+             "- Who is liable to pay the Economic Service Charge?\n"
+             "- What changed in the 2018 amendment?\n"
+             "Answers include the source documents and page numbers."),
+}
+
+
+@dataclass
+class Intent:
+    name: str
+    confidence: float
+    response: Optional[str] = None  # templated answer; None for legal questions
+
+
+class IntentDetector:
+    """
+    Rules first, then nearest prototype under a small sentence model. Only short
+    messages are classified; everything else is a legal question and goes to RAG.
+    """
+
+    def __init__(self, model_name: str = INTENT_MODEL, threshold: float = INTENT_THRESHOLD):
+        self.model_name = model_name
+        self.threshold = threshold
+        self._model = None
+        self._prototypes = None
+        self._labels: List[str] = []
+        self._lock = threading.Lock()
+
+    def _load_model(self) -> bool:
+        if not self.model_name:
+            return False
+        with self._lock:
+            if self._model is None:
+                try:
+                    if MODEL_SERVER_ENABLED:
+                        # The model server loads INTENT_MODEL once per host
+                        self._model = RemoteSentenceEncoder()
+                    else:
+                        from sentence_transformers import SentenceTransformer
+
+                        self._model = SentenceTransformer(self.model_name, device="cpu")
+                    texts = [t for label, examples in PROTOTYPES.items() for t in examples]
+                    self._labels = [label for label, examples in PROTOTYPES.items() for _ in examples]
+                    self._prototypes = self._model.encode(texts, normalize_embeddings=True)
+                except Exception as e:
+                    logging.warning(f"Intent model unavailable, using rules only: {e}")
+                    self.model_name = ""
+                    return False
+        return True
+
+    def detect(self, message: str) -> Intent:
+        text = message.strip()
+        if not text:
+            return Intent("help", 1.0, TEMPLATES["help"])
+        if len(text.split()) > INTENT_MAX_WORDS:
+            return Intent(LEGAL_QUESTION, 1.0)
+
+        for name, pattern in RULES:
+            if pattern.match(text):
+                return Intent(name, 1.0, TEMPLATES[name])
+
+        if not self._load_model():
+            return Intent(LEGAL_QUESTION, 0.0)
+        vector = self._model.encode([text], normalize_embeddings=True)[0]
+        scores = self._prototypes @ vector
+        best = int(np.argmax(scores))
+        label, score = self._labels[best], float(scores[best])
+        if label == LEGAL_QUESTION or score < self.threshold:
+            return Intent(LEGAL_QUESTION, score)
+        return Intent(label, score, TEMPLATES[label])
+
+
+_detector: Optional[IntentDetector] = None
+
+def detect_intent(message: str) -> Intent:
+    """Classify a chat message; `response` is set when it can be answered from a template."""
+    global _detector
+    if not INTENT_DETECTION_ENABLED:
+        return Intent(LEGAL_QUESTION, 0.0)
+    if _detector is None:
+        _detector = IntentDetector()
+    intent = _detector.detect(message)
+    if intent.response:
+        logging.info(f"Intent '{intent.name}' ({intent.confidence:.2f}) answered from template")
+    return intent
@@ -0,0 +1,111 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+# -----------------------
+# Patterns
+# -----------------------
+# Gazette file names: "24-2023_E.pdf" = Act No. 24 of 2023, English
+ACT_FILENAME_RE = re.compile(r"^(\d{1,3})-(\d{4})_([A-Z])\.pdf$", re.IGNORECASE)
+
+# Section headings in an Act: "6. (1) The Authority shall ..." / "12A. Every person ..."
+SECTION_HEADING_RE = re.compile(r"(?m)^\s*(\d{1,3}[A-Z]?)\.\s+(?=[(A-Z\"'])")
+
+_SECTION_LIST = r"(\d{1,3}[A-Z]?(?:\s*(?:,|and)\s*\d{1,3}[A-Z]?)*)"
+
+# Numbered clause of the amending Act: "... of 2006. 3. Section 3 of ..."
+_CLAUSE_BREAK = r"\s\d{1,3}[A-Z]?\.\s"
+
+# The Act being amended: "the principal enactment" or in full, "the Civil Aviation Act, No. 14 of 2010"
+_ACT_REFERENCE = r"(?:principal\s+enactment|(?:[\w()'-]+\s+){1,8}?Act,?\s+No\.\s*\d{1,3}\s+of\s+\d{4})"
+
+# "Section 6 of the principal enactment is hereby amended ..." (also "sections 5 and 6 ... are hereby repealed")
+# The first reference names the Act in full: "Section 6 of the ... Act, No. 13 of 2006
+# (hereinafter referred to as the "principal enactment") as last amended by ... is hereby further amended ..."
+# The gap before "hereby" stays inside one clause and never crosses another "section", so a
+# citation such as "section 24B of the Inland Revenue Act, No. 10 of 2006." is not an amendment.
+AMENDMENT_RE = re.compile(
+    r"\bsections?\s+" + _SECTION_LIST + r",?\s+of\s+the\s+" + _ACT_REFERENCE
+    + r"(?:(?!\bsections?\b|hereby|" + _CLAUSE_BREAK + r").){0,200}?"
+    r"\s(?:is|are)\s+hereby\s+(?:further\s+)?(amended|repealed)",
+    re.IGNORECASE,
+)
+
+# "The following new section is hereby inserted immediately after section 18, of the Civil Aviation Act, No. 14 of 2010"
+INSERTION_RE = re.compile(
+    r"(?:new\s+sections?|following\s+sections?)[^.]{0,80}?\s+(?:is|are)\s+hereby\s+inserted\s+"
+    r"immediately\s+(after|before)\s+section\s+(\d{1,3}[A-Z]?),?\s+of\s+the\s+" + _ACT_REFERENCE,
+    re.IGNORECASE,
+)
+
+# "substituting therefor the following" / "the substitution therefor, of the following" marks a substitution
+SUBSTITUTION_RE = re.compile(r"substitut(?:ing|ion(?:\s+of)?)\s+therefor", re.IGNORECASE)
+
+# Citations in user questions: "section 12", "s. 12(3)", "sec 6A (1) of the Civil Aviation Act"
+SECTION_REFERENCE_RE = re.compile(
+    r"\b(?:section|sec\.?|s\.)\s*(\d{1,3}[A-Z]?)\b(?:\s*\((\w{1,4})\))?"
+    r"(?:\s+of\s+(?:the\s+)?((?:[A-Z][\w-]*\s+){0,6}Act\b))?",
+    re.IGNORECASE,
+)
+
+# Subsection markers at the start of a line: "(1) The Authority ..."
+SUBSECTION_MARKER_RE = re.compile(r"(?m)^\s*\((\d{1,3}[A-Z]?)\)\s")
+
+# -----------------------
+# Helpers
+# -----------------------
+def normalize_section(section: str) -> str:
+    return section.strip().upper()
+
+def parse_act_filename(filename: str) -> Optional[Dict]:
+    """{"act_number": 24, "year": 2023, "language": "E"} for "24-2023_E.pdf", else None."""
+    match = ACT_FILENAME_RE.match(filename.strip())
+    if not match:
+        return None
+    return {
+        "act_number": int(match.group(1)),
+        "year": int(match.group(2)),
+        "language": match.group(3).upper(),
+    }
+
+def find_section_headings(text: str) -> List[str]:
+    """Section numbers whose headings start inside this text, in order."""
+    return [normalize_section(s) for s in SECTION_HEADING_RE.findall(text)]
+
+def find_subsections(text: str) -> List[str]:
+    return [s.upper() for s in SUBSECTION_MARKER_RE.findall(text)]
+
+def parse_section_references(query: str) -> List[Dict[str, Optional[str]]]:
+    """[{"section": "12", "subsection": "3" or None, "act": "Civil Aviation Act" or None}]"""
+    refs = []
+    for match in SECTION_REFERENCE_RE.finditer(query):
+        refs.append({
+            "section": normalize_section(match.group(1)),
+            "subsection": match.group(2).upper() if match.group(2) else None,
+            "act": match.group(3).strip() if match.group(3) else None,
+        })
+    return refs
+
+def _split_section_list(section_list: str) -> List[str]:
+    return [normalize_section(s) for s in re.split(r"\s*(?:,|and)\s*", section_list) if s.strip()]
+
+def parse_amendment_references(text: str) -> List[Tuple[str, str]]:
+    """
+    (section, operation) pairs for every principal-enactment section this amendment
+    text touches. Operations: "amend", "substitute", "repeal", "insert_after", "insert_before".
+    """
+    flat = re.sub(r"\s+", " ", text)
+    refs = []
+    for match in AMENDMENT_RE.finditer(flat):
+        verb = match.group(2).lower()
+        # Operation wording stays within the amending section, i.e. before the next "N. "
+        tail = re.split(_CLAUSE_BREAK, flat[match.end(): match.end() + 400])[0]
+        if verb == "repealed":
+            operation = "repeal"
+        elif SUBSTITUTION_RE.search(tail):
+            operation = "substitute"
+        else:
+            operation = "amend"
+        refs.extend((section, operation) for section in _split_section_list(match.group(1)))
+    for match in INSERTION_RE.finditer(flat):
+        refs.append((normalize_section(match.group(2)), f"insert_{match.group(1).lower()}"))
+    return refs
@@ -0,0 +1,203 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from langchain_core.caches import BaseCache
+from langchain_core.globals import set_llm_cache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+
+# -----------------------
+# Config
+# -----------------------
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".llm_cache.sqlite")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+
+# Repr form: call-time params and models that are not serializable
+_TEMPERATURE_RE = re.compile(r"'temperature', ([0-9.]+)")
+_MODEL_RE = re.compile(r"'model(?:_name)?', '([^']+)'")
+
+
+def _llm_params(llm_string: str) -> Tuple[Optional[float], str]:
+    """
+    (temperature, model) of a LangChain llm_string. Serializable models (ChatOpenAI)
+    give `json.dumps(serialized) + "---" + str(sorted(call params))`; the rest give
+    only the repr of their invocation params. Call-time params override the model's.
+    """
+    serialized, _, call_params = llm_string.partition("---")
+    params: Dict[str, Any] = {}
+    try:
+        loaded = json.loads(serialized)
+        if isinstance(loaded, dict):
+            params = loaded.get("kwargs") or {}
+    except ValueError:
+        call_params = llm_string
+    temperature = params.get("temperature")
+    model = params.get("model_name") or params.get("model")
+    override = _TEMPERATURE_RE.search(call_params)
+    if override:
+        temperature = override.group(1)
+    override = _MODEL_RE.search(call_params)
+    if override:
+        model = override.group(1)
+    return (float(temperature) if temperature is not None else None), model or "unknown"
+
+def _hash(*parts: str) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+# -----------------------
+# SQLite Completion Cache
+# -----------------------
+class CompletionCache(BaseCache):
+    """
+    Persistent cache for deterministic (temperature 0) LLM completions.
+
+    Registered as the global LangChain cache it covers every ChatOpenAI client;
+    `cached_completion` covers raw OpenAI SDK calls such as page OCR. Entries are
+    keyed by (model, temperature, sha256 of the full prompt and call parameters)
+    and the least recently used rows are dropped beyond `max_entries`.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                temperature REAL,
+                response TEXT NOT NULL,
+                created_at REAL,
+                last_used REAL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON completions(last_used)")
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+
+    # ---- raw key/value access ----
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE completions SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def _put(self, key: str, model: str, temperature: float, response: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, temperature, response, now, now),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM completions WHERE key IN "
+                    "(SELECT key FROM completions ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+    # ---- LangChain BaseCache interface ----
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        temperature, _ = _llm_params(llm_string)
+        if temperature != 0:
+            self.skipped += 1
+            return None
+        cached = self._get(_hash(llm_string, prompt))
+        if cached is None:
+            return None
+        try:
+            return [loads(g) for g in json.loads(cached)]
+        except Exception as e:
+            logging.warning(f"Discarding unreadable LLM cache entry: {e}")
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        temperature, model = _llm_params(llm_string)
+        if temperature != 0:
+            return
+        self._put(
+            _hash(llm_string, prompt),
+            model,
+            0.0,
+            json.dumps([dumps(g) for g in return_val]),
+        )
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM completions")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()
+        total = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped_nondeterministic": self.skipped,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+# -----------------------
+# Global wiring
+# -----------------------
+_llm_cache: Optional[CompletionCache] = None
+
+def enable_llm_cache() -> Optional[CompletionCache]:
+    """Install the completion cache as the global LangChain LLM cache (once per process)."""
+    global _llm_cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    if _llm_cache is None:
+        _llm_cache = CompletionCache()
+        set_llm_cache(_llm_cache)
+        logging.info(f"LLM completion cache enabled at {LLM_CACHE_PATH}")
+    return _llm_cache
+
+def cached_completion(model: str, temperature: float, payload: Any, call: Callable[[], str]) -> str:
+    """
+    Serve a raw SDK completion from the cache when it is deterministic.
+    `payload` must contain the full prompt (messages, images, ...) and be JSON serialisable.
+    """
+    cache = enable_llm_cache()
+    if cache is None or temperature != 0:
+        return call()
+    key = _hash(model, str(temperature), json.dumps(payload, sort_keys=True))
+    cached = cache._get(key)
+    if cached is not None:
+        return cached
+    text = call()
+    if text:
+        cache._put(key, model, temperature, text)
+    return text
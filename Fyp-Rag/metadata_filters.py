@@ -0,0 +1,85 @@
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from legal_text import parse_act_filename
+
+# -----------------------
+# Config
+# -----------------------
+ROLE_BASE = "base"
+ROLE_AMENDMENT = "amendment"
+FILTER_KEYS = ("act", "act_number", "year", "year_from", "year_to", "language", "role")
+
+_ACT_NO_RE = re.compile(r"\bAct\s+No\.?\s*(\d{1,3})\s+of\s+(\d{4})\b", re.IGNORECASE)
+_YEAR_ROLE_RE = re.compile(r"\b((?:19|20)\d{2})\s+(amendments?|amending\s+act)\b", re.IGNORECASE)
+_ROLE_YEAR_RE = re.compile(r"\bamendments?\s+(?:of|in|from)\s+((?:19|20)\d{2})\b", re.IGNORECASE)
+_PRINCIPAL_RE = re.compile(r"\b(principal\s+enactment|original\s+act|base\s+act)\b", re.IGNORECASE)
+
+# -----------------------
+# Ingest-side metadata
+# -----------------------
+def document_metadata(pdf_path: str) -> Dict[str, Any]:
+    """
+    Typed Act metadata from the file layout <Act>/<base|act|amendment>/<No>-<Year>_<Lang>.pdf:
+    act, role, and act_number / year / language when the filename follows the scheme.
+    Chroma cannot store None, so unknown fields are left out.
+    """
+    path = Path(pdf_path)
+    role = ROLE_AMENDMENT if path.parent.name.lower().startswith("amendment") else ROLE_BASE
+    meta: Dict[str, Any] = {"role": role}
+    if path.parent.parent.name:
+        meta["act"] = path.parent.parent.name.replace(" ", "_")
+    meta.update(parse_act_filename(path.name) or {})
+    return meta
+
+# -----------------------
+# Query-side filters
+# -----------------------
+def _match(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, (list, tuple, set)):
+        return {key: {"$in": list(value)}}
+    return {key: value}
+
+def build_where_filter(filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Structured filters -> Chroma `where` clause. Supported keys: act, act_number, year
+    (value or list), year_from / year_to (inclusive range), language and role.
+    """
+    if not filters:
+        return None
+    unknown = set(filters) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"Unsupported filter keys: {sorted(unknown)}")
+
+    clauses: List[Dict[str, Any]] = []
+    for key in ("act", "act_number", "year", "language", "role"):
+        if filters.get(key) is not None:
+            clauses.append(_match(key, filters[key]))
+    if filters.get("year_from") is not None:
+        clauses.append({"year": {"$gte": int(filters["year_from"])}})
+    if filters.get("year_to") is not None:
+        clauses.append({"year": {"$lte": int(filters["year_to"])}})
+    return combine_where(*clauses)
+
+def combine_where(*clauses: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """AND together Chroma `where` clauses, ignoring empty ones."""
+    clauses = [c for c in clauses if c]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": list(clauses)}
+
+def filters_from_query(query: str) -> Dict[str, Any]:
+    """Filters implied by the question: "Act No. 24 of 2023", "the 2018 amendment", "the principal enactment"."""
+    filters: Dict[str, Any] = {}
+    act_no = _ACT_NO_RE.search(query)
+    if act_no:
+        filters["act_number"], filters["year"] = int(act_no.group(1)), int(act_no.group(2))
+        return filters
+    year_role = _YEAR_ROLE_RE.search(query) or _ROLE_YEAR_RE.search(query)
+    if year_role:
+        filters["year"] = int(year_role.group(1))
+        filters["role"] = ROLE_AMENDMENT
+    elif _PRINCIPAL_RE.search(query):
+        filters["role"] = ROLE_BASE
+    return filters
@@ -0,0 +1,328 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.tracers.context import register_configure_hook
+
+# -----------------------
+# Config
+# -----------------------
+# Seconds: sub-millisecond cache lookups up to multi-minute map-reduce answers
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 180.0)
+TOKEN_BUCKETS = (0, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+CALL_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+# -----------------------
+# Metric types (Prometheus text exposition format)
+# -----------------------
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}  # per bucket, last one is +Inf
+        self._sums: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            counts[index] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, counts in sorted(self._counts.items()):
+                labels = dict(zip(self.labelnames, key))
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else _format_value(bound)
+                    lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': le})} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(self._sums[key])}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+_metrics: List[Any] = []
+# Callables returning (name, type, help, labels, value) samples read at scrape time
+_collectors: List[Callable[[], Iterable[Tuple[str, str, str, Dict[str, Any], float]]]] = []
+
+def _register(metric):
+    _metrics.append(metric)
+    return metric
+
+def register_collector(collector: Callable[[], Iterable[Tuple[str, str, str, Dict[str, Any], float]]]):
+    """Export values owned elsewhere (cache and pool stats) without copying them on every change."""
+    _collectors.append(collector)
+
+def register_cache(cache: str, stats: Callable[[], Dict[str, Any]]):
+    """Hits, misses, size and hit ratio of a cache whose stats() has the answer cache's keys."""
+    def collect():
+        s = stats()
+        if not s:
+            return
+        labels = {"cache": cache}
+        yield "rag_cache_hits_total", "counter", "Cache lookups served from the cache", labels, s["hits"]
+        yield "rag_cache_misses_total", "counter", "Cache lookups that fell through", labels, s["misses"]
+        yield "rag_cache_hit_ratio", "gauge", "hits / (hits + misses) since start", labels, s["hit_ratio"]
+        yield "rag_cache_entries", "gauge", "Entries currently cached", labels, s["entries"]
+    register_collector(collect)
+
+def render_metrics() -> str:
+    """
+    Everything in Prometheus text format. Values are per process: with several API
+    workers, scrape each one (or aggregate with sum() by instance).
+    """
+    lines: List[str] = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+
+    collected: Dict[str, Tuple[str, str, List[Tuple[Dict[str, Any], float]]]] = {}
+    for collector in _collectors:
+        try:
+            for name, kind, help, labels, value in collector():
+                collected.setdefault(name, (kind, help, []))[2].append((labels, value))
+        except Exception as e:
+            logging.warning(f"Metrics collector failed: {e}")
+    for name, (kind, help, samples) in collected.items():
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+# -----------------------
+# Metrics
+# -----------------------
+REQUESTS = _register(Counter("rag_requests_total", "Chat requests by endpoint and outcome", ["endpoint", "outcome"]))
+REQUEST_SECONDS = _register(Histogram("rag_request_duration_seconds", "End-to-end chat request latency", ["endpoint"]))
+STAGE_SECONDS = _register(Histogram("rag_stage_duration_seconds", "Latency of one pipeline stage", ["stage"]))
+NODE_SECONDS = _register(Histogram("rag_graph_node_duration_seconds", "Latency of one LangGraph node", ["node"]))
+QUEUE_SECONDS = _register(Histogram("rag_stage_queue_wait_seconds", "Wait for a worker stage's concurrency slot", ["stage"]))
+LLM_CALLS = _register(Counter("rag_llm_calls_total", "LLM calls by model and status", ["model", "status"]))
+LLM_TOKENS = _register(Counter("rag_llm_tokens_total", "LLM tokens by model and direction", ["model", "type"]))
+LLM_SECONDS = _register(Histogram("rag_llm_call_duration_seconds", "Latency of one LLM call", ["model"]))
+REQUEST_TOKENS = _register(Histogram("rag_request_llm_tokens", "LLM tokens (prompt + completion) spent per request",
+                                     ["endpoint"], TOKEN_BUCKETS))
+REQUEST_LLM_CALLS = _register(Histogram("rag_request_llm_calls", "LLM calls made per request", ["endpoint"], CALL_BUCKETS))
+
+# -----------------------
+# Per-request trace
+# -----------------------
+class RequestTrace:
+    """Stage timings, LLM calls and tokens of one request (also from worker threads)."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.outcome = "answered"
+        self.stages: Dict[str, float] = {}
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+
+    def add_stage(self, stage: str, seconds: float):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add_llm_call(self, prompt_tokens: int, completion_tokens: int):
+        with self._lock:
+            self.llm_calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    def breakdown(self) -> Dict[str, Any]:
+        """Milliseconds per stage; nested stages (retrievers, nodes) overlap their parents."""
+        with self._lock:
+            return {
+                "total_ms": (time.perf_counter() - self.started) * 1000,
+                "stages_ms": {stage: seconds * 1000 for stage, seconds in self.stages.items()},
+                "llm_calls": self.llm_calls,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+            }
+
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("rag_request_trace", default=None)
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+@contextmanager
+def request_trace(endpoint: str):
+    """Collect a RequestTrace for the block; set `trace.outcome` before leaving it."""
+    trace = RequestTrace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    except BaseException:
+        trace.outcome = "error"
+        raise
+    finally:
+        try:
+            _current_trace.reset(token)
+        except ValueError:
+            pass  # a stream generator closed from another context
+        REQUESTS.inc(endpoint=endpoint, outcome=trace.outcome)
+        REQUEST_SECONDS.observe(time.perf_counter() - trace.started, endpoint=endpoint)
+        REQUEST_TOKENS.observe(trace.prompt_tokens + trace.completion_tokens, endpoint=endpoint)
+        REQUEST_LLM_CALLS.observe(trace.llm_calls, endpoint=endpoint)
+
+def record_stage(stage: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_stage(stage, seconds)
+
+@contextmanager
+def span(stage: str):
+    """Time the block as one pipeline stage (sync or async code)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+def timed_node(name: str, fn: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    """Wrap a LangGraph node so every run is timed."""
+    def node(state):
+        start = time.perf_counter()
+        try:
+            return fn(state)
+        finally:
+            elapsed = time.perf_counter() - start
+            NODE_SECONDS.observe(elapsed, node=name)
+            trace = _current_trace.get()
+            if trace is not None:
+                trace.add_stage(f"node:{name}", elapsed)
+    return node
+
+def record_llm_call(model: str, prompt_tokens: int = 0, completion_tokens: int = 0,
+                    seconds: Optional[float] = None, status: str = "ok"):
+    """Count one LLM call; LangChain calls are counted automatically, raw SDK calls (OCR) call this."""
+    LLM_CALLS.inc(model=model, status=status)
+    if status != "ok":
+        return
+    LLM_TOKENS.inc(prompt_tokens, model=model, type="prompt")
+    LLM_TOKENS.inc(completion_tokens, model=model, type="completion")
+    if seconds is not None:
+        LLM_SECONDS.observe(seconds, model=model)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_llm_call(prompt_tokens, completion_tokens)
+
+# -----------------------
+# LangChain callbacks
+# -----------------------
+def _token_usage(response: LLMResult) -> Tuple[int, int]:
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return usage.get("prompt_tokens", 0) or 0, usage.get("completion_tokens", 0) or 0
+    # Streamed responses report usage on the message (ChatOpenAI needs stream_usage=True)
+    prompt = completion = 0
+    for generations in response.generations:
+        for generation in generations:
+            meta = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            prompt += meta.get("input_tokens", 0)
+            completion += meta.get("output_tokens", 0)
+    return prompt, completion
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Installed for every LangChain run in the process: times and counts LLM calls (tokens
+    included) and times retrievers as "retriever:<class>" stages, e.g. BM25Retriever,
+    VectorStoreRetriever, MultiQueryRetriever. Retriever times include their children.
+    """
+
+    run_inline = True  # run in the caller's context so the request trace is visible
+
+    def __init__(self):
+        self._llm_runs: Dict[UUID, Tuple[float, str]] = {}
+        self._retriever_runs: Dict[UUID, Tuple[float, str]] = {}
+
+    def _start_llm(self, run_id: UUID, kwargs: Dict[str, Any]):
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or "unknown"
+        self._llm_runs[run_id] = (time.perf_counter(), model)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs: Any):
+        self._start_llm(run_id, kwargs)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any):
+        self._start_llm(run_id, kwargs)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        started, model = self._llm_runs.pop(run_id, (None, "unknown"))
+        prompt_tokens, completion_tokens = _token_usage(response)
+        seconds = time.perf_counter() - started if started is not None else None
+        record_llm_call(model, prompt_tokens, completion_tokens, seconds)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        _, model = self._llm_runs.pop(run_id, (None, "unknown"))
+        record_llm_call(model, status="error")
+
+    def on_retriever_start(self, serialized, query, *, run_id: UUID, **kwargs: Any):
+        name = kwargs.get("name") or (serialized or {}).get("name") or "retriever"
+        self._retriever_runs[run_id] = (time.perf_counter(), name)
+
+    def on_retriever_end(self, documents, *, run_id: UUID, **kwargs: Any):
+        started, name = self._retriever_runs.pop(run_id, (None, None))
+        if started is not None:
+            record_stage(f"retriever:{name}", time.perf_counter() - started)
+
+    def on_retriever_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._retriever_runs.pop(run_id, None)
+
+
+metrics_handler = MetricsCallbackHandler()
+# A configure hook adds the handler to every callback manager, so LLMs and retrievers
+# built anywhere (ask_pdf, chromadbpdf, the graphs) are covered without passing callbacks
+_metrics_handler_var: ContextVar[Optional[MetricsCallbackHandler]] = ContextVar(
+    "rag_metrics_handler", default=metrics_handler
+)
+register_configure_hook(_metrics_handler_var, inheritable=True)
@@ -0,0 +1,170 @@
+import os
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# -----------------------
+# Config
+# -----------------------
+MICRO_BATCH_ENABLED = os.getenv("MICRO_BATCH_ENABLED", "1") == "1"
+MICRO_BATCH_WAIT_MS = float(os.getenv("MICRO_BATCH_WAIT_MS", "5"))
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "32"))      # query texts per forward pass
+RERANK_MAX_BATCH = int(os.getenv("RERANK_MAX_BATCH", "128"))   # (query, passage) pairs per forward pass
+STATS_WINDOW = 1000  # recent batches kept for percentiles
+
+
+class MicroBatcher:
+    """
+    Coalesces model calls from concurrent requests. Callers (any thread) submit a list
+    of inputs and block; one worker thread gathers submissions for up to `max_wait_ms`
+    after the first one arrives, or until `max_batch_size` inputs are queued, runs
+    `fn` once on the concatenation and hands every caller its own slice of the output.
+    A submission larger than the batch limit is never split.
+    """
+
+    def __init__(self, name: str, fn: Callable[[List[Any]], Sequence[Any]],
+                 max_batch_size: int, max_wait_ms: float = MICRO_BATCH_WAIT_MS):
+        self.name = name
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._batch_sizes = deque(maxlen=STATS_WINDOW)
+        self._waits_ms = deque(maxlen=STATS_WINDOW)
+        self._counts = {"batches": 0, "requests": 0, "items": 0, "errors": 0}
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"batcher-{self.name}", daemon=True)
+                self._thread.start()
+
+    def submit(self, inputs: List[Any]) -> List[Any]:
+        if not inputs:
+            return []
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((inputs, future, time.perf_counter()))
+        return future.result()
+
+    def _collect(self) -> List[tuple]:
+        batch = [self._queue.get()]
+        size = len(batch[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            inputs = [x for items, _, _ in batch for x in items]
+            try:
+                outputs = self.fn(inputs)
+            except Exception as e:
+                logging.error(f"Batcher {self.name}: batch of {len(inputs)} failed: {e}")
+                self._counts["errors"] += 1
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for items, future, _ in batch:
+                future.set_result(outputs[offset: offset + len(items)])
+                offset += len(items)
+            self._counts["batches"] += 1
+            self._counts["requests"] += len(batch)
+            self._counts["items"] += len(inputs)
+            self._batch_sizes.append(len(inputs))
+            self._waits_ms.extend((started - queued_at) * 1000 for _, _, queued_at in batch)
+
+    def stats(self) -> Dict[str, Any]:
+        sizes, waits = list(self._batch_sizes), list(self._waits_ms)
+        return {
+            **self._counts,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queued": self._queue.qsize(),
+            "mean_batch_size": float(np.mean(sizes)) if sizes else 0.0,
+            "p95_batch_size": float(np.percentile(sizes, 95)) if sizes else 0.0,
+            "p50_queue_wait_ms": float(np.percentile(waits, 50)) if waits else 0.0,
+            "p95_queue_wait_ms": float(np.percentile(waits, 95)) if waits else 0.0,
+        }
+
+
+_batchers: Dict[str, MicroBatcher] = {}
+
+def batcher_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: b.stats() for name, b in _batchers.items()}
+
+def _register(batcher: MicroBatcher) -> MicroBatcher:
+    # Several modules wrap their own model instance; keep every batcher visible in stats
+    name, n = batcher.name, 2
+    while name in _batchers:
+        name, n = f"{batcher.name}-{n}", n + 1
+    batcher.name = name
+    _batchers[name] = batcher
+    return batcher
+
+# -----------------------
+# Model wrappers
+# -----------------------
+class BatchedEmbeddings(Embeddings):
+    """Query embeddings go through the batcher; document batches are already batched and pass through."""
+
+    def __init__(self, inner: Embeddings, max_batch_size: int = EMBED_MAX_BATCH):
+        self.inner = inner
+        self.batcher = _register(MicroBatcher("embed", inner.embed_documents, max_batch_size))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.inner.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.batcher.submit([text])[0]
+
+
+class BatchedCrossEncoder:
+    """Drop-in for CrossEncoder.predict(pairs): pairs from concurrent callers share one forward pass."""
+
+    def __init__(self, inner, max_batch_size: int = RERANK_MAX_BATCH):
+        self.inner = inner
+        self.batcher = _register(MicroBatcher(
+            "rerank", lambda pairs: inner.predict(pairs, batch_size=max_batch_size), max_batch_size
+        ))
+
+    def predict(self, sentences, **kwargs):
+        if kwargs:  # custom batch_size / progress bar etc.: run as asked
+            return self.inner.predict(sentences, **kwargs)
+        if sentences and isinstance(sentences[0], str):  # a single pair
+            return self.batcher.submit([sentences])[0]
+        return np.asarray(self.batcher.submit(list(sentences)))
+
+    def __getattr__(self, name):
+        if name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+
+def batched_embeddings(embeddings: Embeddings) -> Embeddings:
+    return BatchedEmbeddings(embeddings) if MICRO_BATCH_ENABLED else embeddings
+
+def batched_cross_encoder(cross_encoder):
+    return BatchedCrossEncoder(cross_encoder) if MICRO_BATCH_ENABLED else cross_encoder
@@ -0,0 +1,136 @@
+import os
+import json
+import socket
+import struct
+import threading
+from typing import Any, Dict, List
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+
+# -----------------------
+# Config
+# -----------------------
+# With MODEL_SERVER_ENABLED=1 the API workers load no models: legal-bert, the
+# cross-encoder, the intent model and the BM25 corpus live once per host in model_server.py
+MODEL_SERVER_ENABLED = os.getenv("MODEL_SERVER_ENABLED", "0") == "1"
+MODEL_SERVER_SOCKET = os.getenv("MODEL_SERVER_SOCKET", "/tmp/fyp-rag-models.sock")
+MODEL_SERVER_TIMEOUT = float(os.getenv("MODEL_SERVER_TIMEOUT", "60"))
+
+FRAME_HEADER = struct.Struct("!I")  # 4-byte big-endian length prefix, then a UTF-8 JSON body
+
+
+class ModelServerError(RuntimeError):
+    pass
+
+# -----------------------
+# Framing (shared with the server)
+# -----------------------
+def encode_frame(message: Dict[str, Any]) -> bytes:
+    body = json.dumps(message).encode("utf-8")
+    return FRAME_HEADER.pack(len(body)) + body
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    chunks = []
+    while n:
+        chunk = sock.recv(n)
+        if not chunk:
+            raise ConnectionError("model server closed the connection")
+        chunks.append(chunk)
+        n -= len(chunk)
+    return b"".join(chunks)
+
+def recv_frame(sock: socket.socket) -> Dict[str, Any]:
+    (length,) = FRAME_HEADER.unpack(_recv_exact(sock, FRAME_HEADER.size))
+    return json.loads(_recv_exact(sock, length).decode("utf-8"))
+
+# -----------------------
+# Client
+# -----------------------
+class ModelServerClient:
+    """Blocking client; one connection per calling thread, reconnecting once on failure."""
+
+    def __init__(self, path: str = MODEL_SERVER_SOCKET, timeout: float = MODEL_SERVER_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            self._local.sock = sock
+        return sock
+
+    def _drop_connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+        self._local.sock = None
+
+    def call(self, op: str, **params) -> Any:
+        frame = encode_frame({"op": op, **params})
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                sock.sendall(frame)
+                reply = recv_frame(sock)
+                break
+            except (ConnectionError, OSError):
+                # The server restarted (or the connection went stale); retry once on a fresh socket
+                self._drop_connection()
+                if attempt:
+                    raise
+        if "error" in reply:
+            raise ModelServerError(f"{op}: {reply['error']}")
+        return reply["result"]
+
+
+_client = None
+
+def get_client() -> ModelServerClient:
+    global _client
+    if _client is None:
+        _client = ModelServerClient()
+    return _client
+
+# -----------------------
+# Drop-in model stand-ins
+# -----------------------
+class RemoteEmbeddings(Embeddings):
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return get_client().call("embed_documents", texts=texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return get_client().call("embed_query", text=text)
+
+
+class RemoteCrossEncoder:
+    """predict(pairs) like sentence_transformers.CrossEncoder."""
+
+    def predict(self, sentences, **kwargs):
+        if sentences and isinstance(sentences[0], str):  # a single pair
+            return get_client().call("rerank", pairs=[list(sentences)])[0]
+        return np.asarray(get_client().call("rerank", pairs=[list(p) for p in sentences]), dtype=np.float32)
+
+
+class RemoteSentenceEncoder:
+    """encode(texts, normalize_embeddings=...) like SentenceTransformer, for the intent model."""
+
+    def encode(self, sentences, normalize_embeddings: bool = False, **kwargs):
+        vectors = get_client().call("encode_intent", texts=list(sentences), normalize=normalize_embeddings)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+class RemoteBM25Retriever(BaseRetriever):
+    """Keyword search against the BM25 index held by the model server."""
+    k: int = 5
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        hits = get_client().call("bm25", query=query, k=self.k)
+        return [Document(page_content=h["page_content"], metadata=h["metadata"]) for h in hits]
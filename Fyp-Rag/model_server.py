@@ -0,0 +1,164 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+import torch
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_community.retrievers import BM25Retriever
+from sentence_transformers import CrossEncoder
+
+from model_client import MODEL_SERVER_SOCKET, encode_frame, FRAME_HEADER, ModelServerClient, ModelServerError
+from micro_batcher import BatchedEmbeddings, BatchedCrossEncoder, batcher_stats
+from collection_catalog import get_catalog
+from intent_detector import INTENT_MODEL
+
+# -----------------------
+# Config
+# -----------------------
+# The BM25 corpus mirrors the one ask_pdf builds from its Chroma collection
+BM25_PERSIST_DIR = os.getenv("BM25_PERSIST_DIR", "./civil_db")
+BM25_COLLECTION = os.getenv("BM25_COLLECTION", "civil_docs")
+MODEL_SERVER_THREADS = int(os.getenv("MODEL_SERVER_THREADS", "32"))  # handlers mostly wait on the batchers
+
+
+class ModelHost:
+    """
+    The models every API worker would otherwise load: legal-bert query embeddings and
+    the ms-marco cross-encoder (both micro-batched across all workers' requests), the
+    intent model, and the BM25 index over the main collection, rebuilt when that
+    collection is re-ingested.
+    """
+
+    def __init__(self, persist_dir: str = BM25_PERSIST_DIR, collection: str = BM25_COLLECTION):
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.embeddings = BatchedEmbeddings(HuggingFaceEmbeddings(
+            model_name="nlpaueb/legal-bert-base-uncased", model_kwargs={"device": device}
+        ))
+        self.cross_encoder = BatchedCrossEncoder(CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2"))
+        self.collection = collection
+        self.catalog = get_catalog(persist_dir, self.embeddings)
+        self._bm25: Optional[BM25Retriever] = None
+        self._bm25_lock = threading.Lock()
+        self._intent_model = None  # loaded on the first short message
+        self._intent_lock = threading.Lock()
+        self.started_at = time.time()
+        self.requests = 0
+        self.catalog.subscribe(self._on_catalog_change)
+
+    def _on_catalog_change(self, changed):
+        if self.collection in changed:
+            with self._bm25_lock:
+                self._bm25 = None  # rebuilt on the next query
+            logging.info(f"{self.collection} changed; BM25 index will be rebuilt")
+
+    def bm25(self) -> Optional[BM25Retriever]:
+        with self._bm25_lock:
+            if self._bm25 is None and self.collection in self.catalog:
+                vector_db = self.catalog[self.collection]
+                count = vector_db._collection.count()
+                if count:
+                    docs = vector_db.similarity_search("placeholder", k=count)
+                    self._bm25 = BM25Retriever.from_documents(docs)
+                    logging.info(f"BM25 index built over {count} chunks of {self.collection}")
+            return self._bm25
+
+    def intent_model(self):
+        with self._intent_lock:
+            if self._intent_model is None:
+                from sentence_transformers import SentenceTransformer
+
+                self._intent_model = SentenceTransformer(INTENT_MODEL, device="cpu")
+            return self._intent_model
+
+    def handle(self, request: Dict[str, Any]) -> Any:
+        self.requests += 1
+        op = request.get("op")
+        if op == "embed_query":
+            return self.embeddings.embed_query(request["text"])
+        if op == "embed_documents":
+            return self.embeddings.embed_documents(request["texts"])
+        if op == "rerank":
+            return [float(s) for s in self.cross_encoder.predict(request["pairs"])]
+        if op == "encode_intent":
+            vectors = self.intent_model().encode(request["texts"], normalize_embeddings=bool(request.get("normalize")))
+            return vectors.tolist()
+        if op == "bm25":
+            retriever = self.bm25()
+            if retriever is None:
+                return []
+            # Score with the shared index directly; setting retriever.k would race between requests
+            docs = retriever.vectorizer.get_top_n(
+                retriever.preprocess_func(request["query"]), retriever.docs, n=int(request.get("k", 5))
+            )
+            return [{"page_content": d.page_content, "metadata": d.metadata} for d in docs]
+        if op == "stats":
+            return {"uptime_s": time.time() - self.started_at, "requests": self.requests,
+                    "batching": batcher_stats()}
+        if op == "ping":
+            return "pong"
+        raise ValueError(f"Unknown op {op!r}")
+
+# -----------------------
+# Server
+# -----------------------
+async def _serve_connection(host: ModelHost, pool: ThreadPoolExecutor,
+                            reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            try:
+                header = await reader.readexactly(FRAME_HEADER.size)
+            except asyncio.IncompleteReadError:
+                break  # client closed the connection
+            (length,) = FRAME_HEADER.unpack(header)
+            request = json.loads(await reader.readexactly(length))
+            try:
+                reply = {"result": await loop.run_in_executor(pool, host.handle, request)}
+            except Exception as e:
+                logging.error(f"Model server op {request.get('op')!r} failed: {e}")
+                reply = {"error": str(e)}
+            writer.write(encode_frame(reply))
+            await writer.drain()
+    finally:
+        writer.close()
+
+def _server_running(path: str) -> bool:
+    try:
+        return ModelServerClient(path, timeout=2).call("ping") == "pong"
+    except (OSError, ModelServerError):
+        return False
+
+async def serve(path: str = MODEL_SERVER_SOCKET):
+    if os.path.exists(path):
+        if _server_running(path):
+            raise SystemExit(f"A model server is already listening on {path}")
+        os.unlink(path)  # stale socket from a previous run
+    host = ModelHost()
+    pool = ThreadPoolExecutor(max_workers=MODEL_SERVER_THREADS, thread_name_prefix="model-server")
+    # Create the socket as 0600 so no other user can connect, not even before a chmod
+    previous_umask = os.umask(0o177)
+    try:
+        server = await asyncio.start_unix_server(
+            lambda r, w: _serve_connection(host, pool, r, w), path=path
+        )
+    finally:
+        os.umask(previous_umask)
+    logging.info(f"Model server listening on {path}")
+    async with server:
+        await server.serve_forever()
+
+# -----------------------
+# Main
+# -----------------------
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Host embeddings, cross-encoder and BM25 once per machine")
+    parser.add_argument("--socket", default=MODEL_SERVER_SOCKET)
+    args = parser.parse_args()
+    asyncio.run(serve(args.socket))
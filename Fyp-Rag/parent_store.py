@@ -0,0 +1,112 @@
+import json
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+# -----------------------
+# Config
+# -----------------------
+PARENT_DB = "parents.sqlite"
+
+# -----------------------
+# Parent Section Store
+# -----------------------
+class ParentStore:
+    """
+    Side store for parent sections in a small-to-big index. Child chunks (sentences /
+    subsections) live in Chroma with a `parent_id` in their metadata; the parent text
+    lives here and is fetched by primary key, never by vector search.
+    """
+
+    def __init__(self, persist_root: str):
+        self.path = Path(persist_root) / PARENT_DB
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS parents (
+                id TEXT PRIMARY KEY,
+                collection TEXT NOT NULL,
+                text TEXT NOT NULL,
+                metadata TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def put_many(self, collection: str, parents: Iterable[Tuple[str, str, dict]]):
+        """Store (parent_id, text, metadata) records for a collection."""
+        rows = [(pid, collection, text, json.dumps(meta)) for pid, text, meta in parents]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO parents VALUES (?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def delete_collection(self, collection: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM parents WHERE collection = ?", (collection,))
+            self._conn.commit()
+
+    def get_many(self, parent_ids: List[str]) -> Dict[str, Document]:
+        if not parent_ids:
+            return {}
+        placeholders = ",".join("?" for _ in parent_ids)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, text, metadata FROM parents WHERE id IN ({placeholders})",
+                parent_ids,
+            ).fetchall()
+        return {pid: Document(page_content=text, metadata=json.loads(meta)) for pid, text, meta in rows}
+
+    def expand_to_parents(self, docs: List[Document]) -> List[Document]:
+        """
+        Replace matched child chunks by their (deduplicated) parent sections, in the
+        order of the best-ranked child. Documents without a parent_id pass through.
+        """
+        parent_ids = list(dict.fromkeys(
+            d.metadata["parent_id"] for d in docs if d.metadata.get("parent_id")
+        ))
+        parents = self.get_many(parent_ids)
+
+        expanded, emitted = [], {}
+        for doc in docs:
+            pid = doc.metadata.get("parent_id")
+            if not pid or pid not in parents:
+                expanded.append(doc)
+                continue
+            score = doc.metadata.get("relevance_score")
+            if pid in emitted:
+                parent = expanded[emitted[pid]]
+                if score is not None and score > parent.metadata.get("relevance_score", float("-inf")):
+                    parent.metadata["relevance_score"] = score
+                continue
+            parent = parents[pid]
+            parent = Document(page_content=parent.page_content, metadata=dict(parent.metadata))
+            if score is not None:
+                parent.metadata["relevance_score"] = score
+            emitted[pid] = len(expanded)
+            expanded.append(parent)
+        return expanded
+
+
+_stores: Dict[str, ParentStore] = {}
+
+def get_parent_store(persist_root: str) -> Optional[ParentStore]:
+    """Shared store for a persist root, or None if no parent/child index was built there."""
+    if persist_root not in _stores:
+        if not (Path(persist_root) / PARENT_DB).exists():
+            return None
+        _stores[persist_root] = ParentStore(persist_root)
+    return _stores[persist_root]
+
+def expand_to_parents(docs: List[Document], persist_root: str) -> List[Document]:
+    store = get_parent_store(persist_root)
+    if store is None:
+        return docs
+    expanded = store.expand_to_parents(docs)
+    logging.info(f"Small-to-big: {len(docs)} child hits -> {len(expanded)} sections")
+    return expanded
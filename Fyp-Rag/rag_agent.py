@@ -6,6 +6,10 @@ from langchain_huggingface import HuggingFaceEmbeddings
 from langchain.chains import RetrievalQA
 from langchain.chat_models import ChatOpenAI
 from langchain.prompts import PromptTemplate
+
+from llm_cache import enable_llm_cache
+from index_generations import resolve_persist_root
+from hnsw_config import apply_search_ef
 from pathlib import Path
 
 # -----------------------
@@ -19,6 +23,7 @@ DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
 # Load collections dynamically
 # -----------------------
 def load_collections(persist_root: str):
+    persist_root = resolve_persist_root(persist_root)
     log_path = Path(persist_root) / PROCESSED_LOG
     if not log_path.exists():
         raise FileNotFoundError(f"{PROCESSED_LOG} not found in {persist_root}")
@@ -38,6 +43,7 @@ def load_collections(persist_root: str):
             collection_name=collection_name,
             embedding_function=embeddings
         )
+        apply_search_ef(collections[collection_name], collection_name)
     return collections
 
 # -----------------------
@@ -123,6 +129,7 @@ Answer concisely and clearly.
 # -----------------------
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
+    enable_llm_cache()
     collections_dict = load_collections(PERSIST_ROOT)
     available_collections = list(collections_dict.keys())
 
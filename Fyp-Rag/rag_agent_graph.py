@@ -180,6 +180,11 @@ from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.chat_models import ChatOpenAI
 from langchain.prompts import PromptTemplate
 
+from llm_cache import enable_llm_cache
+from index_generations import resolve_persist_root
+from hnsw_config import apply_search_ef
+from metrics import timed_node
+
 from langgraph.graph import StateGraph, END
 
 # -----------------------
@@ -193,6 +198,7 @@ DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
 # Load collections dynamically
 # -----------------------
 def load_collections(persist_root: str):
+    persist_root = resolve_persist_root(persist_root)
     log_path = Path(persist_root) / PROCESSED_LOG
     if not log_path.exists():
         raise FileNotFoundError(f"{PROCESSED_LOG} not found in {persist_root}")
@@ -212,6 +218,7 @@ def load_collections(persist_root: str):
             collection_name=collection_name,
             embedding_function=embeddings
         )
+        apply_search_ef(collections[collection_name], collection_name)
     return collections
 
 # -----------------------
@@ -296,6 +303,7 @@ Answer concisely and clearly.
 # -----------------------
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
+    enable_llm_cache()
     collections_dict = load_collections(PERSIST_ROOT)
     available_collections = list(collections_dict.keys())
 
@@ -305,10 +313,10 @@ if __name__ == "__main__":
     graph = StateGraph(dict)
 
     # Add nodes
-    graph.add_node("QuestionInput", question_input_node)
-    graph.add_node("QuestionAdjuster", lambda state: question_adjuster_node(state, available_collections))
-    graph.add_node("RAGRetriever", lambda state: rag_retriever_node(state, collections_dict))
-    graph.add_node("AnswerGenerator", answer_generation_node)
+    graph.add_node("QuestionInput", timed_node("QuestionInput", question_input_node))
+    graph.add_node("QuestionAdjuster", timed_node("QuestionAdjuster", lambda state: question_adjuster_node(state, available_collections)))
+    graph.add_node("RAGRetriever", timed_node("RAGRetriever", lambda state: rag_retriever_node(state, collections_dict)))
+    graph.add_node("AnswerGenerator", timed_node("AnswerGenerator", answer_generation_node))
 
     # Connect nodes
     graph.add_edge("QuestionInput", "QuestionAdjuster")
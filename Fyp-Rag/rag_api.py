@@ -1,17 +1,46 @@
 # rag_api.py
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 import logging
+import asyncio
+import json
 import time
-from rag_pipeline import rag_pipeline 
+import os
+from rag_pipeline import arag_pipeline_with_sources, astream_rag_pipeline, answer_cache
+from llm_cache import enable_llm_cache
+from ask_pdf import load_or_initialize_embeddings
+from collection_catalog import get_catalog
+from worker_pools import install_default_executor, stage_stats
+from metadata_filters import build_where_filter
+from micro_batcher import batcher_stats
+from metrics import request_trace, render_metrics, register_cache, register_collector
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Persist directories whose collections are listed (and hot-reloaded) by /collections
+COLLECTION_ROOTS = os.getenv("COLLECTION_ROOTS", "./civil_db,chroma_storage").split(",")
+catalogs = [get_catalog(root.strip(), load_or_initialize_embeddings()) for root in COLLECTION_ROOTS if root.strip()]
+
+# Stats owned by the caches, worker pool and batchers are read at scrape time
+register_cache("answer", answer_cache.stats)
+register_cache("llm", lambda: enable_llm_cache().stats() if enable_llm_cache() else None)
+
+def _pool_samples():
+    for name, s in stage_stats().items():
+        yield "rag_stage_in_flight", "gauge", "Requests running in a worker stage", {"stage": name}, s["in_flight"]
+        yield "rag_stage_waiting", "gauge", "Requests queued for a worker stage", {"stage": name}, s["waiting"]
+    for name, s in batcher_stats().items():
+        yield "rag_batcher_batches_total", "counter", "Model forward passes run by a micro-batcher", {"batcher": name}, s["batches"]
+        yield "rag_batcher_items_total", "counter", "Inputs scored by a micro-batcher", {"batcher": name}, s["items"]
+
+register_collector(_pool_samples)
+
 app = FastAPI(
     title="Sri Lanka Government Acts RAG API",
     description="API for querying Sri Lankan Government Acts using RAG",
@@ -27,11 +56,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def startup():
+    # Sync work LangChain offloads by itself shares the sized worker pool
+    install_default_executor()
+
 class ChatRequest(BaseModel):
     message: str
     collections: Optional[List[str]] = None
     max_results: Optional[int] = 5
     include_sources: Optional[bool] = True
+    # e.g. {"act_number": 24, "year": 2023} or {"role": "amendment", "year_from": 2015, "year_to": 2020}
+    filters: Optional[Dict[str, Any]] = None
+    # /chat/stream only: "rag" (retrieval QA) or "map_reduce" (per-document map, then reduce)
+    mode: Optional[str] = "rag"
+    # Add per-stage milliseconds, LLM calls and tokens of this request as "timings"
+    include_timings: Optional[bool] = False
+
+STREAM_MODES = ("rag", "map_reduce")
 
 class HealthResponse(BaseModel):
     status: str
@@ -54,6 +96,29 @@ async def health():
         version="1.0.0"
     )
 
+def _outcome(output: Dict[str, Any]) -> str:
+    if output.get("cached"):
+        return "cached"
+    return "abstained" if output.get("abstained") else "answered"
+
+def format_chat_response(output: Dict[str, Any], request: ChatRequest, processing_time: float,
+                         trace=None) -> Dict[str, Any]:
+    response = {
+        "response": output["answer"],
+        "sources": output.get("sources", []) if request.include_sources else [],
+        "cached": output.get("cached", False),
+        "collections": request.collections or [],
+        "filters": request.filters or {},
+        "confidence": output.get("confidence", 0.0),
+        "abstained": output.get("abstained", False),
+        "intent": output.get("intent"),
+        "processing_time": processing_time,
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+    }
+    if request.include_timings and trace is not None:
+        response["timings"] = trace.breakdown()
+    return response
+
 @app.post("/chat")
 async def chat(request: ChatRequest):
     start_time = time.time()
@@ -61,24 +126,21 @@ async def chat(request: ChatRequest):
     try:
         logger.info(f"Processing chat request: {request.message[:100]}...")
         
-        # Process the message through RAG pipeline
-        response = rag_pipeline(request.message)
+        # Process the message through RAG pipeline (served from the answer cache when possible).
+        # Blocking stages run on the worker pool, so other requests and /health keep being served
+        with request_trace("chat") as trace:
+            output = await arag_pipeline_with_sources(request.message, request.collections, request.filters)
+            trace.outcome = _outcome(output)
         
         processing_time = time.time() - start_time
+        result = format_chat_response(output, request, processing_time, trace)
         
-        # Format response
-        result = {
-            "response": response,
-            "sources": [],  # Add sources if available
-            "collections": request.collections or [],
-            "confidence": 0.8,  # Add confidence scoring
-            "processing_time": processing_time,
-            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-        }
-        
-        logger.info(f"Chat request processed in {processing_time:.2f}s")
+        logger.info(f"Chat request processed in {processing_time:.2f}s (cached={output['cached']})")
         return result
         
+    except ValueError as e:
+        # Unsupported filter keys
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing chat request: {str(e)}")
         raise HTTPException(
@@ -86,18 +148,109 @@ async def chat(request: ChatRequest):
             detail=f"Error processing request: {str(e)}"
         )
 
+def _sse(event: Dict[str, Any]) -> str:
+    return f"data: {json.dumps(event)}\n\n"
+
+def _load_map_reduce():
+    # Imported on first use, in a worker thread: the import loads its own cross-encoder
+    from chromadbpdf import astream_map_reduce
+    return astream_map_reduce
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """
+    Server-Sent Events: "retrieval" and "sources" as soon as retrieval is done, LLM
+    "token"s as they arrive ("partial" per document in map_reduce mode), then "complete"
+    with the same fields as /chat. A client disconnect cancels the in-flight LLM calls.
+    """
+    start_time = time.time()
+    if request.mode not in STREAM_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {list(STREAM_MODES)}")
+    try:
+        build_where_filter(request.filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    logger.info(f"Streaming chat request ({request.mode}): {request.message[:100]}...")
+    if request.mode == "map_reduce":
+        astream_map_reduce = await asyncio.to_thread(_load_map_reduce)
+        events = astream_map_reduce(request.message, filters=request.filters)
+    else:
+        events = astream_rag_pipeline(request.message, request.collections, request.filters)
+
+    async def event_source():
+        with request_trace(f"chat_stream_{request.mode}") as trace:
+            trace.outcome = "disconnected"  # until the complete event goes out
+            try:
+                async for event in events:
+                    if await http_request.is_disconnected():
+                        logger.info("Client disconnected; cancelling the stream")
+                        break
+                    if event["type"] == "complete":
+                        trace.outcome = _outcome(event)
+                        event = {"type": "complete",
+                                 **format_chat_response(event, request, time.time() - start_time, trace)}
+                    elif event["type"] == "sources" and not request.include_sources:
+                        continue
+                    yield _sse(event)
+            except Exception as e:
+                logger.error(f"Error streaming chat request: {str(e)}")
+                trace.outcome = "error"
+                yield _sse({"type": "error", "error": str(e)})
+            finally:
+                # Runs the pipeline's cleanup now: cancels map tasks and closes the LLM stream
+                await events.aclose()
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Semantic answer cache and LLM completion cache statistics"""
+    llm_cache = enable_llm_cache()
+    return {
+        "answer_cache": answer_cache.stats(),
+        "llm_cache": llm_cache.stats() if llm_cache else None,
+    }
+
+@app.delete("/cache")
+async def clear_cache():
+    """Drop every cached answer"""
+    answer_cache.invalidate()
+    return {"status": "cleared"}
+
+@app.get("/workers")
+async def workers():
+    """Concurrency limit, running and queued requests per pipeline stage"""
+    return stage_stats()
+
+@app.get("/batching")
+async def batching():
+    """Micro-batching of query embeddings and rerank pairs: batch sizes and queue waits"""
+    return batcher_stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics: stage, node and LLM latency histograms, token and call counters, cache hit ratios"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/collections")
 async def get_collections():
-    """Get available document collections"""
+    """Get available document collections (live catalog, updated after every ingest)"""
+    details = [
+        {**entry, "persist_root": catalog.persist_root}
+        for catalog in catalogs
+        for entry in catalog.describe()
+    ]
+    last_loaded = max((catalog.snapshot.loaded_at for catalog in catalogs), default=time.time())
     return {
-        "collections": [
-            "Civil_Aviation_Act-Base",
-            "Civil_Aviation_Act-Amendment", 
-            "Economic_Service_Charge_Act-Base",
-            "Economic_Service_Charge_Act-Amendment"
-        ],
-        "total_count": 4,
-        "last_updated": time.strftime("%Y-%m-%d %H:%M:%S")
+        "collections": [entry["name"] for entry in details],
+        "details": details,
+        "total_count": len(details),
+        "last_updated": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(last_loaded))
     }
 
 if __name__ == "__main__":
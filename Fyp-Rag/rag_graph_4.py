@@ -1,14 +1,24 @@
-import json
 import logging
 import torch
 from pathlib import Path
-from typing import TypedDict, List, Any
+from typing import TypedDict, List, Any, Dict
 import os
-from langchain_community.vectorstores import Chroma
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.chat_models import ChatOpenAI
 from langchain.prompts import PromptTemplate
 
+from llm_cache import enable_llm_cache
+from context_packer import pack_context, format_document
+from parent_store import expand_to_parents
+from amendment_index import expand_with_amendments
+from consolidate_acts import CONSOLIDATED_SUFFIX, point_in_time_filter
+from section_index import lookup_section_docs, SECTION_LOOKUP_MODE
+from collection_router import load_router
+from collection_catalog import get_catalog
+from index_generations import resolve_persist_root
+from metadata_filters import build_where_filter, filters_from_query
+from metrics import timed_node
+
 from langgraph.graph import StateGraph, START, END
 
 from dotenv import load_dotenv
@@ -27,6 +37,7 @@ class RAGState(TypedDict):
     selected_collections: List[str]
     retrieved_docs: List[Any]
     final_answer: str
+    filters: Dict[str, Any]  # act, act_number, year, year_from/year_to, language, role
 
 # -----------------------
 # Config
@@ -39,26 +50,17 @@ DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
 # Load collections dynamically
 # -----------------------
 def load_collections(persist_root: str):
-    log_path = Path(persist_root) / PROCESSED_LOG
+    log_path = Path(resolve_persist_root(persist_root)) / PROCESSED_LOG
     if not log_path.exists():
         raise FileNotFoundError(f"{PROCESSED_LOG} not found in {persist_root}")
 
-    with open(log_path, "r") as f:
-        processed = json.load(f)
-
     embeddings = HuggingFaceEmbeddings(
         model_name="nlpaueb/legal-bert-base-uncased",
         model_kwargs={"device": DEVICE}
     )
 
-    collections = {}
-    for collection_name in processed.keys():
-        collections[collection_name] = Chroma(
-            persist_directory=persist_root,
-            collection_name=collection_name,
-            embedding_function=embeddings
-        )
-    return collections
+    # Live view: collections ingested while the graph is running are picked up automatically
+    return get_catalog(persist_root, embeddings)
 
 # -----------------------
 # Node Functions
@@ -67,11 +69,25 @@ def question_input_node(state: RAGState) -> RAGState:
     question = input("\nEnter your question: ").strip()
     return {**state, "user_question": question}
 
-def question_analyzer_node(state: RAGState, available_collections) -> RAGState:
+def question_analyzer_node(state: RAGState, available_collections, router=None) -> RAGState:
     user_question = state["user_question"]
     
     print("\n=== Question Analyzer Agent ===")
     print("Analyzing your question against available legal acts...")
+
+    # Local embedding router first; the LLM analyzer only handles low-confidence questions
+    if router is not None:
+        decision = router.route(user_question)
+        if decision.status != "uncertain":
+            print(f"Routed locally: {decision.status} (score {decision.top_score:.3f}) -> {decision.collections}")
+            return {
+                **state,
+                "analysis_result": f"Local router: {decision.status} (score {decision.top_score:.3f})",
+                "question_status": decision.status,
+                "reshaped_question": "",
+                "selected_collections": decision.collections
+            }
+        print(f"Router confidence low (score {decision.top_score:.3f}); asking the LLM analyzer")
     
     try:
         llm = ChatOpenAI(temperature=0.3)
@@ -256,18 +272,46 @@ def rag_retriever_node(state: RAGState, collections_dict) -> RAGState:
     print(f"\n=== Document Retrieval ===")
     print(f"Searching in collections: {selected_collections}")
     
-    combined_docs = []
-    for name in selected_collections:
+    # Side indexes live next to the collections in the published generation
+    store_root = resolve_persist_root(PERSIST_ROOT)
+
+    # Explicit citations ("section 12(3) of ...") are served by direct lookup
+    combined_docs = lookup_section_docs(question, selected_collections, collections_dict, store_root)
+    if combined_docs:
+        print(f"Found {len(combined_docs)} chunks for the cited section(s)")
+    semantic_collections = [] if combined_docs and SECTION_LOOKUP_MODE == "exclusive" else selected_collections
+
+    # Explicit filters win; otherwise "the 2018 amendment" / "Act No. 24 of 2023" narrow the search
+    explicit_filters = state.get("filters") or {}
+    metadata_where = build_where_filter(explicit_filters or filters_from_query(question))
+    if metadata_where:
+        print(f"Metadata filter: {metadata_where}")
+
+    for name in semantic_collections:
         if name in collections_dict:
-            retriever = collections_dict[name].as_retriever(
-                search_type="similarity", search_kwargs={"k": 5}
-            )
-            docs = retriever.get_relevant_documents(question)
+            # Consolidated Acts hold every historical version; search only the text in force
+            if name.endswith(CONSOLIDATED_SUFFIX):
+                where = point_in_time_filter()
+            else:
+                where = metadata_where
+            hits = collections_dict[name].similarity_search_with_relevance_scores(question, k=5, filter=where)
+            if not hits and metadata_where and where is metadata_where and not explicit_filters:
+                # Inferred filters are a hint only; fall back to the whole collection
+                hits = collections_dict[name].similarity_search_with_relevance_scores(question, k=5)
+            docs = []
+            for doc, score in hits:
+                doc.metadata["relevance_score"] = score
+                docs.append(doc)
             combined_docs.extend(docs)
             print(f"Retrieved {len(docs)} documents from {name}")
         else:
             print(f"Warning: Collection '{name}' not found in available collections")
 
+    # Base-section hits pull in their amending chunks, then child-chunk hits are
+    # swapped for their parent sections (keyed lookups, no extra vector queries)
+    combined_docs = expand_with_amendments(combined_docs, collections_dict, store_root)
+    combined_docs = expand_to_parents(combined_docs, store_root)
+
     print(f"Total documents retrieved: {len(combined_docs)}")
     return {**state, "retrieved_docs": combined_docs}
 
@@ -304,7 +348,8 @@ Instructions:
 
 Answer:
 """
-        context_text = "\n\n---Document---\n".join([f"Source: {doc.metadata.get('source', 'Unknown')}\nContent: {doc.page_content}" for doc in docs])
+        packed_docs = pack_context(docs, model=llm.model_name)
+        context_text = "\n\n---Document---\n".join([format_document(doc) for doc in packed_docs])
         formatted_prompt = prompt_template.format(question=question, context=context_text)
         answer = llm.predict(formatted_prompt)
         return {**state, "final_answer": answer}
@@ -334,15 +379,18 @@ def create_rag_graph(collections_dict, available_collections):
     graph = StateGraph(RAGState)
 
     # Add all nodes
-    graph.add_node("QuestionInput", question_input_node)
-    graph.add_node("QuestionAnalyzer", 
-                  lambda state: question_analyzer_node(state, available_collections))
-    graph.add_node("QuestionReshaping", question_reshaping_node)
-    graph.add_node("CollectionSelector", 
-                  lambda state: smart_collection_selector_node(state, collections_dict))
-    graph.add_node("RAGRetriever", 
-                  lambda state: rag_retriever_node(state, collections_dict))
-    graph.add_node("AnswerGenerator", answer_generation_node)
+    # Every node is timed (see metrics.py)
+    graph.add_node("QuestionInput", timed_node("QuestionInput", question_input_node))
+    # Read the catalog per question so hot-reloaded collections (and a rebuilt router) are used
+    graph.add_node("QuestionAnalyzer", timed_node("QuestionAnalyzer",
+                  lambda state: question_analyzer_node(state, list(collections_dict.keys()),
+                                                       load_router(resolve_persist_root(PERSIST_ROOT), collections_dict))))
+    graph.add_node("QuestionReshaping", timed_node("QuestionReshaping", question_reshaping_node))
+    graph.add_node("CollectionSelector", timed_node("CollectionSelector",
+                  lambda state: smart_collection_selector_node(state, collections_dict)))
+    graph.add_node("RAGRetriever", timed_node("RAGRetriever",
+                  lambda state: rag_retriever_node(state, collections_dict)))
+    graph.add_node("AnswerGenerator", timed_node("AnswerGenerator", answer_generation_node))
 
     # Connect nodes with conditional logic
     graph.add_edge(START, "QuestionInput")
@@ -367,6 +415,7 @@ def create_rag_graph(collections_dict, available_collections):
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
+    enable_llm_cache()
     
     # Check environment setup
     print("=== Environment Check ===")
@@ -410,7 +459,8 @@ if __name__ == "__main__":
                     user_approved_question="",
                     selected_collections=[],
                     retrieved_docs=[],
-                    final_answer=""
+                    final_answer="",
+                    filters={}
                 )
                 
                 # Execute the graph
@@ -1,16 +1,171 @@
+import time
+import asyncio
+import logging
 
-from ask_pdf import initialize_rag_system
+
+from ask_pdf import (
+    initialize_rag_system,
+    load_or_initialize_embeddings,
+    get_vector_db,
+    cross_encoder,
+    PERSIST_DIRECTORY,
+    COLLECTION_NAME,
+)
+from answer_cache import SemanticAnswerCache, ANSWER_CACHE_ENABLED
+from intent_detector import detect_intent
+from confidence import (probe_evidence, ABSTAIN_THRESHOLD, ABSTENTION_MESSAGE, CONFIDENCE_PROBE_K,
+                        CONFIDENCE_CALIBRATED)
+from metadata_filters import build_where_filter
+from collection_catalog import get_catalog
+from worker_pools import run_in_stage, stage
+from metrics import span
+
+FILTERED_TOP_K = 20  # filtered questions search a smaller space, so probe deeper
+FILTERED_CONTEXT_DOCS = 5
 
 
 qa_chain = initialize_rag_system()
+answer_cache = SemanticAnswerCache()
+catalog = get_catalog(PERSIST_DIRECTORY, load_or_initialize_embeddings())
+
+def _reload_qa_chain(changed):
+    """Rebuild the chain (BM25 corpus included) off the request path when civil_docs is re-ingested."""
+    global qa_chain
+    if COLLECTION_NAME not in changed:
+        return
+    rebuilt = initialize_rag_system()
+    if rebuilt:
+        qa_chain = rebuilt
+        answer_cache.invalidate(COLLECTION_NAME)
+        logging.info(f"Swapped in the rebuilt RAG chain for {COLLECTION_NAME}")
+
+catalog.subscribe(_reload_qa_chain)
+
+def format_sources(docs):
+    """Unique (source, page) pairs of the documents an answer was built from."""
+    sources, seen = [], set()
+    for doc in docs:
+        meta = doc.metadata or {}
+        key = (meta.get("source", "Unknown"), meta.get("page_number", meta.get("page")))
+        if key in seen:
+            continue
+        seen.add(key)
+        sources.append({"source": key[0], "page": key[1]})
+    return sources
+
+def _result(answer, intent, sources=None, cached=False, confidence=0.0, abstained=False):
+    return {"answer": answer, "sources": sources or [], "cached": cached,
+            "confidence": confidence, "abstained": abstained, "intent": intent.name}
+
+def _answer_events(result):
+    """A finished answer (template, cache hit, abstention, error) as one token + complete."""
+    return [{"type": "token", "content": result["answer"]}, {"type": "complete", **result}]
+
+async def astream_rag_pipeline(query, collections=None, filters=None):
+    """
+    Invoke RAG with a user question as a stream of events: "retrieval" once evidence is
+    scored, "sources" once the context is chosen, LLM "token"s as they arrive and a final
+    "complete" carrying the answer, its sources, a confidence derived from retrieval/rerank
+    scores and whether it was served from the answer cache. Questions without supporting
+    evidence get a templated abstention and never reach the LLM (once confidence is
+    calibrated, see confidence.py); greetings and help
+    requests are answered from templates before retrieval.
+
+    `filters` (act, act_number, year, year_from/year_to, language, role) restrict the
+    search to matching chunks; filtered questions bypass the answer cache.
+
+    Embedding and rerank work runs on the worker pool and the LLM through its async
+    client, each under its stage's concurrency limit, so the event loop stays free.
+    Closing the generator cancels the LLM call in flight.
+    """
+    with span("intent"):
+        intent = await run_in_stage("embed", detect_intent, query)
+    if intent.response:
+        for event in _answer_events(_result(intent.response, intent, confidence=intent.confidence)):
+            yield event
+        return
 
-def rag_pipeline(query):
-    """Invoke RAG with a user question."""
     if not qa_chain:
-        return "RAG system is not initialized properly."
+        for event in _answer_events(_result("RAG system is not initialized properly.", intent)):
+            yield event
+        return
 
+    where = build_where_filter(filters)
+    use_cache = ANSWER_CACHE_ENABLED and not where
+    start = time.perf_counter()
     try:
-        result = qa_chain.invoke({"query": query})
-        return result["result"]
+        with span("embed_query"):
+            query_embedding = await run_in_stage("embed", load_or_initialize_embeddings().embed_query, query)
+        versions = {}
+        if use_cache:
+            versions = {COLLECTION_NAME: catalog.snapshot.versions.get(COLLECTION_NAME, "")}
+            with span("answer_cache"):
+                hit = answer_cache.lookup(query_embedding, collections, versions)
+            if hit:
+                for event in _answer_events(_result(hit.answer, intent, hit.sources, cached=True,
+                                                    confidence=hit.confidence)):
+                    yield event
+                return
+
+        probe_k = FILTERED_TOP_K if where else CONFIDENCE_PROBE_K
+        with span("evidence_probe"):
+            evidence = await run_in_stage("retrieve", probe_evidence, query, query_embedding, get_vector_db(),
+                                          cross_encoder, k=probe_k, where=where)
+        yield {"type": "retrieval", "confidence": evidence.confidence,
+               "elapsed_ms": (time.perf_counter() - start) * 1000}
+        if CONFIDENCE_CALIBRATED and evidence.confidence < ABSTAIN_THRESHOLD:
+            logging.info(f"Abstaining (confidence {evidence.confidence:.2f} < {ABSTAIN_THRESHOLD})")
+            for event in _answer_events(_result(ABSTENTION_MESSAGE, intent, confidence=evidence.confidence,
+                                                abstained=True)):
+                yield event
+            return
+
+        async with stage("llm"):
+            if where:
+                # The hybrid/multi-query retriever cannot take a metadata filter, so answer
+                # straight from the filtered, reranked probe hits
+                docs = evidence.docs[:FILTERED_CONTEXT_DOCS]
+            else:
+                # Sync retrievers inside the chain are offloaded to the loop's default executor
+                with span("retrieve"):
+                    docs = await qa_chain.retriever.ainvoke(query)
+            sources = format_sources(docs)
+            yield {"type": "sources", "sources": sources}
+
+            parts, final_text = [], ""
+            with span("generate"):
+                async for event in qa_chain.combine_documents_chain.astream_events(
+                    {"input_documents": docs, "question": query}, version="v2"
+                ):
+                    if event["event"] == "on_chat_model_stream" and event["data"]["chunk"].content:
+                        parts.append(event["data"]["chunk"].content)
+                        yield {"type": "token", "content": parts[-1]}
+                    elif event["event"] == "on_chain_end" and isinstance(event["data"].get("output"), dict):
+                        final_text = event["data"]["output"].get("output_text", final_text)
+                if not parts and final_text:
+                    # An LLM cache hit returns the whole generation without stream events
+                    parts.append(final_text)
+                    yield {"type": "token", "content": final_text}
+        answer = "".join(parts).strip()
+
+        if use_cache and answer:
+            answer_cache.store(query, query_embedding, collections, versions, answer, sources,
+                               confidence=evidence.confidence)
+        yield {"type": "complete", **_result(answer, intent, sources, confidence=evidence.confidence)}
     except Exception as e:
-        return f"Error: {e}"
+        for event in _answer_events(_result(f"Error: {e}", intent)):
+            yield event
+
+async def arag_pipeline_with_sources(query, collections=None, filters=None):
+    """The final result of astream_rag_pipeline (see there)."""
+    async for event in astream_rag_pipeline(query, collections, filters):
+        if event["type"] == "complete":
+            return {key: value for key, value in event.items() if key != "type"}
+
+def rag_pipeline_with_sources(query, collections=None, filters=None):
+    """Blocking wrapper for scripts; the API awaits arag_pipeline_with_sources."""
+    return asyncio.run(arag_pipeline_with_sources(query, collections, filters))
+
+def rag_pipeline(query):
+    """Invoke RAG with a user question."""
+    return rag_pipeline_with_sources(query)["answer"]
@@ -0,0 +1,230 @@
+import os
+import json
+import math
+import time
+import shutil
+import resource
+import logging
+import argparse
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+# -----------------------
+# Config
+# -----------------------
+DEFAULT_SCALES = [10, 100, 1000]
+DEFAULT_QUERIES = 20
+QUERY_K = 5
+MAP_REDUCE_K = 4
+# Map-reduce scans every chunk of every collection per question; past this many Acts
+# a run takes hours, so it is skipped (and reported as such) unless raised
+MAP_REDUCE_MAX_ACTS = int(os.getenv("MAP_REDUCE_MAX_ACTS", "1000"))
+# A metric growing faster than corpus_size ** SUPERLINEAR_EXPONENT between two scales is flagged
+SUPERLINEAR_EXPONENT = 1.2
+
+SIZE_METRICS = ["gen_s", "ingest_s", "index_mb", "catalog_s", "bm25_s", "doc_index_s", "router_s",
+                "rss_ingest_mb", "rss_startup_mb", "peak_rss_mb"]
+LATENCY_MODES = ["dense_fanout", "routed", "bm25", "map_reduce"]
+
+
+def _dir_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+def _rss_mb() -> float:
+    """Current resident set size (Linux), falling back to the peak."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        return _peak_rss_mb()
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+def _timed(fn: Callable, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def _latencies(fn: Callable[[str], object], questions: List[str]) -> Dict[str, float]:
+    fn(questions[0])  # warm-up
+    samples = []
+    for question in questions:
+        start = time.perf_counter()
+        fn(question)
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p95_ms": float(np.percentile(samples, 95)),
+        "p99_ms": float(np.percentile(samples, 99)),
+    }
+
+# -----------------------
+# One scale (runs in a fresh process so RSS is per scale)
+# -----------------------
+def bench_scale(n_acts: int, workdir: str, questions: List[str], seed: int,
+                max_amendments: int, fake_embeddings: bool) -> Dict:
+    from langchain_community.embeddings import FakeEmbeddings
+    from langchain_core.language_models import FakeListChatModel
+    from langchain.retrievers import BM25Retriever
+
+    from synth_corpus import generate_corpus
+    from embeddings_pipeline import process_all_acts, load_embeddings
+    from collection_catalog import CollectionCatalog
+    from collection_router import load_router
+    from chromadbpdf import build_doc_index
+    from evaluate_retrieval import STUB_ANSWER, stub_map_reduce
+
+    corpus_dir = str(Path(workdir) / f"acts-{n_acts}")
+    persist_root = str(Path(workdir) / f"store-{n_acts}")
+    result: Dict = {"acts": n_acts}
+
+    corpus, result["gen_s"] = _timed(generate_corpus, corpus_dir, n_acts, seed, max_amendments)
+    result.update({"pdfs": corpus["pdfs"], "pages": corpus["pages"]})
+
+    # Ingest: the production path, side indexes included
+    embeddings = FakeEmbeddings(size=768) if fake_embeddings else load_embeddings()
+    _, result["ingest_s"] = _timed(process_all_acts, corpus_dir, persist_root, embeddings)
+    result["index_mb"] = _dir_size(persist_root) / 1e6
+    result["rss_ingest_mb"] = _rss_mb()
+
+    # Startup: what a serving process does before its first answer
+    catalog, result["catalog_s"] = _timed(CollectionCatalog, persist_root, embeddings, 0)
+    result["collections"] = len(catalog)
+    result["chunks"] = sum(catalog.snapshot.counts.values())
+
+    def load_bm25():
+        docs = []
+        for vs in catalog.values():
+            count = vs._collection.count()
+            if count:
+                docs.extend(vs.similarity_search("placeholder", k=count))
+        retriever = BM25Retriever.from_documents(docs)
+        retriever.k = QUERY_K
+        return retriever
+
+    bm25, result["bm25_s"] = _timed(load_bm25)
+    _, result["doc_index_s"] = _timed(lambda: [build_doc_index(vs) for vs in catalog.values()])
+    router, result["router_s"] = _timed(load_router, persist_root, catalog)
+    result["rss_startup_mb"] = _rss_mb()
+
+    # Queries
+    def dense_fanout(question: str):
+        hits = [hit for vs in catalog.values() for hit in vs.similarity_search_with_score(question, k=QUERY_K)]
+        return sorted(hits, key=lambda h: h[1])[:QUERY_K]
+
+    def routed(question: str):
+        decision = router.route(question)
+        names = decision.collections or sorted(decision.scores, key=decision.scores.get, reverse=True)[:3]
+        names = names or list(catalog)  # an uncalibrated router scores nothing
+        return [catalog[name].similarity_search(question, k=QUERY_K) for name in names]
+
+    modes = {"dense_fanout": dense_fanout, "bm25": bm25.invoke}
+    if router is not None:
+        modes["routed"] = routed
+    if n_acts <= MAP_REDUCE_MAX_ACTS:
+        stub_llm = FakeListChatModel(responses=[STUB_ANSWER], cache=False)
+        modes["map_reduce"] = lambda q: stub_map_reduce(catalog, q, MAP_REDUCE_K, stub_llm)
+    for mode, fn in modes.items():
+        result[mode] = _latencies(fn, questions)
+        logging.info(f"[{n_acts} Acts] {mode}: {result[mode]}")
+
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+# -----------------------
+# Report
+# -----------------------
+def _metric(result: Dict, key: str) -> Optional[float]:
+    if key in LATENCY_MODES:
+        return result[key]["p95_ms"] if key in result else None
+    return result.get(key)
+
+def scaling_exponents(results: List[Dict]) -> List[Dict[str, Optional[float]]]:
+    """log(metric ratio) / log(size ratio) between consecutive scales: ~1 is linear, >1 superlinear."""
+    exponents = []
+    for prev, cur in zip(results, results[1:]):
+        size_ratio = math.log(cur["acts"] / prev["acts"])
+        row = {"from": prev["acts"], "to": cur["acts"]}
+        for key in SIZE_METRICS + LATENCY_MODES:
+            before, after = _metric(prev, key), _metric(cur, key)
+            row[key] = math.log(after / before) / size_ratio if before and after else None
+        exponents.append(row)
+    return exponents
+
+def print_report(results: List[Dict], exponents: List[Dict]):
+    header = (f"{'acts':>6}{'chunks':>9}{'ingest s':>10}{'index MB':>10}{'startup s':>11}"
+              f"{'doc_idx s':>11}{'peak MB':>9}" + "".join(f"{m + ' p95':>18}" for m in LATENCY_MODES))
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        startup = r["catalog_s"] + r["bm25_s"] + r["router_s"]
+        latencies = "".join(f"{r[m]['p95_ms']:>15.1f} ms" if m in r else f"{'skipped':>18}" for m in LATENCY_MODES)
+        print(f"{r['acts']:>6}{r['chunks']:>9}{r['ingest_s']:>10.1f}{r['index_mb']:>10.1f}{startup:>11.1f}"
+              f"{r['doc_index_s']:>11.2f}{r['peak_rss_mb']:>9.0f}{latencies}")
+
+    flagged = [
+        f"{key}: exponent {row[key]:.2f} from {row['from']} to {row['to']} Acts"
+        for row in exponents for key in SIZE_METRICS + LATENCY_MODES
+        if row[key] is not None and row[key] > SUPERLINEAR_EXPONENT
+    ]
+    print("\nSuperlinear growth:" if flagged else "\nNo superlinear growth detected.")
+    for line in flagged:
+        print(f"  {line}")
+
+# -----------------------
+# Main
+# -----------------------
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Ingest synthetic corpora of growing size and chart the costs")
+    parser.add_argument("--scales", type=str, default=",".join(map(str, DEFAULT_SCALES)),
+                        help="Comma-separated corpus sizes in Acts")
+    parser.add_argument("--questions", type=str, default="golden_set.json",
+                        help="Golden set JSON or a file with one question per line")
+    parser.add_argument("--queries", type=int, default=DEFAULT_QUERIES)
+    parser.add_argument("--max-amendments", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fake-embeddings", action="store_true",
+                        help="Random 768-d vectors instead of legal-bert: isolates storage and index "
+                             "costs from model cost (dense results are then meaningless)")
+    parser.add_argument("--workdir", type=str, help="Keep corpora and stores here (default: a temp dir)")
+    parser.add_argument("--output", type=str, help="Write results and scaling exponents as JSON")
+    args = parser.parse_args()
+
+    with open(args.questions, "r") as f:
+        if args.questions.endswith(".json"):
+            questions = [q["question"] for q in json.load(f)["questions"]]
+        else:
+            questions = [line.strip() for line in f if line.strip()]
+    questions = questions[: args.queries]
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="scale-bench-")
+    scales = sorted(int(s) for s in args.scales.split(","))
+    results = []
+    try:
+        # A fresh process per scale keeps peak RSS and warm caches from leaking across sizes
+        context = multiprocessing.get_context("spawn")
+        for n_acts in scales:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                results.append(pool.submit(bench_scale, n_acts, workdir, questions, args.seed,
+                                           args.max_amendments, args.fake_embeddings).result())
+            if not args.workdir:
+                shutil.rmtree(Path(workdir) / f"acts-{n_acts}", ignore_errors=True)
+                shutil.rmtree(Path(workdir) / f"store-{n_acts}", ignore_errors=True)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    exponents = scaling_exponents(results)
+    print(f"\n=== Scale benchmark ({len(questions)} queries per mode) ===")
+    print_report(results, exponents)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"results": results, "scaling_exponents": exponents}, f, indent=2)
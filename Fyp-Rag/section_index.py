@@ -0,0 +1,134 @@
+import os
+import re
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import chromadb
+from langchain_core.documents import Document
+
+from collection_manifest import load_manifest
+from amendment_index import BASE_SUFFIX, section_chunks
+from legal_text import find_subsections, parse_section_references
+
+# -----------------------
+# Config
+# -----------------------
+SECTION_INDEX_FILE = "section_index.json"
+# "merge": cited sections are added on top of the semantic hits
+# "exclusive": when a citation resolves, skip the vector search entirely
+SECTION_LOOKUP_MODE = os.getenv("SECTION_LOOKUP_MODE", "merge")
+WHOLE_SECTION = ""  # subsection key for "the whole section"
+
+
+def _act_key(name: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", name.lower().replace("_", " "))
+
+# -----------------------
+# Index Builder
+# -----------------------
+def build_section_index(persist_root: str) -> Dict[str, Any]:
+    """
+    Map (Act, section, subsection) -> chunk ids of the base Act collection.
+    Layout: {act: {"collection": name, "sections": {section: {subsection: [ids]}}}}
+    where subsection "" holds every chunk of the section.
+    """
+    client = chromadb.PersistentClient(path=persist_root)
+    index: Dict[str, Any] = {}
+
+    for collection_name in [n for n in load_manifest(persist_root) if n.endswith(BASE_SUFFIX)]:
+        act = collection_name[: -len(BASE_SUFFIX)]
+        rows = client.get_collection(collection_name).get(include=["metadatas", "documents"])
+        texts = dict(zip(rows["ids"], rows["documents"]))
+        sections: Dict[str, Dict[str, List[str]]] = {}
+        for section, cids in section_chunks(rows["ids"], rows["metadatas"], rows["documents"]).items():
+            entry = sections.setdefault(section, {WHOLE_SECTION: []})
+            entry[WHOLE_SECTION] = cids
+            current_sub = None
+            for cid in cids:
+                subs = find_subsections(texts[cid])
+                owners = ([current_sub] if current_sub else []) + subs
+                for sub in dict.fromkeys(owners):
+                    entry.setdefault(sub, []).append(cid)
+                if subs:
+                    current_sub = subs[-1]
+        index[act] = {"collection": collection_name, "sections": sections}
+
+    tmp_path = Path(persist_root) / f"{SECTION_INDEX_FILE}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, Path(persist_root) / SECTION_INDEX_FILE)
+    logging.info(f"Section index: {sum(len(a['sections']) for a in index.values())} sections in {len(index)} Acts")
+    return index
+
+# -----------------------
+# Lookup
+# -----------------------
+class SectionIndex:
+    def __init__(self, index: Dict[str, Any]):
+        self.index = index
+        self._act_keys = {_act_key(act): act for act in index}
+
+    @classmethod
+    def load(cls, persist_root: str) -> Optional["SectionIndex"]:
+        path = Path(persist_root) / SECTION_INDEX_FILE
+        if not path.exists():
+            return None
+        with open(path, "r") as f:
+            return cls(json.load(f))
+
+    def _candidate_acts(self, act_hint: Optional[str], collections: Optional[List[str]]) -> List[str]:
+        if act_hint:
+            hint = _act_key(act_hint)
+            matches = [act for key, act in self._act_keys.items() if hint in key or key in hint]
+            if matches:
+                return matches
+        if collections:
+            keys = {_act_key(c.rsplit("-", 1)[0]) for c in collections}
+            return [act for key, act in self._act_keys.items() if key in keys]
+        return list(self.index)
+
+    def lookup(self, query: str, collections: Optional[List[str]] = None) -> List[Tuple[str, str]]:
+        """(collection, chunk id) pairs for every explicit section citation in the query."""
+        hits = []
+        for ref in parse_section_references(query):
+            for act in self._candidate_acts(ref["act"], collections):
+                entry = self.index[act]["sections"].get(ref["section"])
+                if not entry:
+                    continue
+                cids = entry.get(ref["subsection"] or WHOLE_SECTION) or entry[WHOLE_SECTION]
+                hits.extend((self.index[act]["collection"], cid) for cid in cids)
+        return list(dict.fromkeys(hits))
+
+
+_indexes: Dict[str, Optional[SectionIndex]] = {}
+
+def clear_cached_index(persist_root: str):
+    """Forget the loaded index so the next lookup reads the rebuilt file."""
+    _indexes.pop(persist_root, None)
+
+def lookup_section_docs(query: str, collections: Optional[List[str]], collections_dict,
+                        persist_root: str) -> List[Document]:
+    """Fetch the chunks of every cited section by id (no embedding, no similarity search)."""
+    if persist_root not in _indexes:
+        _indexes[persist_root] = SectionIndex.load(persist_root)
+    index = _indexes[persist_root]
+    if index is None:
+        return []
+
+    by_collection: Dict[str, List[str]] = {}
+    for collection_name, cid in index.lookup(query, collections):
+        by_collection.setdefault(collection_name, []).append(cid)
+
+    docs = []
+    for collection_name, cids in by_collection.items():
+        if collection_name not in collections_dict:
+            continue
+        rows = collections_dict[collection_name].get(ids=cids, include=["metadatas", "documents"])
+        for meta, text in zip(rows["metadatas"], rows["documents"]):
+            # Explicitly cited text outranks any similarity hit
+            docs.append(Document(page_content=text, metadata={**meta, "relevance_score": 1.0}))
+    if docs:
+        logging.info(f"Section lookup served {len(docs)} chunks for cited sections")
+    return docs
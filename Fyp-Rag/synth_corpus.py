@@ -0,0 +1,193 @@
+import os
+import re
+import random
+import logging
+import argparse
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import fitz  # PyMuPDF
+
+from embeddings_pipeline import extract_text_from_pdf
+from legal_text import parse_act_filename
+
+# -----------------------
+# Config
+# -----------------------
+REAL_ACTS_DIR = os.getenv("REAL_ACTS_DIR", "Acts")
+FIRST_YEAR, LAST_YEAR = 1950, 2024
+MAX_ACT_NUMBER = 999  # gazette file names carry at most three digits
+PAGE_MARGIN = 50
+FONT_SIZE = 8
+
+# Synthetic Act names are "<qualifier> <subject> Act"; subject terms also replace the
+# real Acts' domain vocabulary so BM25 and the router see a growing, distinct vocabulary
+SUBJECTS = [
+    "Fisheries", "Forest", "Excise", "Telecommunications", "Irrigation", "Customs", "Pharmacy",
+    "Mining", "Tourism", "Shipping", "Railway", "Electricity", "Water Supply", "Land Acquisition",
+    "Tea Board", "Coconut Development", "Rubber Control", "Motor Traffic", "Consumer Affairs",
+    "Securities", "Insurance", "Banking", "Copyright", "Archaeology", "National Parks",
+    "Public Health", "Gemstones", "Coast Conservation", "Housing", "Cooperative Societies",
+    "Postal Services", "Broadcasting", "Education", "Universities", "Labour Relations",
+    "Pensions", "Stamp Duty", "Betting", "Wildlife", "Fertilizer",
+]
+QUALIFIERS = [
+    "National", "Provincial", "Regional", "Municipal", "Public", "State", "Rural", "Urban",
+    "Central", "Marine", "Agricultural", "Industrial", "Colonial", "Maritime", "Special",
+]
+SUBJECT_TERMS = [
+    "licence", "levy", "vessel", "permit", "tariff", "inspector", "registry", "quota",
+    "operator", "consignment", "tribunal", "undertaking", "concession", "warehouse",
+    "cultivator", "dealer", "station", "reserve", "board", "fund",
+]
+
+_ACT_NUMBER_RE = re.compile(r"No\.?\s*(\d{1,3})\s+of\s+(\d{4})", re.IGNORECASE)
+# Domain words of the bundled Acts, swapped for the synthetic Act's own terms
+_DOMAIN_TERMS_RE = re.compile(
+    r"\b(aircraft|aerodromes?|aviation|airport|air\s+navigation|turnover|service\s+charge|"
+    r"carriers?|passengers?|baggage|cargo)\b",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class TemplateAct:
+    """Page texts of one real Act and its amendments, used as a skeleton."""
+    name: str
+    number: int
+    year: int
+    base_pages: List[str]
+    amendments: List[List[str]] = field(default_factory=list)
+
+
+# -----------------------
+# Templates from the real Acts
+# -----------------------
+def _pages(pdf_path: Path) -> List[str]:
+    return [text for _, text in extract_text_from_pdf(str(pdf_path))]
+
+def harvest_templates(acts_dir: str = REAL_ACTS_DIR) -> List[TemplateAct]:
+    """Read the bundled Acts (<Act>/base/*.pdf, <Act>/amendment/*.pdf) as page-text skeletons."""
+    templates = []
+    for act_dir in sorted(Path(acts_dir).iterdir()):
+        base_pdfs = sorted((act_dir / "base").glob("*.pdf")) if act_dir.is_dir() else []
+        if not base_pdfs:
+            continue
+        info = parse_act_filename(base_pdfs[0].name) or {"act_number": 1, "year": 2000}
+        templates.append(TemplateAct(
+            name=act_dir.name.replace(" Act", ""),
+            number=info["act_number"],
+            year=info["year"],
+            base_pages=_pages(base_pdfs[0]),
+            amendments=[_pages(p) for p in sorted((act_dir / "amendment").glob("*.pdf"))],
+        ))
+    if not templates:
+        raise FileNotFoundError(f"No Acts with a base/ folder under {acts_dir}")
+    logging.info(f"Harvested {len(templates)} template Acts from {acts_dir}")
+    return templates
+
+# -----------------------
+# Synthesis
+# -----------------------
+class ActNumbering:
+    """Hands out unique (number, year) pairs, like the gazette does per calendar year."""
+
+    def __init__(self):
+        self._next: Dict[int, int] = {}
+
+    def take(self, rng: random.Random, first_year: int) -> Tuple[int, int]:
+        for _ in range(LAST_YEAR - FIRST_YEAR + 1):
+            year = rng.randint(first_year, LAST_YEAR)
+            number = self._next.get(year, 1)
+            if number <= MAX_ACT_NUMBER:
+                self._next[year] = number + 1
+                return number, year
+        raise RuntimeError("Ran out of Act numbers; lower the corpus size")
+
+def _rewrite(text: str, template: TemplateAct, name: str, terms: List[str],
+             own: Tuple[int, int], principal: Tuple[int, int], rng: random.Random) -> str:
+    """Rename the Act, renumber Act citations and swap the domain vocabulary."""
+    name_re = re.compile(r"\s+".join(map(re.escape, template.name.split())), re.IGNORECASE)
+    text = name_re.sub(name, text)
+
+    def renumber(match: re.Match) -> str:
+        cited = (int(match.group(1)), int(match.group(2)))
+        number, year = principal if cited == (template.number, template.year) else own
+        return f"No. {number} of {year}"
+
+    text = _ACT_NUMBER_RE.sub(renumber, text)
+    return _DOMAIN_TERMS_RE.sub(lambda _: rng.choice(terms), text)
+
+def synthesize_act(rng: random.Random, index: int, templates: List[TemplateAct],
+                   numbering: ActNumbering, max_amendments: int) -> Dict:
+    """One synthetic Act: {"folder", "base": (file name, pages), "amendments": [(file name, pages), ...]}."""
+    template = rng.choice(templates)
+    name = f"{rng.choice(QUALIFIERS)} {rng.choice(SUBJECTS)}"
+    terms = rng.sample(SUBJECT_TERMS, 4)
+    principal = numbering.take(rng, FIRST_YEAR)
+
+    # Page count varies around the template's, sampling real pages with replacement
+    n_pages = max(1, int(len(template.base_pages) * rng.uniform(0.5, 1.5)))
+    pages = [template.base_pages[0]] + rng.choices(template.base_pages[1:] or template.base_pages, k=n_pages - 1)
+    base = (f"{principal[0]}-{principal[1]}_E.pdf",
+            [_rewrite(p, template, name, terms, principal, principal, rng) for p in pages])
+
+    amendments = []
+    n_amendments = rng.randint(0, min(max_amendments, len(template.amendments)))
+    for amendment_pages in rng.sample(template.amendments, n_amendments):
+        own = numbering.take(rng, min(principal[1] + 1, LAST_YEAR))
+        amendments.append((f"{own[0]}-{own[1]}_E.pdf",
+                           [_rewrite(p, template, name, terms, own, principal, rng) for p in amendment_pages]))
+    return {"folder": f"{name} Act {index:05d}", "base": base, "amendments": amendments}
+
+def write_pdf(path: Path, pages: List[str]):
+    doc = fitz.open()
+    for text in pages:
+        page = doc.new_page()
+        box = fitz.Rect(PAGE_MARGIN, PAGE_MARGIN, page.rect.width - PAGE_MARGIN, page.rect.height - PAGE_MARGIN)
+        page.insert_textbox(box, text, fontsize=FONT_SIZE)  # overflow is clipped, like a real page break
+    doc.save(str(path))
+    doc.close()
+
+def generate_corpus(out_dir: str, n_acts: int, seed: int = 0, max_amendments: int = 3,
+                    templates: List[TemplateAct] = None) -> Dict[str, int]:
+    """
+    Write `n_acts` synthetic Acts under out_dir/<Act>/{base,amendment}/<No>-<Year>_E.pdf,
+    the layout process_all_acts and document_metadata expect.
+    """
+    rng = random.Random(seed)
+    templates = templates or harvest_templates()
+    numbering = ActNumbering()
+    stats = {"acts": 0, "pdfs": 0, "pages": 0}
+    for index in range(n_acts):
+        act = synthesize_act(rng, index, templates, numbering, max_amendments)
+        act_dir = Path(out_dir) / act["folder"]
+        for role, files in (("base", [act["base"]]), ("amendment", act["amendments"])):
+            if not files:
+                continue
+            (act_dir / role).mkdir(parents=True, exist_ok=True)
+            for file_name, pages in files:
+                write_pdf(act_dir / role / file_name, pages)
+                stats["pdfs"] += 1
+                stats["pages"] += len(pages)
+        stats["acts"] += 1
+        if (index + 1) % 500 == 0:
+            logging.info(f"Generated {index + 1}/{n_acts} Acts")
+    logging.info(f"Synthetic corpus in {out_dir}: {stats}")
+    return stats
+
+# -----------------------
+# Main
+# -----------------------
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Generate a synthetic Acts corpus modelled on the bundled Acts")
+    parser.add_argument("--out", required=True, help="Output folder (used like ./Acts)")
+    parser.add_argument("--acts", type=int, default=100)
+    parser.add_argument("--max-amendments", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--templates", default=REAL_ACTS_DIR, help="Folder of real Acts to model")
+    args = parser.parse_args()
+
+    generate_corpus(args.out, args.acts, args.seed, args.max_amendments, harvest_templates(args.templates))
@@ -0,0 +1,98 @@
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("langchain_chroma")
+
+from consolidate_acts import ConsolidatedAct, split_amending_clauses, strip_page_furniture
+
+# Pages and sections as extracted from the Acts under Acts/
+
+ESC_SECTION_4 = """4.
+Notwithstanding anything to the contrary in any law,
+the remaining portion of the service charge referred to in sub-
+paragraph (b) of subsection (6) of section 3, shall not be
+refunded."""
+
+ESC_15_2007_CLAUSE_4 = """4.
+Section 4 of the principal enactment is hereby amended
+by the substitution for the words and figures “referred to in
+sub-paragraph (b) of subsection (6) of section 3, shall” of the
+words and figures “referred to in sub-paragraph (b) of
+subsection (4) of section 3, shall”."""
+
+CIVIL_AVIATION_12_2018_PAGE_2 = """Civil Aviation (Amendment) Act, No. 12 of 2018
+1
+[Certified on 21st of May, 2018]
+1.
+This Act may be cited as the Civil Aviation
+(Amendment) Act, No. 12 of 2018.
+2.
+The following new section is hereby inserted
+immediately after section 18, of the Civil Aviation Act, No.
+14 of 2010 and shall have effect as section 18A of that
+enactment:—
+18A. (1) Every person who is found by an
+employee providing Aviation Security Services
+hospitality trade, shall not constitute an offence.
+“Offence of
+touting within
+an aerodrome.
+Short title.
+Insertion of new
+section 18A in the
+Civil Aviation Act,
+No. 14 of 2010.
+2—PL 010705 — 2,977 (04//2018)"""
+
+CIVIL_AVIATION_12_2018_PAGE_3 = """Civil Aviation (Amendment) Act, No. 12 of 2018
+2
+(2) Every person arrested by or apprehended
+and handed over to the police officer
+been committed.
+3.
+In the event of any inconsistency between the Sinhala
+and Tamil texts of this Act, the Sinhala text shall prevail.
+Sinhala text to
+prevail in case of
+inconsistency."""
+
+CIVIL_AVIATION_24_2023_CLAUSE_2 = """2. Section 6 of the Civil Aviation Act, No. 14 of 2010 is
+hereby amended in subsection (3) thereof, by the repeal of
+paragraph (e) and the substitution therefor, of the following
+paragraph:-
+ “(e) appoint one or more persons to be Service
+Providers for providing aeronautical services"""
+
+
+def test_word_substitution_across_line_wrapping():
+    act = ConsolidatedAct("ESC", 2006, [("4", ESC_SECTION_4, ["13-2006_E.pdf:6"])])
+
+    assert act.apply(ESC_15_2007_CLAUSE_4, 2007, "Act No. 15 of 2007", ["15-2007_E.pdf:4"]) == 1
+    assert "subsection (4) of section 3, shall not be" in act.current_text("4")
+    assert "[Amended by" not in act.current_text("4")
+
+
+def test_inserted_section_stays_with_its_clause():
+    pages = [(name, page, strip_page_furniture(text)) for name, page, text in [
+        ("12-2018_E.pdf", 2, CIVIL_AVIATION_12_2018_PAGE_2),
+        ("12-2018_E.pdf", 3, CIVIL_AVIATION_12_2018_PAGE_3),
+    ]]
+    clauses = split_amending_clauses(pages)
+    assert [section for section, _, _ in clauses] == ["PREAMBLE", "1", "2", "3"]
+
+    act = ConsolidatedAct("Civil_Aviation", 2010, [("18", "18. ...", []), ("19", "19. ...", [])])
+    act.apply(clauses[2][1], 2018, "Act No. 12 of 2018", clauses[2][2])
+
+    assert act.order == ["18", "18A", "19"]
+    inserted = act.current_text("18A")
+    assert inserted.startswith("18A. (1) Every person") and inserted.endswith("been committed.")
+    assert "Short title" not in inserted and "PL 010705" not in inserted
+
+
+def test_paragraph_substitution_is_noted_not_applied_to_whole_section():
+    act = ConsolidatedAct("Civil_Aviation", 2010, [("6", "6. (1) The Minister may ...", [])])
+    act.apply(CIVIL_AVIATION_24_2023_CLAUSE_2, 2023, "Act No. 24 of 2023", ["24-2023_E.pdf:2"])
+
+    text = act.current_text("6")
+    assert text.startswith("6. (1) The Minister may ...")
+    assert "[Amended by Act No. 24 of 2023: 2. Section 6" in text
@@ -0,0 +1,83 @@
+from legal_text import parse_amendment_references
+
+# Clauses as extracted (line breaks included) from the amendment Acts under pdfs/
+
+CIVIL_AVIATION_12_2018 = """2.
+The following new section is hereby inserted
+immediately after section 18, of the Civil Aviation Act, No.
+14 of 2010 and shall have effect as section 18A of that
+enactment:—
+18A. (1) Every person who is found by an
+employee providing Aviation Security Services"""
+
+CIVIL_AVIATION_24_2023 = """2. Section 6 of the Civil Aviation Act, No. 14 of 2010 is
+hereby amended in subsection (3) thereof, by the repeal of
+paragraph (e) and the substitution therefor, of the following
+paragraph:-"""
+
+ESC_04_2020 = """2.
+Section 2 of the Economic Service Charge Act, No.
+13 of 2006 is hereby amended in subsection (1) by the
+substitution for the words “be charged from every person and"""
+
+ESC_06_2013 = """2.
+Section 2 of the Economic Service Charge Act,
+No. 13 of 2006 (hereinafter referred to as the “principal
+enactment”) as last amended by  Act, No. 11 of 2012 is
+hereby further amended in subsection (3) of that section as
+follows:—
+(1)
+in the proviso to paragraph (a), by the substitution"""
+
+ESC_09_2014 = """2.
+Section 3 of the Economic Service Charge Act,
+No. 13 of 2006 (hereinafter referred to as the “principal
+enactment”) as last amended by Act, No. 11 of 2008 is hereby
+further amended by the insertion, immediately after
+subsection (3) of that section, of the following new
+subsection—"""
+
+ESC_16_2009 = """2. Section 2 of the Economic Service Charge Act, No. 13
+of 2006 (hereinafter referred to as the ''principal enactment")
+is hereby further amended as follows :–
+(1)
+by the repeal of the proviso to subsection (2) of"""
+
+# Citations of other Acts just before the next amending clause
+ESC_15_2007 = """any business of a reopened factory
+referred to in section 24B of the
+Inland Revenue Act, No. 10 of 2006.
+3.
+Section 3 of the principal enactment is hereby amended
+as follows :—
+(1)
+by the repeal of subsections (3), (4) and (5) of that
+section
+under subsection (1) or subsection (7) of section
+106 of the Inland Revenue Act, No. 10 of 2006.”.
+6.
+Section 13 of the principal enactment is hereby
+amended in the definition of the expression “person”, by the"""
+
+
+def _sections(text):
+    return [section for section, _ in parse_amendment_references(text)]
+
+
+def test_insertion_after_section_of_named_act():
+    assert parse_amendment_references(CIVIL_AVIATION_12_2018) == [("18", "insert_after")]
+
+
+def test_amendment_of_named_act():
+    assert parse_amendment_references(CIVIL_AVIATION_24_2023) == [("6", "substitute")]
+    assert _sections(ESC_04_2020) == ["2"]
+
+
+def test_further_amendment_with_hereinafter_clause():
+    assert _sections(ESC_06_2013) == ["2"]
+    assert _sections(ESC_09_2014) == ["3"]
+    assert _sections(ESC_16_2009) == ["2"]
+
+
+def test_citations_of_other_acts_are_not_amendments():
+    assert _sections(ESC_15_2007) == ["3", "13"]
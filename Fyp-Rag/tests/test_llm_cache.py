@@ -0,0 +1,46 @@
+import pytest
+
+langchain_openai = pytest.importorskip("langchain_openai")
+from langchain_core.outputs import ChatGeneration
+from langchain_core.messages import AIMessage
+
+from llm_cache import CompletionCache, _llm_params
+
+
+def _llm_string(temperature: float) -> str:
+    llm = langchain_openai.ChatOpenAI(model="gpt-4o-mini", temperature=temperature, api_key="sk-test")
+    return llm._get_llm_string()
+
+
+def test_params_from_chat_openai_llm_string():
+    assert _llm_params(_llm_string(0)) == (0.0, "gpt-4o-mini")
+    assert _llm_params(_llm_string(0.7))[0] == 0.7
+
+
+def test_call_time_params_override_the_model():
+    llm_string = _llm_string(0).split("---")[0] + "---" + str(sorted({"temperature": 0.5}.items()))
+    assert _llm_params(llm_string)[0] == 0.5
+
+
+def test_deterministic_completion_round_trips(tmp_path):
+    cache = CompletionCache(path=str(tmp_path / "cache.sqlite"))
+    llm_string = _llm_string(0)
+    generation = ChatGeneration(message=AIMessage(content="Section 3 applies."))
+
+    assert cache.lookup("prompt", llm_string) is None
+    cache.update("prompt", llm_string, [generation])
+    hit = cache.lookup("prompt", llm_string)
+
+    assert hit is not None and hit[0].message.content == "Section 3 applies."
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["skipped_nondeterministic"] == 0
+
+
+def test_sampled_completions_are_not_cached(tmp_path):
+    cache = CompletionCache(path=str(tmp_path / "cache.sqlite"))
+    llm_string = _llm_string(0.7)
+    cache.update("prompt", llm_string, [ChatGeneration(message=AIMessage(content="x"))])
+
+    assert cache.lookup("prompt", llm_string) is None
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["skipped_nondeterministic"] == 1
@@ -0,0 +1,206 @@
+import os
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import itertools
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import chromadb
+
+from index_generations import resolve_persist_root
+from hnsw_config import (
+    CHROMA_CREATION_DEFAULTS,
+    HNSW_CONFIG_FILE,
+    load_hnsw_config,
+    save_hnsw_config,
+    to_collection_metadata,
+)
+
+# -----------------------
+# Config
+# -----------------------
+# The distance space is not tuned: it is what the collection (and its relevance scores) was built with
+DEFAULT_GRID = {
+    "M": [8, 16, 32],
+    "ef_construction": [100, 200],
+    "ef_search": [10, 50, 100],
+}
+ADD_BATCH = 5000
+GOLDEN_SET = os.getenv("GOLDEN_SET", "golden_set.json")  # real questions to query with
+EMBEDDING_MODEL = "nlpaueb/legal-bert-base-uncased"
+
+
+def _dir_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+def collection_space(collection) -> str:
+    """The distance space the collection was created with (Chroma's default is l2)."""
+    configuration = getattr(collection, "configuration", None)
+    if isinstance(configuration, dict) and isinstance(configuration.get("hnsw"), dict):
+        space = configuration["hnsw"].get("space")
+        if space:
+            return space
+    return (collection.metadata or {}).get("hnsw:space", CHROMA_CREATION_DEFAULTS["space"])
+
+def load_vectors(persist_root: str, collection_name: str) -> Tuple[np.ndarray, str]:
+    client = chromadb.PersistentClient(path=resolve_persist_root(persist_root))
+    collection = client.get_collection(collection_name)
+    rows = collection.get(include=["embeddings"])
+    return np.asarray(rows["embeddings"], dtype=np.float32), collection_space(collection)
+
+def load_question_vectors(path: str) -> Optional[np.ndarray]:
+    """Embeddings of the golden-set questions (or a JSON list of questions), None if unavailable."""
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        data = json.load(f)
+    items = data["questions"] if isinstance(data, dict) else data
+    questions = [q["question"] if isinstance(q, dict) else q for q in items]
+    if not questions:
+        return None
+    try:
+        import torch
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+    except ImportError as e:
+        logging.warning(f"Cannot embed questions from {path} ({e}); using perturbed chunks")
+        return None
+    embeddings = HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL, model_kwargs={"device": "cuda" if torch.cuda.is_available() else "cpu"}
+    )
+    return np.asarray(embeddings.embed_documents(questions), dtype=np.float32)
+
+def exact_neighbours(vectors: np.ndarray, queries: np.ndarray, k: int, space: str) -> np.ndarray:
+    """Brute-force top-k ids under the same distance the index uses."""
+    if space == "l2":
+        distances = (queries ** 2).sum(1)[:, None] - 2 * queries @ vectors.T + (vectors ** 2).sum(1)[None, :]
+    elif space == "cosine":
+        v = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        q = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+        distances = -(q @ v.T)
+    else:  # ip
+        distances = -(queries @ vectors.T)
+    return np.argsort(distances, axis=1)[:, :k]
+
+def evaluate(vectors: np.ndarray, queries: np.ndarray, truth: np.ndarray, params: Dict, k: int) -> Dict:
+    """Build a throwaway index with `params` and measure recall@k, query latency and size."""
+    workdir = tempfile.mkdtemp(prefix="hnsw-")
+    try:
+        client = chromadb.PersistentClient(path=workdir)
+        collection = client.create_collection("tune", metadata=to_collection_metadata(params))
+        ids = [str(i) for i in range(len(vectors))]
+        start = time.perf_counter()
+        for i in range(0, len(vectors), ADD_BATCH):
+            collection.add(ids=ids[i: i + ADD_BATCH], embeddings=vectors[i: i + ADD_BATCH].tolist())
+        build_seconds = time.perf_counter() - start
+
+        latencies, hits = [], 0
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            result = collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += len({int(i) for i in result["ids"][0]} & set(expected.tolist()))
+        return {
+            **params,
+            "recall": hits / (len(queries) * k),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "build_s": build_seconds,
+            "index_mb": _dir_size(workdir) / 1e6,
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def perturbed_queries(vectors: np.ndarray, n_queries: int, seed: int = 0) -> np.ndarray:
+    """Perturbed copies of stored chunks, a stand-in when no real questions can be embedded."""
+    rng = np.random.default_rng(seed)
+    picked = rng.choice(len(vectors), size=min(n_queries, len(vectors)), replace=False)
+    return vectors[picked] + rng.normal(0, vectors.std() * 0.05, size=vectors[picked].shape).astype(np.float32)
+
+def sweep(vectors: np.ndarray, queries: np.ndarray, space: str, grid: Dict[str, List], k: int) -> List[Dict]:
+    """Every M/ef combination of `grid`, with the space fixed to the collection's."""
+    truth = exact_neighbours(vectors, queries, k, space)
+
+    results = []
+    keys = list(grid)
+    for values in itertools.product(*(grid[key] for key in keys)):
+        params = {"space": space, **dict(zip(keys, values))}
+        result = evaluate(vectors, queries, truth, params, k)
+        logging.info(
+            f"{params}: recall@{k}={result['recall']:.3f} p50={result['p50_ms']:.2f}ms "
+            f"p95={result['p95_ms']:.2f}ms size={result['index_mb']:.1f}MB"
+        )
+        results.append(result)
+    return results
+
+def pick_config(results: List[Dict], target_recall: float) -> Dict:
+    """Fastest (p95) setting that reaches the target recall, else the most accurate one."""
+    good = [r for r in results if r["recall"] >= target_recall]
+    if good:
+        return min(good, key=lambda r: (r["p95_ms"], r["index_mb"]))
+    return max(results, key=lambda r: r["recall"])
+
+def print_table(results: List[Dict], k: int):
+    header = f"{'space':<7}{'M':>4}{'ef_c':>6}{'ef_s':>6}{f'recall@{k}':>11}{'p50 ms':>9}{'p95 ms':>9}{'build s':>9}{'MB':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in sorted(results, key=lambda r: (-r["recall"], r["p95_ms"])):
+        print(f"{r['space']:<7}{r['M']:>4}{r['ef_construction']:>6}{r['ef_search']:>6}"
+              f"{r['recall']:>11.3f}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['build_s']:>9.1f}{r['index_mb']:>8.1f}")
+
+# -----------------------
+# Main
+# -----------------------
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Sweep HNSW parameters against exact search on a collection")
+    parser.add_argument("--persist", default="chroma_storage")
+    parser.add_argument("--collection", required=True)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--questions", default=GOLDEN_SET,
+                        help="Golden set (or JSON list) of questions to embed as queries")
+    parser.add_argument("--queries", type=int, default=200,
+                        help="Perturbed stored chunks to query with when no questions are available")
+    parser.add_argument("--grid", type=str, help="JSON object overriding the default M/ef grid")
+    parser.add_argument("--target-recall", type=float, default=0.95)
+    parser.add_argument("--output", type=str, help="Write all results to this JSON file")
+    parser.add_argument("--write-config", action="store_true",
+                        help=f"Store the chosen setting for the collection in {HNSW_CONFIG_FILE}")
+    args = parser.parse_args()
+
+    grid = {**DEFAULT_GRID, **(json.loads(args.grid) if args.grid else {})}
+    if grid.pop("space", None) is not None:
+        logging.warning("Ignoring 'space' in --grid: it is fixed to the collection's space")
+    vectors, space = load_vectors(args.persist, args.collection)
+    logging.info(f"Loaded {len(vectors)} vectors of dim {vectors.shape[1]} ({space}) from {args.collection}")
+
+    queries = load_question_vectors(args.questions)
+    if queries is not None and queries.shape[1] != vectors.shape[1]:
+        logging.warning(f"Question embeddings have dim {queries.shape[1]}, the collection {vectors.shape[1]}")
+        queries = None
+    if queries is None:
+        queries = perturbed_queries(vectors, args.queries)
+        logging.info(f"Querying with {len(queries)} perturbed stored chunks")
+    else:
+        logging.info(f"Querying with {len(queries)} questions from {args.questions}")
+
+    results = sweep(vectors, queries, space, grid, args.k)
+    print_table(results, args.k)
+    best = pick_config(results, args.target_recall)
+    chosen = {"space": space, **{key: best[key] for key in grid}}
+    print(f"\nRecommended for {args.collection}: {chosen} "
+          f"(recall@{args.k}={best['recall']:.3f}, p95={best['p95_ms']:.2f}ms)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"collection": args.collection, "k": args.k, "results": results, "chosen": chosen}, f, indent=2)
+    if args.write_config:
+        config = load_hnsw_config()
+        config[args.collection] = chosen
+        save_hnsw_config(config)
+        # The next ingest drops and rebuilds collections whose space/M/ef_construction differ
+        print(f"Saved to {HNSW_CONFIG_FILE}; ef_search applies when serving processes next load "
+              f"{args.collection}, space/M/ef_construction when the next ingest rebuilds it")
@@ -0,0 +1,80 @@
+import os
+import time
+import asyncio
+import logging
+import functools
+import contextvars
+import weakref
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from metrics import QUEUE_SECONDS
+
+# -----------------------
+# Config
+# -----------------------
+# torch, the tokenizers and numpy release the GIL in their kernels, so a thread pool
+# is enough for embedding/rerank work; its size bounds how many run at once in total
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(min(8, os.cpu_count() or 1))))
+
+# Per-stage concurrency. A stage waits for a slot before it takes a pool thread (CPU
+# stages) or opens a connection (llm), so one slow stage cannot starve the others.
+STAGE_CONCURRENCY = {
+    "embed": int(os.getenv("EMBED_CONCURRENCY", str(CPU_WORKERS))),      # intent + query embedding
+    "retrieve": int(os.getenv("RETRIEVE_CONCURRENCY", str(CPU_WORKERS))),  # dense search + cross-encoder probe
+    "llm": int(os.getenv("LLM_CONCURRENCY", "16")),                        # async OpenAI calls
+}
+
+_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="rag-cpu")
+# asyncio primitives belong to one event loop; scripts that call asyncio.run() repeatedly get fresh ones
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+_in_flight: Dict[str, int] = {name: 0 for name in STAGE_CONCURRENCY}
+_waiting: Dict[str, int] = {name: 0 for name in STAGE_CONCURRENCY}
+
+
+def _semaphore(name: str) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    if loop not in _semaphores:
+        _semaphores[loop] = {stage: asyncio.Semaphore(limit) for stage, limit in STAGE_CONCURRENCY.items()}
+    return _semaphores[loop][name]
+
+def install_default_executor():
+    """
+    Make the worker pool the loop's default executor, so sync work LangChain offloads
+    on its own (retrievers without async support, asyncio.to_thread) is sized by it too.
+    """
+    asyncio.get_running_loop().set_default_executor(_executor)
+    logging.info(f"Worker pool: {CPU_WORKERS} CPU threads, stage limits {STAGE_CONCURRENCY}")
+
+@asynccontextmanager
+async def stage(name: str):
+    """Hold one of the stage's concurrency slots for the duration of the block."""
+    semaphore = _semaphore(name)
+    _waiting[name] += 1
+    queued_at = time.perf_counter()
+    try:
+        await semaphore.acquire()
+    finally:
+        _waiting[name] -= 1  # also when the request is cancelled while queued
+    QUEUE_SECONDS.observe(time.perf_counter() - queued_at, stage=name)
+    _in_flight[name] += 1
+    try:
+        yield
+    finally:
+        _in_flight[name] -= 1
+        semaphore.release()
+
+async def run_in_stage(name: str, fn: Callable, *args, **kwargs) -> Any:
+    """Run blocking `fn` on the worker pool under the stage's concurrency limit."""
+    async with stage(name):
+        loop = asyncio.get_running_loop()
+        # Carry the request's context (its metrics trace) into the pool thread, as asyncio.to_thread does
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(_executor, functools.partial(context.run, fn, *args, **kwargs))
+
+def stage_stats() -> Dict[str, Dict[str, int]]:
+    return {
+        name: {"limit": limit, "in_flight": _in_flight[name], "waiting": _waiting[name]}
+        for name, limit in STAGE_CONCURRENCY.items()
+    }
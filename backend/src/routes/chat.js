@@ -100,10 +100,19 @@ router.post('/stream', validateChatMessage, async (req, res) => {
       timestamp: new Date().toISOString()
     })}\n\n`);
 
+    // Stop the upstream LLM work if the client goes away mid-answer
+    const controller = new AbortController();
+    res.on('close', () => {
+      if (!res.writableEnded) {
+        controller.abort();
+      }
+    });
+
     // Process message with streaming
     await chatService.processMessageStream(message, {
       sessionId,
       context,
+      signal: controller.signal,
       onChunk: (chunk) => {
         res.write(`data: ${JSON.stringify({
           type: 'chunk',
@@ -220,11 +220,26 @@ router.post('/stream', validateRAGQuery, async (req, res) => {
       timestamp: new Date().toISOString()
     })}\n\n`);
 
+    // Stop the upstream LLM work if the client goes away mid-answer
+    const controller = new AbortController();
+    res.on('close', () => {
+      if (!res.writableEnded) {
+        controller.abort();
+      }
+    });
+
     // Process query with streaming
     await ragService.queryStream(question, {
       collections,
       maxResults,
       includeSources,
+      signal: controller.signal,
+      onEvent: (event) => {
+        res.write(`data: ${JSON.stringify({
+          ...event,
+          timestamp: new Date().toISOString()
+        })}\n\n`);
+      },
       onChunk: (chunk) => {
         res.write(`data: ${JSON.stringify({
           type: 'chunk',
@@ -113,6 +113,7 @@ class ChatService {
         collections: options.context?.collections || [],
         maxResults: 5,
         includeSources: true,
+        signal: options.signal,
         onChunk: (chunk) => {
           if (options.onChunk) {
             options.onChunk(chunk);
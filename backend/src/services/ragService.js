@@ -128,6 +128,7 @@ class RAGService {
 
   async queryStream(question, options = {}) {
     const startTime = Date.now();
+    const { onChunk, onEvent, onComplete, onError, signal, ...queryOptions } = options;
     
     try {
       if (!this.isInitialized) {
@@ -136,55 +137,102 @@ class RAGService {
 
       const requestBody = {
         message: question,
-        stream: true,
-        ...options
+        ...queryOptions
       };
 
       logger.info('Sending streaming query to Python RAG API', {
         questionLength: question.length,
-        collections: options.collections?.length || 0
+        collections: queryOptions.collections?.length || 0
       });
 
-      // For now, we'll simulate streaming by processing the regular query
-      // and then streaming the response in chunks
-      const response = await this.query(question, options);
-      
-      // Simulate streaming by breaking the response into chunks
-      const chunks = this.chunkText(response.answer, 50);
-      
-      for (let i = 0; i < chunks.length; i++) {
-        if (options.onChunk) {
-          options.onChunk(chunks[i]);
+      // Server-Sent Events from /chat/stream: retrieval/sources first, then LLM tokens.
+      // Aborting `signal` closes the connection, which cancels the LLM calls upstream.
+      const response = await axios.post(`${this.pythonAPIUrl}/chat/stream`, requestBody, {
+        timeout: this.timeout,
+        responseType: 'stream',
+        signal,
+        headers: {
+          'Content-Type': 'application/json',
+          'Accept': 'text/event-stream'
+        }
+      });
+
+      let buffer = '';
+      let completed = false;
+      let firstTokenAt = null;
+
+      const handleEvent = (event) => {
+        if (event.type === 'token') {
+          if (firstTokenAt === null) {
+            firstTokenAt = Date.now() - startTime;
+          }
+          if (onChunk) {
+            onChunk(event.content);
+          }
+        } else if (event.type === 'complete') {
+          completed = true;
+          const result = {
+            question,
+            answer: event.response || 'No answer generated',
+            sources: event.sources || [],
+            collections: queryOptions.collections || [],
+            confidence: event.confidence ?? 0,
+            abstained: event.abstained || false,
+            cached: event.cached || false,
+            processingTime: Date.now() - startTime,
+            timeToFirstToken: firstTokenAt,
+            timestamp: new Date().toISOString()
+          };
+          logger.info('RAG streaming query completed', {
+            processingTime: result.processingTime,
+            timeToFirstToken: firstTokenAt,
+            answerLength: result.answer.length
+          });
+          if (onComplete) {
+            onComplete(result);
+          }
+        } else if (event.type === 'error') {
+          throw new Error(event.error);
+        } else if (onEvent) {
+          // retrieval, sources, partial
+          onEvent(event);
+        }
+      };
+
+      for await (const data of response.data) {
+        buffer += data.toString('utf8');
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+          const message = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+          const payload = message
+            .split('\n')
+            .filter(line => line.startsWith('data:'))
+            .map(line => line.slice(5).trim())
+            .join('\n');
+          if (payload) {
+            handleEvent(JSON.parse(payload));
+          }
         }
-        
-        // Add a small delay to simulate streaming
-        await new Promise(resolve => setTimeout(resolve, 100));
       }
 
-      if (options.onComplete) {
-        options.onComplete(response);
+      if (!completed) {
+        throw new Error('Stream ended before the answer was complete');
       }
 
     } catch (error) {
+      if (signal?.aborted) {
+        logger.info('RAG streaming query cancelled by the client');
+        return;
+      }
       logger.error('RAG streaming query failed:', error);
       
-      if (options.onError) {
-        options.onError(error);
+      if (onError) {
+        onError(error);
       }
     }
   }
 
-  chunkText(text, chunkSize) {
-    const words = text.split(' ');
-    const chunks = [];
-    
-    for (let i = 0; i < words.length; i += chunkSize) {
-      chunks.push(words.slice(i, i + chunkSize).join(' '));
-    }
-    
-    return chunks;
-  }
-
   async getAvailableCollections() {
     try {
       return {